@@ -1,47 +1,142 @@
+import logging
 import os
-from sqlalchemy import create_engine, text
+import threading
+from typing import Optional
+from sqlalchemy import create_engine, event, text, inspect
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncEngine, AsyncSession
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session, sessionmaker
 from dotenv import load_dotenv
 
 load_dotenv()
 
-# Database URL configuration
-DATABASE_URL = os.getenv("DATABASE_URL")
+logger = logging.getLogger(__name__)
 
-# If DATABASE_URL is not set, construct it from individual components
-if not DATABASE_URL:
+# "postgres" (default) or "sqlite" for an embedded single-node database file.
+# An explicit DATABASE_URL always wins.
+DATABASE_BACKEND = os.getenv("DATABASE_BACKEND", "postgres")
+SQLITE_PATH = os.getenv("SQLITE_PATH", "stock_rec.db")
+
+# Connection pool sizing, per engine (API requests use the async engine, ingestion the sync one)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))  # Seconds to wait for a free connection
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "300"))   # Recycle connections every 5 minutes
+
+def get_database_url() -> str:
+    """Resolve the database URL from the environment"""
+    url = os.getenv("DATABASE_URL")
+    if url:
+        return url
+
+    if DATABASE_BACKEND == "sqlite":
+        return f"sqlite:///{SQLITE_PATH}"
+
+    # If DATABASE_URL is not set, construct it from individual components
     DB_HOST = os.getenv("DB_HOST", "localhost")
     DB_PORT = os.getenv("DB_PORT", "5432")
     DB_NAME = os.getenv("DB_NAME", "stock_rec")
     DB_USER = os.getenv("DB_USER", "postgres")
     DB_PASSWORD = os.getenv("DB_PASSWORD", "password")
-    DATABASE_URL = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
-
-print(f"🔌 Connecting to database: {DATABASE_URL.split('@')[1] if '@' in DATABASE_URL else 'DATABASE_URL'}")
-
-# Create engine with connection pooling and error handling
-try:
-    engine = create_engine(
-        DATABASE_URL,
-        pool_pre_ping=True,  # Verify connections before use
-        pool_recycle=300,    # Recycle connections every 5 minutes
-        echo=False           # Set to True for SQL debugging
-    )
-    
-    # Test the connection
-    with engine.connect() as conn:
-        conn.execute(text("SELECT 1"))
-    print("✅ Database connection successful")
-    
-except OperationalError as e:
-    print(f"❌ Database connection failed: {e}")
-    print("Please check your database configuration and ensure PostgreSQL is running")
-    raise
-
-# Create session factory
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    return f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+
+def get_async_database_url(url: str) -> str:
+    """Same database through an async driver: asyncpg for PostgreSQL, aiosqlite for SQLite"""
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend == "postgresql":
+        parsed = parsed.set(drivername="postgresql+asyncpg")
+        # asyncpg takes ssl= where libpq takes sslmode=
+        sslmode = parsed.query.get("sslmode")
+        if sslmode:
+            parsed = parsed.difference_update_query(["sslmode"]).update_query_dict({"ssl": sslmode})
+    elif backend == "sqlite":
+        parsed = parsed.set(drivername="sqlite+aiosqlite")
+    return parsed.render_as_string(hide_password=False)
+
+def _is_sqlite(url: str) -> bool:
+    return make_url(url).get_backend_name() == "sqlite"
+
+def _engine_options(url: str) -> dict:
+    options = {
+        "pool_pre_ping": True,  # Verify connections before use
+        "echo": False,          # Set to True for SQL debugging
+    }
+    # SQLite picks its own pool class, which doesn't take size limits
+    if not _is_sqlite(url):
+        options.update(
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+            pool_recycle=DB_POOL_RECYCLE,
+        )
+    return options
+
+def _configure_sqlite(engine: Engine):
+    """
+    WAL lets the API read while the ingestion job writes, and busy_timeout makes
+    the occasional concurrent writer wait instead of failing with "database is locked"
+    """
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute("PRAGMA busy_timeout=5000")
+        cursor.close()
+
+# Engines are created on first use, so importing app modules never needs a live database
+_engine: Optional[Engine] = None
+_async_engine: Optional[AsyncEngine] = None
+_engine_lock = threading.Lock()
+
+def get_engine() -> Engine:
+    """The process-wide sync engine (ingestion, scripts, admin jobs)"""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                url = get_database_url()
+                logger.info("🔌 Using database: %s", url.split('@')[1] if '@' in url else url)
+                engine = create_engine(url, **_engine_options(url))
+                if _is_sqlite(url):
+                    _configure_sqlite(engine)
+                _engine = engine
+    return _engine
+
+def get_async_engine() -> AsyncEngine:
+    """The process-wide async engine, so a request waiting on the database doesn't hold a threadpool slot"""
+    global _async_engine
+    if _async_engine is None:
+        with _engine_lock:
+            if _async_engine is None:
+                url = os.getenv("ASYNC_DATABASE_URL") or get_async_database_url(get_database_url())
+                engine = create_async_engine(url, **_engine_options(url))
+                if _is_sqlite(url):
+                    _configure_sqlite(engine.sync_engine)
+                _async_engine = engine
+    return _async_engine
+
+async def dispose_engines():
+    """Close pooled connections on shutdown"""
+    if _async_engine is not None:
+        await _async_engine.dispose()
+    if _engine is not None:
+        _engine.dispose()
+
+class _LazySession(Session):
+    """Binds to the configured engine when the first session is opened"""
+    def __init__(self, bind=None, **kwargs):
+        super().__init__(bind=bind or get_engine(), **kwargs)
+
+class _LazyAsyncSession(AsyncSession):
+    def __init__(self, bind=None, **kwargs):
+        super().__init__(bind=bind or get_async_engine(), **kwargs)
+
+# Create session factories
+SessionLocal = sessionmaker(class_=_LazySession, autocommit=False, autoflush=False)
+AsyncSessionLocal = async_sessionmaker(class_=_LazyAsyncSession, autoflush=False, expire_on_commit=False)
 
 # Create base class for models
 Base = declarative_base()
@@ -54,21 +149,63 @@ def get_db():
     finally:
         db.close()
 
+async def get_async_db():
+    """Dependency to get an async database session"""
+    async with AsyncSessionLocal() as db:
+        yield db
+
 def create_tables():
     """Create all tables"""
     try:
+        engine = get_engine()
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+        logger.info("✅ Database connection successful")
+
         Base.metadata.create_all(bind=engine)
-        print("✅ Database tables created successfully")
+        sync_schema()
+        logger.info("✅ Database tables created successfully")
     except Exception as e:
-        print(f"❌ Failed to create database tables: {e}")
+        logger.error("❌ Failed to create database tables: %s", e)
         raise
 
+def sync_schema():
+    """
+    create_all() never alters existing tables, so add any columns and indexes
+    that were introduced after a table was first created.
+    """
+    engine = get_engine()
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing_columns = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing_columns:
+                    column_type = column.type.compile(dialect=engine.dialect)
+                    conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
+                    logger.info("🛠️ Added column %s.%s", table.name, column.name)
+            for index in table.indexes:
+                index.create(bind=conn, checkfirst=True)
+
+def upsert_insert(db):
+    """Return the dialect-specific insert() that supports ON CONFLICT, or None"""
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+        return insert
+    if dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+        return insert
+    return None
+
 def test_connection():
     """Test database connection"""
     try:
-        with engine.connect() as conn:
+        with get_engine().connect() as conn:
             result = conn.execute(text("SELECT 1"))
             return True
     except Exception as e:
-        print(f"❌ Connection test failed: {e}")
+        logger.error("❌ Connection test failed: %s", e)
         return False
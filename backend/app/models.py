@@ -1,7 +1,22 @@
-from sqlalchemy import Column, String, Float, Integer, DateTime, Text
+from sqlalchemy import Column, String, Float, Integer, DateTime, Date, Text, Index, literal_column
 from sqlalchemy.sql import func
 from app.database import Base
 
+# Text search configuration. Spelled as literals so the query expression matches
+# the index expression exactly (PostgreSQL only uses the index when it does).
+SEARCH_CONFIG = literal_column("'english'::regconfig")
+
+def search_document(symbol, name, industry, summary):
+    """Weighted tsvector over a stock's text columns: symbol and name rank above industry, then summary"""
+    def weighted(column, weight):
+        text = func.to_tsvector(SEARCH_CONFIG, func.coalesce(column, literal_column("''")))
+        return func.setweight(text, literal_column(f"'{weight}'::\"char\""))
+    return (
+        weighted(symbol, "A").op("||")(weighted(name, "A"))
+        .op("||")(weighted(industry, "B"))
+        .op("||")(weighted(summary, "C"))
+    )
+
 class Stock(Base):
     __tablename__ = "stocks"
 
@@ -19,6 +34,12 @@ class Stock(Base):
     revenue_growth_3yr = Column(Float)
     earnings_growth = Column(Float)
     de_ratio = Column(Float)
+    # Daily price history indicators (see app.services.price_history), as of prices_as_of
+    return_12_1m = Column(Float)       # Return from 12 months to 1 month ago
+    sma_50 = Column(Float)             # 50-day simple moving average of the close
+    sma_200 = Column(Float)            # 200-day simple moving average of the close
+    volatility = Column(Float)         # Annualized standard deviation of daily returns over a year
+    prices_as_of = Column(Date)        # Last daily close the indicators include
     average_analyst_rating = Column(String(50))
     summary = Column(Text)
     industry = Column(String(255))
@@ -29,13 +50,86 @@ class Stock(Base):
     growth_score = Column(Integer)
     momentum_score = Column(Integer)
     quality_score = Column(Integer)
+    scoring_version = Column(String(16))
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
+    # Keyset pagination indexes matching ORDER BY <strategy>_score DESC, symbol
+    __table_args__ = (
+        Index("ix_stocks_balanced_rank", balanced_score.desc(), symbol),
+        Index("ix_stocks_value_rank", value_score.desc(), symbol),
+        Index("ix_stocks_growth_rank", growth_score.desc(), symbol),
+        Index("ix_stocks_momentum_rank", momentum_score.desc(), symbol),
+        Index("ix_stocks_quality_rank", quality_score.desc(), symbol),
+        Index("ix_stocks_industry", industry),
+        Index("ix_stocks_updated_at", updated_at),
+        # Full-text search (PostgreSQL only), maintained by PostgreSQL on every write
+        Index(
+            "ix_stocks_search", search_document(symbol, name, industry, summary), postgresql_using="gin",
+        ).ddl_if(dialect="postgresql"),
+    )
+
 class TickerProgress(Base):
     __tablename__ = "ticker_progress"
 
     id = Column(Integer, primary_key=True, index=True)
-    last_index = Column(Integer, default=0)
+    last_index = Column(Integer, default=0)            # Round-robin cursor into the ticker list
     total_tickers = Column(Integer, default=0)
+    # Change feed for processes that don't ingest (see app.services.cache_sync)
+    data_version = Column(Integer, default=0)          # Bumped with every ingestion or rescore commit
+    full_refresh_version = Column(Integer, default=0)  # data_version of the last change that touched every row
+    sweep_count = Column(Integer, default=0)           # Completed passes over the ticker list
+    sweep_fetched = Column(Integer, default=0)         # Symbols answered so far this sweep (priority schedule)
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+class SymbolRefreshState(Base):
+    __tablename__ = "symbol_refresh_state"
+
+    symbol = Column(String(10), primary_key=True)
+    last_fetched = Column(DateTime(timezone=True))   # Last attempt, successful or not
+    last_success = Column(DateTime(timezone=True))   # Last fetch that returned usable data
+    failure_count = Column(Integer, default=0)       # Consecutive failures, drives backoff
+    next_due = Column(DateTime(timezone=True), index=True)
+    financials_checked_at = Column(DateTime(timezone=True))  # Last annual statements download
+    financials_due = Column(DateTime(timezone=True))         # When a new fiscal year's statements are expected
+    lease_owner = Column(String(64))                 # Ingestion worker currently fetching the symbol
+    lease_expires = Column(DateTime(timezone=True))  # The claim lapses after this unless heartbeated
+
+class FinancialStatement(Base):
+    __tablename__ = "financial_statements"
+
+    # One annual statement per symbol and fiscal period, {line item: value} as JSON
+    symbol = Column(String(10), primary_key=True)
+    period_end = Column(Date, primary_key=True)
+    line_items = Column(Text)
+    fetched_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class StockSnapshot(Base):
+    __tablename__ = "stock_snapshots"
+
+    # Append-only: one row per symbol per successful fetch. The primary key
+    # doubles as the index for per-symbol history reads.
+    symbol = Column(String(10), primary_key=True)
+    fetched_at = Column(DateTime(timezone=True), primary_key=True)
+    price = Column(Float)
+    pe_ratio = Column(Float)
+    ps_ratio = Column(Float)
+    pb_ratio = Column(Float)
+    peg_ratio = Column(Float)
+    roe = Column(Float)
+    dividend_yield = Column(Float)
+    free_cash_flow = Column(Float)
+    revenue_growth = Column(Float)
+    revenue_growth_3yr = Column(Float)
+    earnings_growth = Column(Float)
+    de_ratio = Column(Float)
+    balanced_score = Column(Integer)
+    value_score = Column(Integer)
+    growth_score = Column(Integer)
+    momentum_score = Column(Integer)
+    quality_score = Column(Integer)
+    scoring_version = Column(String(16))
+
+    # Monthly range partitions on PostgreSQL (created on demand by app.services.snapshots)
+    # so old months can be archived to Parquet and dropped wholesale
+    __table_args__ = {"postgresql_partition_by": "RANGE (fetched_at)"}
@@ -0,0 +1,22 @@
+import hmac
+import os
+from fastapi import APIRouter, Depends, Header, HTTPException
+from typing import Optional
+from sqlalchemy.orm import Session
+from app.database import get_db
+from app.services.rescore import rescore_all_stocks
+
+router = APIRouter(prefix="/admin")
+
+def require_admin_token(x_admin_token: Optional[str] = Header(default=None)):
+    """Admin endpoints are disabled unless ADMIN_TOKEN is set, and then require it in X-Admin-Token"""
+    admin_token = os.getenv("ADMIN_TOKEN")
+    if not admin_token:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled")
+    if not hmac.compare_digest((x_admin_token or "").encode(), admin_token.encode()):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+
+@router.post("/rescore", dependencies=[Depends(require_admin_token)])
+def rescore(only_stale: bool = False, db: Session = Depends(get_db)):
+    """Recompute all score columns from stored metrics"""
+    return rescore_all_stocks(db, only_stale=only_stale)
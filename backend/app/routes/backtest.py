@@ -0,0 +1,37 @@
+from datetime import date
+from fastapi import APIRouter, Depends, HTTPException
+from typing import Optional
+from sqlalchemy.orm import Session
+from app.database import get_db
+from app.services.backtest import cached_backtest, default_range, BACKTEST_FREQUENCIES, DEFAULT_TOP_N, MAX_TOP_N
+from app.services.scoring import STRATEGIES
+from app.services.serialization import json_response
+
+router = APIRouter()
+
+@router.get("/backtest")
+def backtest(
+    strategy: str = "balanced",
+    top_n: int = DEFAULT_TOP_N,
+    frequency: str = "monthly",
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    db: Session = Depends(get_db),
+):
+    """
+    Replay stored snapshots through a strategy's current rules: hold the top_n
+    stocks, rebalanced weekly or monthly, against the equal-weighted universe.
+    Defaults to the last three years. Results are cached; parameter sweeps
+    belong in backtest.py.
+    """
+    if strategy not in STRATEGIES:
+        raise HTTPException(status_code=400, detail=f"Unknown strategy {strategy}")
+    if frequency not in BACKTEST_FREQUENCIES:
+        raise HTTPException(status_code=400, detail=f"Unknown frequency {frequency}, expected one of {', '.join(BACKTEST_FREQUENCIES)}")
+    if not 1 <= top_n <= MAX_TOP_N:
+        raise HTTPException(status_code=400, detail=f"top_n must be between 1 and {MAX_TOP_N}")
+    default_start, default_end = default_range(frequency)
+    start, end = start or default_start, end or default_end
+    if start >= end:
+        raise HTTPException(status_code=400, detail="start must be before end")
+    return json_response(cached_backtest(db, strategy, top_n, frequency, start, end))
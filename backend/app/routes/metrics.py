@@ -0,0 +1,11 @@
+from fastapi import APIRouter, Depends, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import get_async_db
+from app.services.metrics import CONTENT_TYPE_LATEST, render_metrics
+
+router = APIRouter()
+
+@router.get("/metrics")
+async def metrics(db: AsyncSession = Depends(get_async_db)):
+    """Prometheus scrape endpoint: ingestion and request metrics for this process, plus data staleness"""
+    return Response(content=await db.run_sync(render_metrics), media_type=CONTENT_TYPE_LATEST)
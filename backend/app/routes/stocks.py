@@ -1,45 +1,284 @@
-from datetime import datetime
-from fastapi import APIRouter, Query, Depends
-from typing import Optional
-from sqlalchemy.orm import Session
-from app.database import get_db
-from app.services.stock_fetcher import get_stocks_from_db, calculate_stock_score
+import logging
+from datetime import datetime, timedelta, timezone
+from fastapi import APIRouter, Query, Depends, Header, Request, Response, HTTPException
+from fastapi.responses import StreamingResponse
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import get_async_db, AsyncSessionLocal
+from app.models import TickerProgress
+from app.services.stock_fetcher import (
+    get_stocks_from_db, calculate_stock_score, encode_cursor, decode_cursor, STOCK_FIELDS, NUMERIC_FIELDS,
+    get_stock_by_symbol, get_stocks_by_symbols, LEADERBOARD_READ_LIMIT,
+)
+from app.services.cache import stocks_response_cache, etag_matches
+from app.services.leaderboard import leaderboards
+from app.services.scoring import STRATEGIES
+from app.services.snapshots import get_stock_history_async, SNAPSHOT_FIELDS
+from app.services.export import stream_export, EXPORT_FORMATS
+from app.services.serialization import dumps, dumps_ndjson, json_response, NDJSON_MEDIA_TYPE
+from app.services.search import search_stocks, MAX_SEARCH_RESULTS
+from app.services.autocomplete import symbol_index, MAX_AUTOCOMPLETE_RESULTS
+from app.services.change_feed import change_feed
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+MAX_BATCH_SYMBOLS = 100
+DEFAULT_HISTORY_DAYS = 365
+
 @router.get("/")
-def root():
+async def root():
     return {"message": "Welcome to Stock Rec API"}
 
 @router.api_route("/health", methods=["GET", "HEAD"])
-def health_check():
+async def health_check():
     global last_ping_time
     last_ping_time = datetime.utcnow()
-    print(f"✅ Health check ping at {last_ping_time} UTC")
+    logger.debug("✅ Health check ping at %s UTC", last_ping_time)
     return {
         "status": "ok",
         "last_ping": last_ping_time.isoformat()
     }
 
+def parse_range_filters(request: Request) -> Dict[str, Tuple[Optional[float], Optional[float]]]:
+    """Collect min_<field>/max_<field> query parameters into {field: (min, max)}"""
+    filters: Dict[str, Tuple[Optional[float], Optional[float]]] = {}
+    for key, value in request.query_params.items():
+        if not key.startswith(("min_", "max_")):
+            continue
+        field = key[4:]
+        if field not in NUMERIC_FIELDS:
+            raise HTTPException(status_code=400, detail=f"Cannot filter on {field}")
+        try:
+            bound = float(value)
+        except ValueError:
+            raise HTTPException(status_code=400, detail=f"Invalid number for {key}: {value}")
+        minimum, maximum = filters.get(field, (None, None))
+        filters[field] = (bound, maximum) if key.startswith("min_") else (minimum, bound)
+    return filters
+
+def parse_fields(fields: Optional[str]) -> Optional[List[str]]:
+    """Parse a comma-separated fields= projection"""
+    if not fields:
+        return None
+    parsed = [field.strip() for field in fields.split(",") if field.strip()]
+    unknown = [field for field in parsed if field not in STOCK_FIELDS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    return parsed
+
 @router.get("/stocks")
-def get_all_stocks(
-    limit: int = 100, 
+async def get_all_stocks(
+    request: Request,
+    limit: int = Query(100, ge=1),
     strategy: str = "balanced",
-    db: Session = Depends(get_db)
+    industry: Optional[str] = None,
+    fields: Optional[str] = None,
+    cursor: Optional[str] = None,
+    format: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db)
 ):
-    try:
-        # Get stocks from database
-        stocks = get_stocks_from_db(db, limit=limit, strategy=strategy)
+    """
+    Top stocks for a strategy. Supports min_<field>/max_<field> range filters on
+    numeric columns, industry equality, a fields= projection and keyset
+    pagination: pass the X-Next-Cursor response header back as cursor=.
+    format=ndjson (or Accept: application/x-ndjson) returns one stock per line.
+    """
+    ndjson = format == "ndjson" or (format is None and NDJSON_MEDIA_TYPE in request.headers.get("accept", ""))
+    if format not in (None, "json", "ndjson"):
+        raise HTTPException(status_code=400, detail=f"Unknown format {format}, expected json or ndjson")
+    if strategy not in STRATEGIES:
+        raise HTTPException(status_code=400, detail=f"Unknown strategy {strategy}")
+    filters = parse_range_filters(request)
+    projection = parse_fields(fields)
+    if cursor:
+        try:
+            decode_cursor(cursor)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+    
+    async def build_body() -> Tuple[bytes, Dict[str, str]]:
+        # Get stocks from database (the query code is shared with the sync ingestion side)
+        stocks = await db.run_sync(
+            get_stocks_from_db, limit=limit, strategy=strategy, filters=filters,
+            industry=industry, fields=projection, cursor=cursor,
+        )
         
-        print(f"Returning {len(stocks)} top-scoring stocks (limited to {limit})")
-        if stocks:
-            score_field = f"{strategy}_score"
+        score_field = f"{strategy}_score"
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Returning %d top-scoring stocks (limited to %d)", len(stocks), limit)
             scores = [stock.get(score_field, 0) for stock in stocks if stock.get(score_field) is not None]
             if scores:
-                print(f"Score range: {max(scores)} - {min(scores)}")
+                logger.debug("Score range: %s - %s", max(scores), min(scores))
+        
+        headers = {}
+        if stocks and len(stocks) == limit:
+            headers["X-Next-Cursor"] = encode_cursor(stocks[-1].get(score_field), stocks[-1]["symbol"])
         
-        return stocks
+        body = dumps_ndjson(stocks) if ndjson else dumps(stocks)
+        return body, headers
+    
+    cache_key = (
+        strategy, limit, industry, cursor, ndjson,
+        tuple(projection) if projection else None,
+        tuple(sorted(filters.items())),
+    )
+    
+    try:
+        cached = await stocks_response_cache.get_or_compute_async(cache_key, build_body)
+        headers = {"ETag": cached.etag, "Vary": "Accept", **cached.headers}
+        
+        if etag_matches(request.headers.get("if-none-match"), cached.etag):
+            return Response(status_code=304, headers=headers)
+        
+        media_type = NDJSON_MEDIA_TYPE if ndjson else "application/json"
+        return Response(content=cached.body, media_type=media_type, headers=headers)
         
     except Exception as e:
-        print(f"Unexpected error: {e}")
-        return {"error": "Internal server error"}
\ No newline at end of file
+        logger.exception("Unexpected error: %s", e)
+        return {"error": "Internal server error"}
+
+@router.get("/stocks/export")
+async def export_stocks(
+    request: Request,
+    format: str = "csv",
+    strategy: str = "balanced",
+    industry: Optional[str] = None,
+    fields: Optional[str] = None,
+):
+    """
+    Full-universe dump for bulk consumers, streamed straight off a server-side
+    cursor: format=arrow (IPC stream), parquet or csv. Ordering, fields= and
+    min_/max_ filters work like /stocks.
+    """
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unknown format {format}, expected one of {', '.join(EXPORT_FORMATS)}")
+    if strategy not in STRATEGIES:
+        raise HTTPException(status_code=400, detail=f"Unknown strategy {strategy}")
+    filters = parse_range_filters(request)
+    projection = parse_fields(fields)
+    
+    media_type, extension = EXPORT_FORMATS[format]
+    return StreamingResponse(
+        stream_export(format, strategy, projection, filters, industry),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="stocks-{strategy}.{extension}"'},
+    )
+
+@router.get("/stocks/batch")
+async def get_stocks_batch(symbols: str, db: AsyncSession = Depends(get_async_db)):
+    """Look up several stocks by symbol in one query: /stocks/batch?symbols=AAPL,MSFT"""
+    requested = list(dict.fromkeys(s.strip().upper() for s in symbols.split(",") if s.strip()))
+    if not requested:
+        raise HTTPException(status_code=400, detail="No symbols given")
+    if len(requested) > MAX_BATCH_SYMBOLS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_SYMBOLS} symbols per request")
+    
+    found = await db.run_sync(get_stocks_by_symbols, requested)
+    return json_response([found[symbol] for symbol in requested if symbol in found])
+
+@router.get("/stocks/search")
+async def search(
+    q: str,
+    limit: int = Query(20, ge=1, le=MAX_SEARCH_RESULTS),
+    fields: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Full-text search over symbol, name, industry and summary: /stocks/search?q=cloud software"""
+    if not q.strip():
+        raise HTTPException(status_code=400, detail="Empty search")
+    projection = parse_fields(fields)
+    return json_response(await db.run_sync(search_stocks, q, limit, projection))
+
+@router.get("/stocks/autocomplete")
+async def autocomplete(
+    q: str, limit: int = Query(10, ge=1, le=MAX_AUTOCOMPLETE_RESULTS), db: AsyncSession = Depends(get_async_db)
+):
+    """Symbol and company name prefix matches for a search box, answered from memory"""
+    if not symbol_index.loaded:
+        await db.run_sync(symbol_index.ensure_loaded)
+    return json_response(symbol_index.complete(q, limit))
+
+@router.get("/stocks/stream")
+async def stream_changes(since: Optional[int] = None, last_event_id: Optional[str] = Header(default=None)):
+    """
+    Server-sent events with the stocks and ranks each ingestion batch changed.
+    Every event id is a data version; reconnect with since= (or let the
+    browser send Last-Event-ID) to replay what was missed, or get a reset
+    event telling the client to reload /stocks.
+    """
+    if since is None and last_event_id and last_event_id.isdigit():
+        since = int(last_event_id)
+    # Own session rather than Depends(), so the stream doesn't hold a connection open
+    async with AsyncSessionLocal() as db:
+        if change_feed.version is None:
+            version = await db.scalar(select(TickerProgress.data_version).order_by(TickerProgress.id).limit(1))
+            change_feed.set_baseline(version or 0)
+        # Rank moves are only computed while the leaderboards are in memory
+        await db.run_sync(leaderboards.ensure_loaded)
+    return StreamingResponse(
+        change_feed.stream(since),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@router.get("/stocks/{symbol}")
+async def get_stock(symbol: str, db: AsyncSession = Depends(get_async_db)):
+    """Single stock by symbol"""
+    stock = await db.run_sync(get_stock_by_symbol, symbol.upper())
+    if stock is None:
+        raise HTTPException(status_code=404, detail=f"Stock {symbol} not found")
+    return json_response(stock)
+
+@router.get("/stocks/{symbol}/history")
+async def get_stock_history_route(
+    symbol: str,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    fields: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Fetch-by-fetch history of metrics and scores for one symbol, oldest first.
+    start/end are ISO timestamps (UTC); the default range is the last year.
+    """
+    symbol = symbol.upper()
+    # Compare in naive UTC, like the stored timestamps
+    if start is not None and start.tzinfo is not None:
+        start = start.astimezone(timezone.utc).replace(tzinfo=None)
+    if end is not None and end.tzinfo is not None:
+        end = end.astimezone(timezone.utc).replace(tzinfo=None)
+    end = end or datetime.utcnow()
+    start = start or end - timedelta(days=DEFAULT_HISTORY_DAYS)
+    if start >= end:
+        raise HTTPException(status_code=400, detail="start must be before end")
+    
+    projection = None
+    if fields:
+        projection = [field.strip() for field in fields.split(",") if field.strip()]
+        unknown = [field for field in projection if field not in SNAPSHOT_FIELDS]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    
+    history = await get_stock_history_async(db, symbol, start, end, projection)
+    return json_response({"symbol": symbol, "history": history})
+
+@router.get("/stocks/{symbol}/rank")
+async def get_stock_rank(symbol: str, db: AsyncSession = Depends(get_async_db)):
+    """Current rank, score and rank change since the previous sweep for every strategy"""
+    symbol = symbol.upper()
+    ranks = await db.run_sync(leaderboards.ranks, symbol)
+    if all(entry["rank"] is None for entry in ranks.values()):
+        raise HTTPException(status_code=404, detail=f"Stock {symbol} not found")
+    return {"symbol": symbol, "strategies": ranks}
+
+@router.get("/leaderboard/{strategy}")
+async def get_leaderboard(
+    strategy: str, limit: int = Query(100, ge=1, le=LEADERBOARD_READ_LIMIT), db: AsyncSession = Depends(get_async_db)
+):
+    """Top-N symbols for a strategy with rank and rank change, served from memory"""
+    if strategy not in STRATEGIES:
+        raise HTTPException(status_code=404, detail=f"Unknown strategy {strategy}")
+    return json_response(await db.run_sync(leaderboards.board, strategy, limit))
@@ -0,0 +1,147 @@
+import logging
+import re
+import threading
+from bisect import bisect_left, insort
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from app.models import Stock
+
+logger = logging.getLogger(__name__)
+
+MAX_AUTOCOMPLETE_RESULTS = 25
+# Name words shorter than this aren't worth an entry
+MIN_WORD_LENGTH = 2
+
+_WORD = re.compile(r"[\w&'.-]+")
+
+
+class _PrefixList:
+    """Sorted (key, symbol) pairs; a prefix lookup is one bisect plus a short scan"""
+
+    def __init__(self):
+        self._entries: List[Tuple[str, str]] = []
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def load(self, entries: List[Tuple[str, str]]):
+        self._entries = sorted(entries)
+
+    def add(self, key: str, symbol: str):
+        insort(self._entries, (key, symbol))
+
+    def remove(self, key: str, symbol: str):
+        index = bisect_left(self._entries, (key, symbol))
+        if index < len(self._entries) and self._entries[index] == (key, symbol):
+            del self._entries[index]
+
+    def scan(self, prefix: str, n: int, seen: set) -> List[str]:
+        """Up to n symbols not in seen whose key starts with prefix, in key order"""
+        found = []
+        index = bisect_left(self._entries, (prefix, ""))
+        while index < len(self._entries) and len(found) < n:
+            key, symbol = self._entries[index]
+            if not key.startswith(prefix):
+                break
+            if symbol not in seen:
+                seen.add(symbol)
+                found.append(symbol)
+            index += 1
+        return found
+
+
+def _name_words(name: Optional[str]) -> List[str]:
+    """Lowercased words of a name after the first, so "Bank of America" is found by "america" too"""
+    if not name:
+        return []
+    words = _WORD.findall(name.lower())[1:]
+    return sorted({word for word in words if len(word) >= MIN_WORD_LENGTH})
+
+
+class SymbolIndex:
+    """
+    In-memory autocomplete over symbols and company names, loaded from the
+    database on first use and updated incrementally as batches are saved.
+    Matches rank as: symbol prefix (exact symbol first), then name prefix,
+    then a later word of the name.
+    """
+
+    def __init__(self):
+        self._symbols = _PrefixList()
+        self._names = _PrefixList()
+        self._words = _PrefixList()
+        self._by_symbol: Dict[str, Optional[str]] = {}
+        self._loaded = False
+        self._lock = threading.RLock()
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded
+
+    def ensure_loaded(self, db: Session):
+        if self._loaded:
+            return
+        with self._lock:
+            if self._loaded:
+                return
+            rows = db.execute(select(Stock.symbol, Stock.name)).all()
+            self._by_symbol = {symbol: name for symbol, name in rows}
+            self._symbols.load([(symbol.lower(), symbol) for symbol in self._by_symbol])
+            self._names.load([(name.lower(), symbol) for symbol, name in self._by_symbol.items() if name])
+            self._words.load([(word, symbol) for symbol, name in self._by_symbol.items() for word in _name_words(name)])
+            self._loaded = True
+            logger.info("🔎 Loaded autocomplete index for %d stocks", len(rows))
+
+    def invalidate(self):
+        """Force a full reload on next use"""
+        with self._lock:
+            self._loaded = False
+
+    def _remove(self, symbol: str):
+        name = self._by_symbol.pop(symbol)
+        self._symbols.remove(symbol.lower(), symbol)
+        if name:
+            self._names.remove(name.lower(), symbol)
+        for word in _name_words(name):
+            self._words.remove(word, symbol)
+
+    def _add(self, symbol: str, name: Optional[str]):
+        self._by_symbol[symbol] = name
+        self._symbols.add(symbol.lower(), symbol)
+        if name:
+            self._names.add(name.lower(), symbol)
+        for word in _name_words(name):
+            self._words.add(word, symbol)
+
+    def apply_batch(self, batch_metrics: Dict[str, Dict]):
+        """Re-index the symbols in this batch whose name changed. No-op until loaded."""
+        with self._lock:
+            if not self._loaded:
+                return
+            for symbol, metrics in batch_metrics.items():
+                if "name" not in metrics:
+                    continue
+                name = metrics["name"]
+                if symbol in self._by_symbol:
+                    if self._by_symbol[symbol] == name:
+                        continue
+                    self._remove(symbol)
+                self._add(symbol, name)
+
+    def complete(self, prefix: str, limit: int = 10) -> List[Dict[str, Optional[str]]]:
+        """Symbols and names starting with prefix (case-insensitive), best match first"""
+        prefix = prefix.strip().lower()
+        if not prefix:
+            return []
+        with self._lock:
+            seen: set = set()
+            symbols = self._symbols.scan(prefix, limit, seen)
+            for index in (self._names, self._words):
+                if len(symbols) >= limit:
+                    break
+                symbols += index.scan(prefix, limit - len(symbols), seen)
+            return [{"symbol": symbol, "name": self._by_symbol.get(symbol)} for symbol in symbols]
+
+
+symbol_index = SymbolIndex()
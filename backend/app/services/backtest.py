@@ -0,0 +1,305 @@
+import math
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, time, timedelta
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+import numpy as np
+import pandas as pd
+from sqlalchemy.orm import Session
+from app.services.cache import LRUCache
+from app.services.price_history import PriceStore, rolling_indicators
+from app.services.scoring import Rule, SCORING_VERSION, get_rules, rule_fields, score_arrays
+from app.services.snapshots import SNAPSHOT_FIELDS, iter_snapshot_months
+from app.services.stock_fetcher import PRICE_INDICATOR_FIELDS
+
+# Rebalance schedules: pandas offset alias and periods per year
+BACKTEST_FREQUENCIES = {"weekly": ("W-FRI", 52), "monthly": ("ME", 12)}
+# A symbol's last snapshot stands in for its metrics this long, then it drops out of the universe
+BACKTEST_MAX_STALENESS_DAYS = float(os.getenv("BACKTEST_MAX_STALENESS_DAYS", "45"))
+# Processes used for parameter sweeps
+BACKTEST_WORKERS = int(os.getenv("BACKTEST_WORKERS", str(os.cpu_count() or 1)))
+# Default range for the endpoint: this many years up to the last completed rebalance date
+BACKTEST_YEARS = 3
+DEFAULT_TOP_N = 20
+MAX_TOP_N = 500
+
+
+class Panels(NamedTuple):
+    """
+    What the screener knew at each rebalance date: dates x symbols float
+    arrays per rule field, prices to measure forward returns on, and which
+    symbols had a recent enough snapshot to be in the universe at all.
+    """
+    frequency: str
+    dates: np.ndarray           # datetime64[D]
+    symbols: List[str]
+    fields: Dict[str, np.ndarray]
+    prices: np.ndarray
+    available: np.ndarray       # bool
+
+
+class Variant(NamedTuple):
+    """One backtest configuration: a strategy's rule list (thresholds possibly scaled) and a portfolio size"""
+    name: str
+    strategy: str
+    top_n: int
+    rules: Tuple[Rule, ...]
+
+
+def _empty_panels(frequency: str, dates: np.ndarray) -> Panels:
+    shape = (len(dates), 0)
+    return Panels(frequency, dates, [], {}, np.empty(shape), np.zeros(shape, dtype=bool))
+
+def load_panels(
+    db: Session, start: date, end: date, frequency: str = "monthly", store: Optional[PriceStore] = None
+) -> Panels:
+    """
+    Sample stored snapshots onto the rebalance dates in [start, end]: each date
+    sees every symbol's latest snapshot taken on or before it (at most
+    BACKTEST_MAX_STALENESS_DAYS old). Snapshots are read a month at a time.
+
+    Price indicators aren't snapshotted, so they are recomputed as of each
+    date from the price store, whose daily closes are also used for forward
+    returns where it has the symbol (split-adjusted, unlike snapshot prices).
+    """
+    offset, _ = BACKTEST_FREQUENCIES[frequency]
+    rebalance = pd.date_range(start, end, freq=offset)
+    dates = rebalance.values.astype("datetime64[D]")
+    if len(dates) < 2:
+        return _empty_panels(frequency, dates)
+
+    fields = [field for field in rule_fields() if field in SNAPSHOT_FIELDS]
+    if "price" not in fields:
+        fields.append("price")
+    # A snapshot belongs to the first rebalance date on or after the day it was taken
+    bounds = (rebalance + pd.Timedelta(days=1)).values
+    staleness = timedelta(days=BACKTEST_MAX_STALENESS_DAYS)
+    latest = []
+    for frame in iter_snapshot_months(db, datetime.combine(start, time()) - staleness, pd.Timestamp(bounds[-1]).to_pydatetime(), fields):
+        frame = frame.sort_values("fetched_at", kind="stable")
+        frame["row"] = np.searchsorted(bounds, frame["fetched_at"].to_numpy(dtype="datetime64[ns]"), side="right")
+        latest.append(frame.drop_duplicates(["row", "symbol"], keep="last"))
+    if not latest:
+        return _empty_panels(frequency, dates)
+    # Months come in order, so the last row per date and symbol is the latest snapshot
+    snapshots = pd.concat(latest, ignore_index=True).drop_duplicates(["row", "symbol"], keep="last")
+
+    symbols = sorted(snapshots["symbol"].unique())
+    shape = (len(dates), len(symbols))
+    rows = snapshots["row"].to_numpy()
+    columns = pd.Categorical(snapshots["symbol"], categories=symbols).codes
+
+    # Carry whole snapshots forward (not field by field, a newer NULL must win)
+    spacing = float(np.median(np.diff(dates).astype(np.int64)))
+    source = np.full(shape, np.nan)
+    source[rows, columns] = rows
+    source = pd.DataFrame(source).ffill(limit=max(1, int(round(BACKTEST_MAX_STALENESS_DAYS / spacing)))).to_numpy()
+    available = ~np.isnan(source)
+    source_rows = np.where(available, source, 0).astype(np.int64)
+    all_columns = np.broadcast_to(np.arange(len(symbols)), shape)
+
+    panel_fields: Dict[str, np.ndarray] = {}
+    for field in fields:
+        raw = np.full(shape, np.nan)
+        raw[rows, columns] = pd.to_numeric(snapshots[field], errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+        panel_fields[field] = np.where(available, raw[source_rows, all_columns], np.nan)
+    prices = panel_fields["price"]
+
+    store = store or PriceStore()
+    position = {symbol: i for i, symbol in enumerate(store.symbols)}
+    in_store = np.array([symbol in position for symbol in symbols], dtype=bool)
+    if len(store.dates) and in_store.any():
+        close = np.asarray(store.field("close")[:, [position[symbol] for symbol in np.array(symbols)[in_store]]], dtype=np.float64)
+        # Last trading day on or before each rebalance date
+        at = np.searchsorted(store.dates, dates, side="right") - 1
+        known = at >= 0
+        cells = np.ix_(known, np.flatnonzero(in_store))
+
+        def sample(values: np.ndarray) -> np.ndarray:
+            out = np.full(shape, np.nan)
+            out[cells] = values[at[known]]
+            return out
+
+        indicators = rolling_indicators(close)
+        for field in PRICE_INDICATOR_FIELDS:
+            if field in rule_fields():
+                panel_fields[field] = np.where(available, sample(indicators[field]), np.nan)
+        closes = sample(pd.DataFrame(close).ffill().to_numpy())
+        prices = np.where(np.isnan(closes).all(axis=0), prices, closes)
+        # Rules compare price with the moving averages, so both have to be on the same (adjusted) basis
+        panel_fields["price"] = np.where(available, prices, np.nan)
+
+    return Panels(frequency, dates, symbols, panel_fields, prices, available)
+
+def base_variant(strategy: str, top_n: int = DEFAULT_TOP_N) -> Variant:
+    """A strategy's live rules"""
+    return Variant(strategy, strategy, top_n, tuple(get_rules(strategy)))
+
+def scale_thresholds(rules: Sequence[Rule], factor: float) -> Tuple[Rule, ...]:
+    """Rules with every min/max bound multiplied by factor. Field-to-field comparisons are unchanged."""
+    return tuple(
+        rule._replace(
+            min=None if rule.min is None else rule.min * factor,
+            max=None if rule.max is None else rule.max * factor,
+        )
+        for rule in rules
+    )
+
+def threshold_variants(strategies: Sequence[str], factors: Sequence[float], top_ns: Sequence[int]) -> List[Variant]:
+    """Every combination of strategy, threshold scale and portfolio size"""
+    return [
+        Variant(f"{strategy} x{factor:g} top{top_n}", strategy, top_n, scale_thresholds(get_rules(strategy), factor))
+        for strategy in strategies for factor in factors for top_n in top_ns
+    ]
+
+def select_top(scores: np.ndarray, eligible: np.ndarray, top_n: int) -> np.ndarray:
+    """
+    Boolean dates x symbols mask of the top_n eligible symbols per date, best
+    score first and ties going to the earlier symbol, like the leaderboards.
+    """
+    count = scores.shape[1]
+    top_n = min(top_n, count)
+    if not top_n:
+        return np.zeros(scores.shape, dtype=bool)
+    # Score and symbol order folded into one integer key; ineligible symbols sort last
+    key = np.where(eligible, scores.astype(np.int64) * (count + 1) + (count - np.arange(count)), -1)
+    picks = np.argpartition(-key, top_n - 1, axis=1)[:, :top_n]
+    chosen = np.zeros(scores.shape, dtype=bool)
+    np.put_along_axis(chosen, picks, True, axis=1)
+    return chosen & eligible
+
+def _number(value) -> Optional[float]:
+    value = float(value)
+    return value if math.isfinite(value) else None
+
+def _annualized(total: float, periods: int, periods_per_year: int) -> float:
+    return (1 + total) ** (periods_per_year / periods) - 1 if total > -1 else -1.0
+
+def run_variant(panels: Panels, variant: Variant, curve: bool = False) -> Dict[str, Any]:
+    """
+    Backtest one variant: at every rebalance date but the last, score the
+    universe with the variant's rules (one array operation over all dates),
+    hold the top_n equally weighted until the next date, and compare with the
+    equal-weighted universe. Returns summary statistics, plus the equity
+    curves with curve=True.
+
+    hit_rate: share of picks that beat the universe over their holding period.
+    win_rate: share of periods the portfolio beat the universe.
+    turnover: average share of the portfolio replaced at each rebalance.
+    """
+    _, periods_per_year = BACKTEST_FREQUENCIES[panels.frequency]
+    result: Dict[str, Any] = {"name": variant.name, "strategy": variant.strategy, "top_n": variant.top_n}
+    periods = len(panels.dates) - 1
+    if periods < 1 or not panels.symbols:
+        result.update(periods=0)
+        return result
+
+    scores = score_arrays(panels.fields, variant.strategy, shape=panels.prices.shape, rules=list(variant.rules))[:-1]
+    prices = panels.prices
+    with np.errstate(invalid="ignore", divide="ignore"):
+        forward = prices[1:] / prices[:-1] - 1
+    eligible = (panels.available & ~np.isnan(prices))[:-1]
+    chosen = select_top(scores, eligible, variant.top_n)
+
+    # Picks without a next price (delisted, no data) are left out of the averages
+    held = chosen & ~np.isnan(forward)
+    universe = eligible & ~np.isnan(forward)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        portfolio = np.where(held, forward, 0).sum(axis=1) / held.sum(axis=1)
+        benchmark = np.where(universe, forward, 0).sum(axis=1) / universe.sum(axis=1)
+        overlap = (chosen[1:] & chosen[:-1]).sum(axis=1) / chosen[1:].sum(axis=1)
+    portfolio_growth = np.cumprod(1 + np.nan_to_num(portfolio))
+    benchmark_growth = np.cumprod(1 + np.nan_to_num(benchmark))
+    drawdown = portfolio_growth / np.maximum.accumulate(np.maximum(portfolio_growth, 1.0)) - 1
+
+    total = portfolio_growth[-1] - 1
+    benchmark_total = benchmark_growth[-1] - 1
+    period_std = np.nanstd(portfolio, ddof=1) if np.count_nonzero(~np.isnan(portfolio)) > 1 else np.nan
+    compared = ~np.isnan(portfolio) & ~np.isnan(benchmark)
+    result.update(
+        periods=periods,
+        total_return=_number(total),
+        annualized_return=_number(_annualized(total, periods, periods_per_year)),
+        annualized_volatility=_number(period_std * math.sqrt(periods_per_year)),
+        sharpe=_number(np.nanmean(portfolio) / period_std * math.sqrt(periods_per_year)) if period_std else None,
+        max_drawdown=_number(drawdown.min()),
+        benchmark_total_return=_number(benchmark_total),
+        benchmark_annualized_return=_number(_annualized(benchmark_total, periods, periods_per_year)),
+        hit_rate=_number((held & (forward > benchmark[:, None])).sum() / held.sum()) if held.any() else None,
+        win_rate=_number((portfolio[compared] > benchmark[compared]).mean()) if compared.any() else None,
+        turnover=_number(1 - np.nanmean(overlap)) if periods > 1 and not np.isnan(overlap).all() else None,
+        average_holdings=_number(held.sum(axis=1).mean()),
+    )
+    if curve:
+        result["curve"] = [
+            {
+                "date": str(day), "portfolio": _number(portfolio_value), "benchmark": _number(benchmark_value),
+                "holdings": int(holdings),
+            }
+            for day, portfolio_value, benchmark_value, holdings
+            in zip(panels.dates[1:], portfolio_growth, benchmark_growth, held.sum(axis=1))
+        ]
+    return result
+
+# Panels for the variants running in this worker process
+_worker_panels: Optional[Panels] = None
+
+def _init_worker(panels: Panels):
+    global _worker_panels
+    _worker_panels = panels
+
+def _run_in_worker(variant: Variant) -> Dict[str, Any]:
+    return run_variant(_worker_panels, variant)
+
+def run_sweep(panels: Panels, variants: Sequence[Variant], workers: int = BACKTEST_WORKERS) -> List[Dict[str, Any]]:
+    """
+    Backtest many variants on the same panels, in variant order. Variants are
+    spread over a process pool; each worker receives the panels once.
+    """
+    workers = max(1, min(workers, len(variants)))
+    if workers == 1:
+        return [run_variant(panels, variant) for variant in variants]
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(panels,)) as pool:
+        return list(pool.map(_run_in_worker, variants, chunksize=max(1, len(variants) // (workers * 4))))
+
+def default_range(frequency: str, today: Optional[date] = None) -> Tuple[date, date]:
+    """BACKTEST_YEARS up to the last rebalance date before today, i.e. history that no longer changes"""
+    offset, _ = BACKTEST_FREQUENCIES[frequency]
+    yesterday = pd.Timestamp(today or date.today()) - pd.Timedelta(days=1)
+    end = pd.date_range(end=yesterday, periods=1, freq=offset)[0]
+    return (end - pd.DateOffset(years=BACKTEST_YEARS)).date(), end.date()
+
+# Results for /backtest, and the panels behind them (shared by every strategy over the same range)
+backtest_cache = LRUCache(max_entries=64)
+_panel_cache = LRUCache(max_entries=2)
+_compute_lock = threading.Lock()
+
+def cached_backtest(db: Session, strategy: str, top_n: int, frequency: str, start: date, end: date) -> Dict[str, Any]:
+    """
+    One strategy's backtest with its equity curve, cached per parameters and
+    scoring version. Ranges reaching today are only cached for the day.
+    """
+    today = date.today()
+    key = (strategy, top_n, frequency, start, end, SCORING_VERSION, today if end >= today else None)
+    hit = backtest_cache.get(key)
+    if hit is not None:
+        return hit
+
+    # One computation at a time: they are CPU bound and the panels are large
+    with _compute_lock:
+        hit = backtest_cache.get(key)
+        if hit is not None:
+            return hit
+        panel_key = (frequency, start, end, key[-1])
+        panels = _panel_cache.get(panel_key)
+        if panels is None:
+            panels = load_panels(db, start, end, frequency)
+            _panel_cache.put(panel_key, panels)
+        result = run_variant(panels, base_variant(strategy, top_n), curve=True)
+        result.update(
+            frequency=frequency, start=start.isoformat(), end=end.isoformat(),
+            symbols=len(panels.symbols), scoring_version=SCORING_VERSION,
+        )
+        backtest_cache.put(key, result)
+        return result
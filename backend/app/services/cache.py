@@ -0,0 +1,175 @@
+import asyncio
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Hashable, Iterable, NamedTuple, Optional, Tuple
+
+# Ingestion generation: bumped whenever stored stock data changes, so every
+# cached response built from an older generation is treated as stale.
+_generation = 0
+_generation_lock = threading.Lock()
+
+def current_generation() -> int:
+    return _generation
+
+def bump_generation() -> int:
+    """Mark all cached responses stale. Called after ingestion commits."""
+    global _generation
+    with _generation_lock:
+        _generation += 1
+        return _generation
+
+def make_etag(body: bytes) -> str:
+    """Strong ETag derived from the exact response bytes"""
+    return '"' + hashlib.sha1(body).hexdigest()[:20] + '"'
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Check an If-None-Match header (possibly a list, possibly weak) against an ETag"""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+class CachedResponse(NamedTuple):
+    body: bytes
+    etag: str
+    headers: Dict[str, str]
+
+
+class ResponseCache:
+    """
+    Bounded LRU of serialized response bodies, valid for one ingestion generation.
+    Concurrent misses for the same key are coalesced: one caller builds the body
+    while the others wait for it instead of querying the database themselves.
+    """
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, Tuple[int, CachedResponse]]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Concurrent misses wait on the in-flight build: holding a thread lock
+        # across an await would block the event loop
+        self._in_flight: Dict[Tuple[Hashable, int], "asyncio.Future[CachedResponse]"] = {}
+
+    def _lookup(self, key: Hashable, generation: int) -> Optional[CachedResponse]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != generation:
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def _store(self, key: Hashable, generation: int, response: CachedResponse):
+        with self._lock:
+            self._entries[key] = (generation, response)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    async def get_or_compute_async(
+        self, key: Hashable, compute: Callable[[], Awaitable[Tuple[bytes, Dict[str, str]]]]
+    ) -> CachedResponse:
+        """
+        Return the cached response for key. compute() returns (body, extra headers)
+        and is awaited at most once per generation.
+        """
+        generation = current_generation()
+        flight_key = (key, generation)
+        while True:
+            hit = self._lookup(key, generation)
+            if hit is not None:
+                return hit
+            pending = self._in_flight.get(flight_key)
+            if pending is None:
+                break
+            try:
+                return await asyncio.shield(pending)
+            except asyncio.CancelledError:
+                if not pending.cancelled():
+                    raise
+                # The request building it went away, try again
+
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[flight_key] = future
+        try:
+            body, headers = await compute()
+            response = CachedResponse(body, make_etag(body), headers)
+            self._store(key, generation, response)
+            future.set_result(response)
+            return response
+        except Exception as e:
+            future.set_exception(e)
+            # Waiters re-raise it; don't warn when there were none
+            future.exception()
+            raise
+        except BaseException:
+            future.cancel()
+            raise
+        finally:
+            self._in_flight.pop(flight_key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class LRUCache:
+    """
+    Small thread-safe LRU map with per-key invalidation. Values read from the
+    database should be put with the generation seen before the read: if an
+    ingestion commit bumped it in the meantime the value may predate that
+    write (and its invalidation), so it is dropped instead of cached.
+    Writers therefore bump the generation before invalidating keys.
+    """
+
+    _MISSING = object()
+
+    def __init__(self, max_entries: int = 2048):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, object]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default=None):
+        with self._lock:
+            value = self._entries.get(key, self._MISSING)
+            if value is self._MISSING:
+                return default
+            self._entries.move_to_end(key)
+            return value
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            return key in self._entries
+
+    def put(self, key: Hashable, value, generation: Optional[int] = None):
+        with self._lock:
+            if generation is not None and generation != current_generation():
+                return
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, keys: Iterable[Hashable]):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+# Cache for GET /stocks list bodies
+stocks_response_cache = ResponseCache()
+
+# Cache for single-stock lookups, keyed by symbol. None marks a known-missing symbol.
+stock_lookup_cache = LRUCache()
@@ -0,0 +1,116 @@
+import logging
+import os
+import threading
+from datetime import datetime, timedelta
+from typing import Optional
+from sqlalchemy import select, func
+from sqlalchemy.orm import Session
+from app.database import SessionLocal
+from app.models import Stock, TickerProgress
+from app.services.cache import bump_generation, stock_lookup_cache
+from app.services.columnar import as_naive_utc
+from app.services.leaderboard import leaderboards
+from app.services.autocomplete import symbol_index
+from app.services.change_feed import change_feed
+from app.services.scoring import STRATEGIES
+
+logger = logging.getLogger(__name__)
+
+# How often non-ingesting processes check for new data
+CACHE_SYNC_SECONDS = float(os.getenv("CACHE_SYNC_SECONDS", "5"))
+# updated_at is the writing transaction's start time, which can be well before
+# it commits, so changed rows are looked up this far behind the last poll.
+# Must exceed the longest ingestion transaction.
+CHANGE_OVERLAP = timedelta(minutes=10)
+
+def mark_data_changed(progress: TickerProgress, full: bool = False, sweep_completed: bool = False):
+    """
+    Record a data change on the progress row, inside the writer's transaction.
+    full=True tells readers every row may have changed (e.g. a rescore).
+    """
+    progress.data_version = (progress.data_version or 0) + 1
+    if full:
+        progress.full_refresh_version = progress.data_version
+    if sweep_completed:
+        progress.sweep_count = (progress.sweep_count or 0) + 1
+
+
+class CacheSynchronizer:
+    """
+    Keeps a web process's caches (response cache, lookup LRU, leaderboards)
+    in step with ingestion running in another process. Polls the version
+    counters on the progress row and, when they move, applies only the rows
+    updated since the last poll.
+    """
+
+    def __init__(self):
+        self.version: Optional[int] = None
+        self.sweep_count = 0
+        self.watermark: Optional[datetime] = None
+        self._lock = threading.Lock()
+
+    def poll(self, db: Session) -> bool:
+        """Returns True if caches were invalidated"""
+        with self._lock:
+            row = db.execute(
+                select(TickerProgress.data_version, TickerProgress.full_refresh_version, TickerProgress.sweep_count)
+                .order_by(TickerProgress.id).limit(1)
+            ).first()
+            if row is None:
+                return False
+            version, full_version, sweep_count = (value or 0 for value in row)
+            now = as_naive_utc(db.execute(select(func.now())).scalar())
+
+            if self.version is None:
+                # First poll: anything cached so far was loaded from this version
+                self.version, self.sweep_count, self.watermark = version, sweep_count, now
+                change_feed.set_baseline(version)
+                return False
+            if version == self.version:
+                return False
+
+            if full_version > self.version:
+                bump_generation()
+                stock_lookup_cache.clear()
+                leaderboards.invalidate()
+                symbol_index.invalidate()
+                change_feed.publish_reset(version)
+                changed_count = "all"
+            else:
+                score_columns = [getattr(Stock, f"{strategy}_score") for strategy in STRATEGIES]
+                rows = db.execute(
+                    select(Stock.symbol, Stock.name, Stock.price, Stock.updated_at, *score_columns)
+                    .where(Stock.updated_at >= self.watermark - CHANGE_OVERLAP)
+                ).all()
+                changed = {
+                    row[0]: {"name": row[1], "price": row[2], **{f"{strategy}_score": row[i + 4] for i, strategy in enumerate(STRATEGIES)}}
+                    for row in rows
+                }
+                bump_generation()
+                stock_lookup_cache.invalidate(changed.keys())
+                moves = leaderboards.apply_batch(changed)
+                symbol_index.apply_batch(changed)
+                # The overlap window re-reads rows already streamed; only send what is new or moved
+                recent = {row[0] for row in rows if as_naive_utc(row[3]) >= self.watermark}
+                change_feed.publish_batch(version, {symbol: changed[symbol] for symbol in changed if symbol in recent or symbol in moves}, moves)
+                changed_count = len(changed)
+
+            if sweep_count != self.sweep_count:
+                leaderboards.snapshot_ranks()
+
+            self.version, self.sweep_count, self.watermark = version, sweep_count, now
+            logger.info("🔄 Synced caches to data version %d (%s stocks changed)", version, changed_count)
+            return True
+
+
+cache_synchronizer = CacheSynchronizer()
+
+def sync_caches():
+    """Scheduler entry point for web processes"""
+    db = SessionLocal()
+    try:
+        cache_synchronizer.poll(db)
+    except Exception as e:
+        logger.exception("Error syncing caches: %s", e)
+    finally:
+        db.close()
@@ -0,0 +1,131 @@
+import asyncio
+import os
+import threading
+from collections import deque
+from typing import AsyncIterator, Deque, Dict, List, NamedTuple, Optional, Set, Tuple
+from app.services.leaderboard import RankMove
+from app.services.serialization import dumps
+
+# Deltas kept in memory for since= catch-up; older clients get a reset event
+CHANGE_FEED_SIZE = int(os.getenv("CHANGE_FEED_SIZE", "500"))
+# Comment line sent on idle streams so proxies don't time them out
+SSE_KEEPALIVE_SECONDS = float(os.getenv("SSE_KEEPALIVE_SECONDS", "15"))
+SSE_RETRY_MS = 5000
+
+
+class FeedEvent(NamedTuple):
+    """One SSE message covering data versions (previous, version]"""
+    previous: Optional[int]
+    version: int
+    message: bytes
+
+
+def _sse(version: int, event: str, data: bytes) -> bytes:
+    return b"id: %d\nevent: %s\ndata: %s\n\n" % (version, event.encode(), data)
+
+def build_delta(batch_metrics: Dict[str, Dict], moves: Dict[str, Dict[str, RankMove]]) -> List[Dict]:
+    """
+    Compact per-symbol changes: price plus, for each strategy where something
+    moved, the new score, rank and places gained (positive = moved up).
+    """
+    changes = []
+    for symbol, metrics in batch_metrics.items():
+        change = {"symbol": symbol}
+        if "price" in metrics:
+            change["price"] = metrics["price"]
+        strategies = {}
+        for strategy, move in moves.get(symbol, {}).items():
+            strategies[strategy] = {
+                "score": move.score,
+                "rank": move.rank,
+                "rank_change": (move.previous_rank - move.rank) if move.previous_rank and move.rank else None,
+            }
+        if strategies:
+            change["strategies"] = strategies
+        changes.append(change)
+    return changes
+
+
+class ChangeFeed:
+    """
+    Recent stock deltas for the /stocks/stream SSE endpoint, keyed by the
+    shared data_version on the progress row (so versions mean the same thing
+    in every process and survive reconnects to a different worker).
+
+    Published from ingestion (in-process batches) or from the cache
+    synchronizer (batches committed elsewhere), and fanned out to every
+    connected stream. Each message is serialized once, not per client.
+    """
+
+    def __init__(self, capacity: int = CHANGE_FEED_SIZE):
+        self.version: Optional[int] = None
+        self._events: Deque[FeedEvent] = deque(maxlen=capacity)
+        self._lock = threading.Lock()
+        self._waiters: Set[Tuple[asyncio.AbstractEventLoop, asyncio.Event]] = set()
+
+    def set_baseline(self, version: int):
+        """The version current data corresponds to, before anything was published"""
+        with self._lock:
+            if self.version is None:
+                self.version = version
+
+    def _append(self, version: int, event: str, payload) -> bool:
+        with self._lock:
+            # The same commit can arrive twice (ingestion here, then the cache sync poll)
+            if self.version is not None and version <= self.version:
+                return False
+            message = _sse(version, event, dumps({"version": version, **payload}))
+            self._events.append(FeedEvent(self.version, version, message))
+            self.version = version
+            waiters = list(self._waiters)
+        for loop, waiter in waiters:
+            loop.call_soon_threadsafe(waiter.set)
+        return True
+
+    def publish_batch(self, version: int, batch_metrics: Dict[str, Dict], moves: Dict[str, Dict[str, RankMove]]):
+        """Deltas for a committed batch. Safe to call from any thread."""
+        if batch_metrics:
+            self._append(version, "changes", {"changes": build_delta(batch_metrics, moves)})
+
+    def publish_reset(self, version: int):
+        """Every row may have changed (e.g. a rescore): clients should reload /stocks"""
+        self._append(version, "reset", {})
+
+    def read(self, since: Optional[int]) -> Tuple[List[bytes], Optional[int]]:
+        """Messages a client at version since is missing, and the version it is at afterwards"""
+        with self._lock:
+            if since is None or self.version is None or since == self.version:
+                return [], self.version if since is None else since
+            missed = [event for event in self._events if event.version > since]
+            # Only replay if nothing between since and the first retained delta was dropped
+            if since < self.version and missed and missed[0].previous is not None and missed[0].previous <= since:
+                return [event.message for event in missed], self.version
+            return [_sse(self.version, "reset", dumps({"version": self.version}))], self.version
+
+    async def stream(self, since: Optional[int]) -> AsyncIterator[bytes]:
+        """SSE byte stream: catch-up from since, then live deltas until the client goes away"""
+        loop = asyncio.get_running_loop()
+        waiter = asyncio.Event()
+        entry = (loop, waiter)
+        with self._lock:
+            self._waiters.add(entry)
+        try:
+            yield b"retry: %d\n\n" % SSE_RETRY_MS
+            # Without since=, start from whatever is current now
+            cursor = since if since is not None else self.version
+            while True:
+                # Clear before reading, so a publish in between still wakes us
+                waiter.clear()
+                messages, cursor = self.read(cursor)
+                for message in messages:
+                    yield message
+                try:
+                    await asyncio.wait_for(waiter.wait(), SSE_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield b": keepalive\n\n"
+        finally:
+            with self._lock:
+                self._waiters.discard(entry)
+
+
+change_feed = ChangeFeed()
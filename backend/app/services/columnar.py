@@ -0,0 +1,39 @@
+from datetime import datetime, timezone
+from typing import List, Optional, Sequence
+import pyarrow as pa
+from sqlalchemy import Column, Float, Integer, Date, DateTime
+
+def arrow_type(column: Column) -> pa.DataType:
+    """Arrow type for a model column (timestamps are naive UTC, like the rest of the app)"""
+    if isinstance(column.type, Float):
+        return pa.float64()
+    if isinstance(column.type, Integer):
+        return pa.int32()
+    if isinstance(column.type, DateTime):
+        return pa.timestamp("us")
+    if isinstance(column.type, Date):
+        return pa.date32()
+    return pa.string()
+
+def arrow_schema(columns: Sequence[Column]) -> pa.Schema:
+    """
+    Fixed schema for a list of columns, so every record batch lines up even when
+    a chunk happens to be all NULL for some column
+    """
+    return pa.schema([(column.name, arrow_type(column)) for column in columns])
+
+def as_naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """Timestamps come back aware from PostgreSQL and naive (UTC) from SQLite"""
+    if value is None or value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+def rows_to_record_batch(rows: List[Sequence], schema: pa.Schema) -> pa.RecordBatch:
+    """Transpose result tuples (in schema column order) into one Arrow record batch"""
+    columns = list(zip(*rows)) if rows else [()] * len(schema)
+    arrays = []
+    for values, field in zip(columns, schema):
+        if pa.types.is_timestamp(field.type):
+            values = [as_naive_utc(value) for value in values]
+        arrays.append(pa.array(values, type=field.type))
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
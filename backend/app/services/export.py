@@ -0,0 +1,86 @@
+import io
+from typing import Dict, Iterator, List, Optional, Tuple
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import pyarrow.parquet as pq
+from app.database import SessionLocal
+from app.models import Stock
+from app.services.columnar import arrow_schema, rows_to_record_batch
+from app.services.stock_fetcher import build_stocks_query, select_fields
+
+# Rows fetched from the server-side cursor and encoded per record batch / row group
+EXPORT_BATCH_SIZE = 5000
+
+# format -> (media type, file extension)
+EXPORT_FORMATS = {
+    "arrow": ("application/vnd.apache.arrow.stream", "arrow"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+    "csv": ("text/csv", "csv"),
+}
+
+def export_schema(selected: List[str]) -> pa.Schema:
+    return arrow_schema([Stock.__table__.c[field] for field in selected])
+
+def iter_record_batches(
+    strategy: str,
+    selected: List[str],
+    filters: Optional[Dict[str, Tuple[Optional[float], Optional[float]]]] = None,
+    industry: Optional[str] = None,
+    batch_size: int = EXPORT_BATCH_SIZE,
+) -> Iterator[pa.RecordBatch]:
+    """
+    Stream the ranked stocks table as Arrow record batches. Uses its own session
+    and a server-side cursor, so at most one batch of rows is held at a time.
+    """
+    schema = export_schema(selected)
+    query = build_stocks_query(strategy, selected, filters, industry).execution_options(yield_per=batch_size)
+    db = SessionLocal()
+    try:
+        for rows in db.execute(query).partitions():
+            yield rows_to_record_batch(rows, schema)
+    finally:
+        db.close()
+
+def _drain(sink: io.BytesIO) -> bytes:
+    """Take whatever the writer has produced so far and reset the buffer"""
+    data = sink.getvalue()
+    sink.seek(0)
+    sink.truncate()
+    return data
+
+def stream_export(
+    format: str,
+    strategy: str,
+    fields: Optional[List[str]] = None,
+    filters: Optional[Dict[str, Tuple[Optional[float], Optional[float]]]] = None,
+    industry: Optional[str] = None,
+) -> Iterator[bytes]:
+    """
+    Encode the export in the requested format chunk by chunk: Arrow IPC stream,
+    Parquet (one row group per batch) or CSV with a header row.
+    Callers should validate format and fields first: once the response has
+    started, an error can only cut it short.
+    """
+    selected = select_fields(fields, strategy)
+    schema = export_schema(selected)
+    sink = io.BytesIO()
+
+    if format == "arrow":
+        writer = pa.ipc.new_stream(sink, schema)
+    elif format == "parquet":
+        writer = pq.ParquetWriter(sink, schema, compression="zstd")
+    elif format == "csv":
+        writer = pacsv.CSVWriter(sink, schema)
+    else:
+        raise ValueError(f"Unknown export format {format}")
+
+    try:
+        for batch in iter_record_batches(strategy, selected, filters, industry):
+            writer.write_batch(batch)
+            data = _drain(sink)
+            if data:
+                yield data
+    finally:
+        # Writes the Arrow end-of-stream marker / Parquet footer
+        writer.close()
+    yield _drain(sink)
@@ -0,0 +1,34 @@
+import logging
+import os
+from datetime import datetime
+from app.services.stock_fetcher import get_stocks, INGEST_SCHEDULE
+from app.services.snapshots import run_snapshot_compaction
+from app.services.price_history import run_price_history_update
+from app.services.leader import leader_only
+
+logger = logging.getLogger(__name__)
+
+INGEST_INTERVAL_SECONDS = float(os.getenv("INGEST_INTERVAL_SECONDS", "30"))
+# "leader": one process ingests at a time. "lease": every worker ingests and
+# they split the universe between them by leasing symbols (see refresh_queue).
+INGEST_COORDINATION = os.getenv("INGEST_COORDINATION", "leader")
+
+def add_ingestion_jobs(scheduler):
+    """
+    Schedule ingestion on an APScheduler instance (the standalone worker's, or the
+    API's with RUN_INGESTION=leader). Maintenance jobs are always guarded by the
+    leader lock; get_stocks is too unless INGEST_COORDINATION=lease.
+    """
+    ingest = get_stocks
+    if INGEST_COORDINATION != "lease":
+        ingest = leader_only(get_stocks)
+    elif INGEST_SCHEDULE == "round_robin":
+        # A single shared cursor can't be split between workers
+        logger.warning("⚠️ INGEST_COORDINATION=lease needs INGEST_SCHEDULE=priority, falling back to the leader lock")
+        ingest = leader_only(get_stocks)
+
+    # coalesce/max_instances: a slow batch delays the next one instead of overlapping it
+    scheduler.add_job(ingest, "interval", seconds=INGEST_INTERVAL_SECONDS, coalesce=True, max_instances=1)
+    scheduler.add_job(leader_only(run_snapshot_compaction), "interval", hours=24) # archive old history months
+    # Daily bars and momentum indicators, first run at startup so new deployments get them
+    scheduler.add_job(leader_only(run_price_history_update), "interval", hours=24, next_run_time=datetime.now())
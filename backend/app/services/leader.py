@@ -0,0 +1,123 @@
+import functools
+import logging
+import os
+import threading
+import zlib
+from pathlib import Path
+from typing import Callable, Optional
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+from app.database import get_engine
+
+logger = logging.getLogger(__name__)
+
+try:
+    import fcntl
+except ImportError:  # Windows: no flock, an embedded database always leads
+    fcntl = None
+
+
+class LeaderLock:
+    """
+    Leader election so exactly one process runs ingestion, however many web
+    workers and replicas are up.
+
+    On PostgreSQL this is a session-level advisory lock held on a dedicated
+    connection: if the leader dies or its connection drops, PostgreSQL releases
+    the lock and the next contender to call acquire() takes over. The embedded
+    SQLite backend is single-node, so an exclusive lock on a file next to the
+    database does the same job there.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        # Advisory locks are keyed by a bigint; crc32 is stable across processes
+        self.key = zlib.crc32(name.encode())
+        self._conn: Optional[Connection] = None
+        self._lock_file = None
+        self._lock = threading.Lock()
+
+    def acquire(self) -> bool:
+        """
+        Try to become (or confirm we still are) the leader. Never blocks.
+        Called before every guarded job run.
+        """
+        with self._lock:
+            engine = get_engine()
+            if engine.dialect.name != "postgresql":
+                return self._acquire_file_lock(engine)
+
+            if self._conn is not None:
+                try:
+                    self._conn.execute(text("SELECT 1"))
+                    return True
+                except Exception as e:
+                    # The session (and with it the lock) is gone
+                    logger.warning("⚠️ Lost leader connection for %s: %s", self.name, e)
+                    self._drop_connection()
+
+            conn = engine.connect().execution_options(isolation_level="AUTOCOMMIT")
+            try:
+                acquired = conn.execute(text("SELECT pg_try_advisory_lock(:key)"), {"key": self.key}).scalar()
+            except Exception:
+                conn.close()
+                raise
+            if not acquired:
+                conn.close()
+                return False
+
+            self._conn = conn
+            logger.info("👑 Became leader for %s", self.name)
+            return True
+
+    def _acquire_file_lock(self, engine) -> bool:
+        database = engine.url.database
+        if self._lock_file is not None or fcntl is None or not database or database == ":memory:":
+            return True
+
+        lock_file = open(Path(f"{database}.{self.name}.lock"), "a")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        self._lock_file = lock_file
+        logger.info("👑 Became leader for %s", self.name)
+        return True
+
+    def _drop_connection(self):
+        try:
+            self._conn.close()
+        except Exception:
+            pass
+        self._conn = None
+
+    def release(self):
+        """Step down, e.g. on shutdown, so another instance can take over right away"""
+        with self._lock:
+            if self._conn is not None:
+                try:
+                    self._conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": self.key})
+                except Exception:
+                    pass
+                self._drop_connection()
+            if self._lock_file is not None:
+                self._lock_file.close()
+                self._lock_file = None
+
+
+# Guards get_stocks and the jobs that go with it
+ingestion_leader = LeaderLock(os.getenv("INGEST_LEADER_LOCK", "stock_ingestion"))
+
+def leader_only(job: Callable[[], object], lock: LeaderLock = ingestion_leader) -> Callable[[], None]:
+    """Wrap a scheduler job so it only runs on the instance holding the lock"""
+    @functools.wraps(job)
+    def run():
+        try:
+            if not lock.acquire():
+                return
+        except Exception as e:
+            logger.error("❌ Leader election failed for %s: %s", lock.name, e)
+            return
+        job()
+    return run
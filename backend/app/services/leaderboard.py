@@ -0,0 +1,173 @@
+import logging
+import threading
+from bisect import bisect_left, insort
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from app.models import Stock
+from app.services.scoring import STRATEGIES
+
+logger = logging.getLogger(__name__)
+
+
+class RankMove(NamedTuple):
+    """A symbol's new score and rank on one board, and its rank before the batch"""
+    score: Optional[int]
+    rank: Optional[int]
+    previous_rank: Optional[int]
+
+
+class Leaderboard:
+    """
+    Ranking of every scored symbol for one strategy, kept sorted by
+    (score desc, symbol) so top-N reads are a slice and never a sort.
+    Updates are incremental: each changed symbol is moved with one bisect.
+    """
+
+    def __init__(self, strategy: str):
+        self.strategy = strategy
+        self._keys: List[Tuple[int, str]] = []  # (-score, symbol), ascending
+        self._scores: Dict[str, int] = {}
+        self._previous_ranks: Dict[str, int] = {}  # Ranks at the end of the previous sweep
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def load(self, rows: Iterable[Tuple[str, Optional[int]]]):
+        self._scores = {symbol: int(score) for symbol, score in rows if score is not None}
+        self._keys = sorted((-score, symbol) for symbol, score in self._scores.items())
+
+    def update(self, symbol: str, score: Optional[int]):
+        old = self._scores.pop(symbol, None)
+        if old is not None:
+            index = bisect_left(self._keys, (-old, symbol))
+            if index < len(self._keys) and self._keys[index] == (-old, symbol):
+                del self._keys[index]
+        if score is not None:
+            self._scores[symbol] = int(score)
+            insort(self._keys, (-int(score), symbol))
+
+    def score(self, symbol: str) -> Optional[int]:
+        return self._scores.get(symbol)
+
+    def top(self, n: int) -> List[Tuple[str, int]]:
+        return [(symbol, -negative_score) for negative_score, symbol in self._keys[:max(n, 0)]]
+
+    def rank(self, symbol: str) -> Optional[int]:
+        """1-based rank, or None if the symbol has no score"""
+        score = self._scores.get(symbol)
+        if score is None:
+            return None
+        return bisect_left(self._keys, (-score, symbol)) + 1
+
+    def rank_change(self, symbol: str) -> Optional[int]:
+        """Places gained since the previous sweep (positive = moved up)"""
+        previous = self._previous_ranks.get(symbol)
+        current = self.rank(symbol)
+        if previous is None or current is None:
+            return None
+        return previous - current
+
+    def snapshot_ranks(self):
+        self._previous_ranks = {symbol: index + 1 for index, (_, symbol) in enumerate(self._keys)}
+
+
+class LeaderboardSet:
+    """Leaderboards for all strategies, loaded from the database on first use"""
+
+    def __init__(self):
+        self._boards: Dict[str, Leaderboard] = {strategy: Leaderboard(strategy) for strategy in STRATEGIES}
+        self._loaded = False
+        self._lock = threading.RLock()
+
+    def ensure_loaded(self, db: Session):
+        if self._loaded:
+            return
+        with self._lock:
+            if self._loaded:
+                return
+            score_columns = [getattr(Stock, f"{strategy}_score") for strategy in STRATEGIES]
+            rows = db.execute(select(Stock.symbol, *score_columns)).all()
+            for i, strategy in enumerate(STRATEGIES):
+                self._boards[strategy].load((row[0], row[i + 1]) for row in rows)
+            self._loaded = True
+            logger.info("🏆 Loaded leaderboards for %d stocks", len(rows))
+
+    def invalidate(self):
+        """Force a full reload on next use (e.g. after every score changed)"""
+        with self._lock:
+            self._loaded = False
+
+    def apply_batch(self, batch_metrics: Dict[str, Dict]) -> Dict[str, Dict[str, RankMove]]:
+        """
+        Move only the symbols in this batch. Returns {symbol: {strategy: move}}
+        for the symbols whose score or rank changed on some board. Boards whose
+        <strategy>_score isn't in a symbol's metrics are left as they are.
+        No-op (and no moves) until the boards have been loaded.
+        """
+        moves: Dict[str, Dict[str, RankMove]] = {}
+        with self._lock:
+            if not self._loaded:
+                return moves
+            for strategy, board in self._boards.items():
+                score_field = f"{strategy}_score"
+                before = {symbol: (board.score(symbol), board.rank(symbol)) for symbol in batch_metrics}
+                for symbol, metrics in batch_metrics.items():
+                    if score_field in metrics:
+                        board.update(symbol, metrics[score_field])
+                # Ranks are read after the whole batch has moved
+                for symbol, (old_score, old_rank) in before.items():
+                    score, rank = board.score(symbol), board.rank(symbol)
+                    if score != old_score or rank != old_rank:
+                        moves.setdefault(symbol, {})[strategy] = RankMove(score, rank, old_rank)
+        return moves
+
+    def snapshot_ranks(self):
+        """Record current ranks as the baseline for rank_change. Called when a sweep completes."""
+        with self._lock:
+            if not self._loaded:
+                return
+            for board in self._boards.values():
+                board.snapshot_ranks()
+
+    def top(self, db: Session, strategy: str, n: int) -> List[Tuple[str, int]]:
+        self.ensure_loaded(db)
+        with self._lock:
+            return self._boards[strategy].top(n)
+
+    def ranks(self, db: Session, symbol: str) -> Dict[str, Dict[str, Optional[int]]]:
+        self.ensure_loaded(db)
+        with self._lock:
+            return {
+                strategy: {
+                    "rank": board.rank(symbol),
+                    "rank_change": board.rank_change(symbol),
+                    "score": board.score(symbol),
+                    "total": len(board),
+                }
+                for strategy, board in self._boards.items()
+            }
+
+    def best_rank_fraction(self, db: Session, symbol: str) -> Optional[float]:
+        """Best rank across strategies as a fraction of board size (0.0 = top), None if unranked"""
+        self.ensure_loaded(db)
+        with self._lock:
+            fractions = [
+                (board.rank(symbol) - 1) / len(board)
+                for board in self._boards.values()
+                if board.rank(symbol) is not None
+            ]
+        return min(fractions) if fractions else None
+
+    def board(self, db: Session, strategy: str, n: int) -> List[Dict[str, Optional[int]]]:
+        """Top-n entries with rank and rank change"""
+        self.ensure_loaded(db)
+        with self._lock:
+            board = self._boards[strategy]
+            return [
+                {"rank": i + 1, "symbol": symbol, "score": score, "rank_change": board.rank_change(symbol)}
+                for i, (symbol, score) in enumerate(board.top(n))
+            ]
+
+
+leaderboards = LeaderboardSet()
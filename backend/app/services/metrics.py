@@ -0,0 +1,91 @@
+import os
+import threading
+import time
+from typing import Dict, Optional
+from prometheus_client import Counter, Gauge, Histogram, CONTENT_TYPE_LATEST, generate_latest, start_http_server
+from sqlalchemy import select, func
+from sqlalchemy.orm import Session
+from app.models import Stock
+from app.services.columnar import as_naive_utc
+
+# The standalone worker has no web server of its own; set this to expose its metrics
+METRICS_PORT = os.getenv("METRICS_PORT")
+# Staleness quantiles need a few sorted reads of the stocks table, so a scrape reuses them this long
+STALENESS_REFRESH_SECONDS = float(os.getenv("METRICS_STALENESS_REFRESH_SECONDS", "30"))
+STALENESS_QUANTILES = [0.5, 0.9, 0.99, 1.0]
+
+# Per-symbol ingestion phases. scoring and save run once per batch, so they
+# are observed once per batch as batch time / symbols.
+INGEST_PHASE_SECONDS = Histogram(
+    "stock_ingest_phase_seconds", "Ingestion time per symbol by phase", ["phase"],
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20),
+)
+INGEST_BATCH_SECONDS = Histogram(
+    "stock_ingest_batch_seconds", "Wall time of one ingestion batch, fetch to commit",
+    buckets=(0.5, 1, 2.5, 5, 10, 20, 30, 60, 120),
+)
+INGEST_BATCH_THROUGHPUT = Gauge("stock_ingest_batch_symbols_per_second", "Symbols saved per second in the last batch")
+INGEST_SYMBOLS = Counter("stock_ingest_symbols_total", "Symbols processed by outcome", ["outcome"])
+INGEST_ERRORS = Counter("stock_ingest_errors_total", "Provider errors by kind", ["kind"])
+
+STOCKS_STORED = Gauge("stock_data_stocks", "Stocks in the database")
+DATA_STALENESS = Gauge("stock_data_staleness_seconds", "Age of last_fetched across stored stocks", ["quantile"])
+
+REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds", "Request latency by route template", ["method", "route", "status"],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5),
+)
+
+class _StalenessSampler:
+    """Refreshes the staleness gauges from the last_fetched distribution, at most every STALENESS_REFRESH_SECONDS"""
+
+    def __init__(self):
+        self.sampled_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def sample(self, db: Session):
+        with self._lock:
+            if self.sampled_at is not None and time.monotonic() - self.sampled_at < STALENESS_REFRESH_SECONDS:
+                return
+            count = db.execute(select(func.count()).select_from(Stock).where(Stock.last_fetched.isnot(None))).scalar() or 0
+            STOCKS_STORED.set(count)
+            now = as_naive_utc(db.execute(select(func.now())).scalar())
+            for quantile in STALENESS_QUANTILES:
+                if not count:
+                    DATA_STALENESS.labels(str(quantile)).set(0)
+                    continue
+                # The q-quantile of age is the (1-q)-quantile of last_fetched, counted from the oldest
+                offset = min(count - 1, int((1 - quantile) * (count - 1)))
+                fetched = db.execute(
+                    select(Stock.last_fetched).where(Stock.last_fetched.isnot(None))
+                    .order_by(Stock.last_fetched).offset(offset).limit(1)
+                ).scalar()
+                DATA_STALENESS.labels(str(quantile)).set(max(0.0, (now - as_naive_utc(fetched)).total_seconds()))
+            self.sampled_at = time.monotonic()
+
+staleness_sampler = _StalenessSampler()
+
+def render_metrics(db: Optional[Session] = None) -> bytes:
+    """Prometheus text exposition of this process's metrics (plus data staleness if given a session)"""
+    if db is not None:
+        staleness_sampler.sample(db)
+    return generate_latest()
+
+def record_batch(saved: int, failed: int, errors: Dict[str, str], elapsed: float):
+    """Counters for one finished ingestion batch"""
+    INGEST_BATCH_SECONDS.observe(elapsed)
+    INGEST_BATCH_THROUGHPUT.set(saved / elapsed if elapsed > 0 else 0.0)
+    INGEST_SYMBOLS.labels("saved").inc(saved)
+    INGEST_SYMBOLS.labels("failed").inc(failed)
+    for kind in errors.values():
+        INGEST_ERRORS.labels(kind).inc()
+
+def observe_per_symbol(phase: str, elapsed: float, symbols: int):
+    """Spread a batch-wide phase over its symbols"""
+    if symbols:
+        INGEST_PHASE_SECONDS.labels(phase).observe(elapsed / symbols)
+
+def start_metrics_server():
+    """Serve /metrics on METRICS_PORT from a background thread, if configured"""
+    if METRICS_PORT:
+        start_http_server(int(METRICS_PORT))
@@ -0,0 +1,367 @@
+import json
+import logging
+import math
+import os
+import time
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+from app.database import SessionLocal
+from app.models import Stock
+from app.services.providers import MarketDataProvider, ProviderError, OHLCV_FIELDS, get_provider
+from app.services.scoring import rule_fields, score_frame
+from app.services.stock_fetcher import (
+    provider_guard, get_or_create_progress, PRICE_INDICATOR_FIELDS, PROVIDER_BACKPRESSURE_ERRORS,
+)
+from app.services.rescore import RESCORE_CHUNK_SIZE
+from app.services.cache import bump_generation, stock_lookup_cache
+from app.services.cache_sync import mark_data_changed
+from app.services.change_feed import change_feed
+from app.services.leaderboard import leaderboards
+
+logger = logging.getLogger(__name__)
+
+# Where the memory-mapped daily bars live (see PriceStore)
+PRICE_HISTORY_DIR = Path(os.getenv("PRICE_HISTORY_DIR", "price_history"))
+# Calendar days downloaded for a symbol the store hasn't seen yet (a year of trading days plus slack)
+PRICE_HISTORY_DAYS = int(os.getenv("PRICE_HISTORY_DAYS", "400"))
+# Trading days kept. Older rows are dropped the next time the files are rewritten.
+PRICE_HISTORY_MAX_ROWS = int(os.getenv("PRICE_HISTORY_MAX_ROWS", "1260"))
+# Symbols per provider download call
+PRICE_DOWNLOAD_BATCH = int(os.getenv("PRICE_DOWNLOAD_BATCH", "200"))
+# Recent days downloaded again on every update, to pick up late corrections
+PRICE_OVERLAP_DAYS = 5
+
+TRADING_DAYS_PER_YEAR = 252
+TRADING_DAYS_PER_MONTH = 21
+# Fewest daily returns a volatility figure is based on
+MIN_VOLATILITY_RETURNS = 63
+
+# Volume can exceed float32's exact integer range; prices don't need more
+_DTYPES = {"open": np.float32, "high": np.float32, "low": np.float32, "close": np.float32, "volume": np.float64}
+_MIN_CAPACITY = 256
+
+
+class PriceStore:
+    """
+    Daily OHLCV bars for the whole universe, one memory-mapped dates x symbols
+    array per field under PRICE_HISTORY_DIR. New trading days are appended to
+    the end of each file and new symbols take spare columns, so a daily update
+    only writes the rows it changes. Files are rewritten (under a new
+    generation) only when the spare columns run out, a date has to go in the
+    middle, or the history passes PRICE_HISTORY_MAX_ROWS.
+
+    manifest.json (dates, symbols, capacity, generation) is replaced atomically
+    after the arrays are flushed, so a crashed update leaves the previous state
+    readable. There must be a single writer; updates run under the leader lock.
+    """
+
+    def __init__(self, directory: Path = PRICE_HISTORY_DIR):
+        self.directory = Path(directory)
+        self.dates = np.array([], dtype="datetime64[D]")
+        self.symbols: List[str] = []
+        self.capacity = 0
+        self.generation = 0
+        manifest = self.directory / "manifest.json"
+        if manifest.exists():
+            with open(manifest, "r") as f:
+                state = json.load(f)
+            self.dates = np.array(state["dates"], dtype="datetime64[D]")
+            self.symbols = state["symbols"]
+            self.capacity = state["capacity"]
+            self.generation = state["generation"]
+        self._columns = {symbol: i for i, symbol in enumerate(self.symbols)}
+
+    def _path(self, field: str, generation: Optional[int] = None) -> Path:
+        return self.directory / f"{field}-{self.generation if generation is None else generation}.bin"
+
+    def _open(self, field: str, mode: str = "r") -> np.memmap:
+        return np.memmap(self._path(field), dtype=_DTYPES[field], mode=mode, shape=(len(self.dates), self.capacity))
+
+    def field(self, name: str) -> np.ndarray:
+        """Read-only dates x symbols view of one field, columns in self.symbols order"""
+        if not len(self.dates) or not self.symbols:
+            return np.empty((len(self.dates), len(self.symbols)), dtype=_DTYPES[name])
+        return self._open(name)[:, :len(self.symbols)]
+
+    def last_dates(self) -> Dict[str, date]:
+        """Date of each symbol's most recent close"""
+        last = last_close_dates(self.field("close"), self.dates)
+        return {symbol: day.item() for symbol, day in zip(self.symbols, last) if not np.isnat(day)}
+
+    def write(self, frame: pd.DataFrame):
+        """Store a provider frame (dates x (field, symbol)), replacing stored bars for the same dates"""
+        frame = frame.dropna(how="all")
+        if frame.empty:
+            return
+        index = pd.DatetimeIndex(frame.index)
+        if index.tz is not None:
+            index = index.tz_localize(None)
+        days = index.values.astype("datetime64[D]")
+        keep = ~pd.Index(days).duplicated(keep="last")
+        if len(self.dates):
+            # The store only grows forwards in time
+            keep &= days >= self.dates[0]
+        frame, days = frame[keep], days[keep]
+        if not len(days):
+            return
+
+        new_symbols = [symbol for symbol in frame.columns.get_level_values("symbol").unique() if symbol not in self._columns]
+        new_dates = np.setdiff1d(days, self.dates)
+        appends_only = not len(self.dates) or not len(new_dates) or new_dates[0] > self.dates[-1]
+        if (
+            not appends_only
+            or len(self.symbols) + len(new_symbols) > self.capacity
+            or len(self.dates) + len(new_dates) > PRICE_HISTORY_MAX_ROWS
+        ):
+            self._rewrite(np.union1d(self.dates, new_dates)[-PRICE_HISTORY_MAX_ROWS:], len(self.symbols) + len(new_symbols))
+        elif len(new_dates):
+            self._append_rows(new_dates)
+        self._add_symbols(new_symbols)
+
+        # Rows can have been trimmed by a rewrite
+        rows = np.searchsorted(self.dates, days)
+        found = (rows < len(self.dates)) & (self.dates[np.minimum(rows, len(self.dates) - 1)] == days)
+        rows = rows[found]
+        fields = set(frame.columns.get_level_values("field"))
+        for field in OHLCV_FIELDS:
+            if field not in fields:
+                continue
+            block = frame[field]
+            columns = np.array([self._columns[symbol] for symbol in block.columns])
+            values = block.to_numpy(dtype=np.float64)[found]
+            target = self._open(field, "r+")
+            cells = np.ix_(rows, columns)
+            # A missing value in the download never erases a stored one
+            target[cells] = np.where(np.isnan(values), target[cells], values)
+            target.flush()
+        self._save_manifest()
+
+    def _append_rows(self, new_dates: np.ndarray):
+        rows = len(self.dates) + len(new_dates)
+        for field in OHLCV_FIELDS:
+            path = self._path(field)
+            with open(path, "r+b") as f:
+                # Also cuts off rows a crashed update wrote past the manifest
+                f.truncate(rows * self.capacity * np.dtype(_DTYPES[field]).itemsize)
+            array = np.memmap(path, dtype=_DTYPES[field], mode="r+", shape=(rows, self.capacity))
+            array[len(self.dates):] = np.nan
+            array.flush()
+        self.dates = np.concatenate([self.dates, new_dates])
+
+    def _add_symbols(self, symbols: List[str]):
+        if not symbols:
+            return
+        start = len(self.symbols)
+        for field in OHLCV_FIELDS:
+            # Spare columns may hold bars a crashed update wrote for another symbol
+            array = self._open(field, "r+")
+            array[:, start:start + len(symbols)] = np.nan
+            array.flush()
+        self.symbols = self.symbols + symbols
+        self._columns.update((symbol, start + i) for i, symbol in enumerate(symbols))
+
+    def _rewrite(self, dates: np.ndarray, symbol_count: int):
+        capacity = max(self.capacity, _MIN_CAPACITY)
+        while capacity < symbol_count:
+            capacity *= 2
+        generation = self.generation + 1
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+        # Where the old rows land on the new date axis (trimmed rows fall off)
+        old_rows = np.searchsorted(dates, self.dates)
+        kept = (old_rows < len(dates)) & (dates[np.minimum(old_rows, len(dates) - 1)] == self.dates)
+        for field in OHLCV_FIELDS:
+            target = np.memmap(self._path(field, generation), dtype=_DTYPES[field], mode="w+", shape=(len(dates), capacity))
+            target[:] = np.nan
+            if kept.any() and self.symbols:
+                target[old_rows[kept], :len(self.symbols)] = self.field(field)[kept]
+            target.flush()
+            del target
+
+        previous = self.generation
+        self.dates, self.capacity, self.generation = dates, capacity, generation
+        self._save_manifest()
+        for field in OHLCV_FIELDS:
+            self._path(field, previous).unlink(missing_ok=True)
+        logger.info("🗜️ Rewrote price store: %d days x %d symbol columns", len(dates), capacity)
+
+    def _save_manifest(self):
+        state = {
+            "generation": self.generation,
+            "capacity": self.capacity,
+            "symbols": self.symbols,
+            "dates": self.dates.astype(str).tolist(),
+        }
+        temporary = self.directory / "manifest.json.tmp"
+        with open(temporary, "w") as f:
+            json.dump(state, f)
+        os.replace(temporary, self.directory / "manifest.json")
+
+
+def last_close_dates(close: np.ndarray, dates: np.ndarray) -> np.ndarray:
+    """Date of the last non-NaN close in each column of a dates x symbols array (NaT if none)"""
+    has_close = ~np.isnan(close)
+    seen = has_close.any(axis=0)
+    last = np.full(close.shape[1], np.datetime64("NaT"), dtype="datetime64[D]")
+    if seen.any():
+        last_rows = len(dates) - 1 - np.argmax(has_close[::-1], axis=0)
+        last[seen] = dates[last_rows[seen]]
+    return last
+
+def rolling_indicators(close: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    The momentum indicators at every date of a dates x symbols close array,
+    each row using only closes up to that date, for the whole universe in one
+    pass. Gaps (halts, holidays on one exchange) are carried forward. A value
+    is NaN where the symbol lacks the history for it.
+    """
+    close = pd.DataFrame(close, dtype=np.float64).ffill()
+    with np.errstate(invalid="ignore", divide="ignore"):
+        returns = np.log(close).diff()
+    volatility = returns.rolling(TRADING_DAYS_PER_YEAR, min_periods=MIN_VOLATILITY_RETURNS).std() * math.sqrt(TRADING_DAYS_PER_YEAR)
+    return {
+        "return_12_1m": (close.shift(TRADING_DAYS_PER_MONTH) / close.shift(TRADING_DAYS_PER_YEAR) - 1).to_numpy(),
+        # Moving averages need a close on every day of the window
+        "sma_50": close.rolling(50).mean().to_numpy(),
+        "sma_200": close.rolling(200).mean().to_numpy(),
+        "volatility": volatility.to_numpy(),
+    }
+
+def compute_indicators(close: np.ndarray, dates: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    The indicators as of the last row of a dates x symbols close array, plus
+    prices_as_of: the date of each symbol's last close.
+    """
+    if len(close):
+        indicators = {name: values[-1] for name, values in rolling_indicators(close).items()}
+    else:
+        indicators = {name: np.full(close.shape[1], np.nan) for name in PRICE_INDICATOR_FIELDS}
+    indicators["prices_as_of"] = last_close_dates(close, dates)
+    return indicators
+
+def _download_groups(symbols: List[str], last_dates: Dict[str, date], today: date) -> List[Tuple[date, List[str]]]:
+    """(start, symbols) download calls: a full backfill for new symbols, the last few days for the rest"""
+    backfill_start = today - timedelta(days=PRICE_HISTORY_DAYS)
+    by_start: Dict[date, List[str]] = {}
+    for symbol in symbols:
+        last = last_dates.get(symbol)
+        start = backfill_start if last is None else max(backfill_start, last - timedelta(days=PRICE_OVERLAP_DAYS))
+        by_start.setdefault(start, []).append(symbol)
+    return [
+        (start, group[i:i + PRICE_DOWNLOAD_BATCH])
+        for start, group in sorted(by_start.items())
+        for i in range(0, len(group), PRICE_DOWNLOAD_BATCH)
+    ]
+
+def save_indicators(db: Session, store: PriceStore, symbols: List[str]) -> int:
+    """
+    Write the indicators for the given stocks and rescore momentum, the only
+    strategy that reads them, in one transaction. Rows whose indicators didn't
+    move are left alone. Caches, leaderboards and the change feed then get
+    just the changed symbols, like an ingestion batch. Returns rows written.
+    """
+    indicators = compute_indicators(store.field("close"), store.dates)
+    position = {symbol: i for i, symbol in enumerate(store.symbols)}
+    fields = rule_fields()
+    columns = [Stock.symbol, Stock.momentum_score, Stock.prices_as_of] + [getattr(Stock, field) for field in fields]
+    records: List[Dict[str, Any]] = []
+    scores: Dict[str, Dict[str, Any]] = {}
+    stored = [symbol for symbol in symbols if symbol in position]
+    for start in range(0, len(stored), RESCORE_CHUNK_SIZE):
+        rows = db.execute(select(*columns).where(Stock.symbol.in_(stored[start:start + RESCORE_CHUNK_SIZE]))).all()
+        frame = pd.DataFrame(rows, columns=["symbol", "momentum_score", "prices_as_of"] + fields)
+        columns_at = frame["symbol"].map(position).to_numpy()
+
+        changed = np.zeros(len(frame), dtype=bool)
+        for field in PRICE_INDICATOR_FIELDS:
+            old = pd.to_numeric(frame[field], errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+            new = indicators[field][columns_at].astype(np.float64)
+            changed |= ~((old == new) | (np.isnan(old) & np.isnan(new)))
+            frame[field] = new
+        as_of = [None if np.isnat(value) else value.item() for value in indicators["prices_as_of"][columns_at]]
+        changed |= np.array([old != new for old, new in zip(frame["prices_as_of"], as_of)], dtype=bool)
+        momentum = score_frame(frame, ["momentum"])["momentum_score"].tolist()
+
+        for i in np.flatnonzero(changed):
+            symbol = frame["symbol"].iat[i]
+            record: Dict[str, Any] = {"symbol": symbol, "prices_as_of": as_of[i], "momentum_score": momentum[i]}
+            for field in PRICE_INDICATOR_FIELDS:
+                value = float(frame[field].iat[i])
+                record[field] = value if math.isfinite(value) else None
+            records.append(record)
+            if momentum[i] != frame["momentum_score"].iat[i]:
+                scores[symbol] = {"momentum_score": momentum[i]}
+
+    if not records:
+        db.commit()
+        return 0
+    for start in range(0, len(records), RESCORE_CHUNK_SIZE):
+        db.execute(update(Stock), records[start:start + RESCORE_CHUNK_SIZE])
+    progress = get_or_create_progress(db)
+    mark_data_changed(progress)
+    version = progress.data_version
+    db.commit()
+
+    bump_generation()
+    stock_lookup_cache.invalidate(record["symbol"] for record in records)
+    moves = leaderboards.apply_batch(scores)
+    change_feed.publish_batch(version, scores, moves)
+    return len(records)
+
+def update_price_history(
+    db: Session, provider: Optional[MarketDataProvider] = None, store: Optional[PriceStore] = None
+) -> Dict[str, Any]:
+    """
+    Download new daily bars for every stored stock (many symbols per provider
+    call), recompute the indicators for the whole universe from the price
+    store, write them to the stocks table and rescore momentum where they moved.
+    """
+    started = time.monotonic()
+    provider = provider or get_provider()
+    store = store or PriceStore()
+    symbols = list(db.execute(select(Stock.symbol).order_by(Stock.symbol)).scalars())
+    # Don't sit in an open transaction during the downloads
+    db.commit()
+
+    downloaded = 0
+    failed = 0
+    for start, chunk in _download_groups(symbols, store.last_dates(), date.today()):
+        try:
+            frame = provider_guard.call(provider, provider.get_price_history, chunk, start)
+        except ProviderError as e:
+            failed += len(chunk)
+            logger.warning("Error downloading price history for %d symbols (%s): %s", len(chunk), e.kind, e)
+            if e.kind in PROVIDER_BACKPRESSURE_ERRORS:
+                # Whatever was stored so far still gets its indicators
+                break
+            continue
+        store.write(frame)
+        downloaded += frame.columns.get_level_values("symbol").nunique()
+
+    updated = save_indicators(db, store, symbols)
+
+    elapsed = time.monotonic() - started
+    logger.info(
+        "📈 Price history: %d/%d symbols downloaded, indicators for %d stocks, %d trading days stored in %.1fs",
+        downloaded, len(symbols), updated, len(store.dates), elapsed,
+    )
+    return {
+        "symbols": len(symbols), "downloaded": downloaded, "failed": failed, "indicators": updated,
+        "days": len(store.dates), "elapsed_seconds": round(elapsed, 3),
+    }
+
+def run_price_history_update():
+    """Scheduler entry point: daily price history update with its own session"""
+    db = SessionLocal()
+    try:
+        update_price_history(db)
+    except Exception as e:
+        logger.exception("Error updating price history: %s", e)
+        db.rollback()
+    finally:
+        db.close()
@@ -0,0 +1,152 @@
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+from app.services.providers import (
+    MarketDataProvider, ProviderError, ProviderThrottledError, SymbolNotFoundError, ProviderTransientError
+)
+from app.services.rate_limiter import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+# AIMD tuning: add RATE_INCREASE req/s after each healthy call, multiply by
+# RATE_DECREASE on a throttle, and ease off gently when latency exceeds the target.
+RATE_MIN = float(os.getenv("INGEST_RATE_MIN", "0.2"))
+RATE_INCREASE = float(os.getenv("INGEST_RATE_INCREASE", "0.05"))
+RATE_DECREASE = 0.5
+LATENCY_TARGET = float(os.getenv("INGEST_LATENCY_TARGET", "3"))  # Seconds per provider call
+LATENCY_DECREASE = 0.9
+
+# Circuit breaker: open after this many throttles in a row, stay open for the
+# cooldown, then let one probe through. Each failed probe doubles the cooldown.
+BREAKER_THRESHOLD = int(os.getenv("BREAKER_THRESHOLD", "3"))
+BREAKER_COOLDOWN = float(os.getenv("BREAKER_COOLDOWN_SECONDS", "300"))
+BREAKER_MAX_COOLDOWN = float(os.getenv("BREAKER_MAX_COOLDOWN_SECONDS", "3600"))
+
+
+class CircuitOpenError(ProviderError):
+    """Raised instead of calling the provider while the breaker is open"""
+    kind = "circuit_open"
+
+
+class ProviderGuard:
+    """
+    Wraps every provider call: waits on the token bucket, classifies failures,
+    adapts the request rate AIMD-style and trips a circuit breaker when the
+    provider keeps throttling us.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, limiter: TokenBucket, max_rate: Optional[float] = None):
+        self.limiter = limiter
+        self.max_rate = max_rate if max_rate is not None else limiter.rate
+        # A limiter that starts disabled (rate 0) stays disabled: adapting would switch throttling on
+        self._limiting = limiter.rate > 0
+        self.state = self.CLOSED
+        self.cooldown = BREAKER_COOLDOWN
+        self.opened_at = 0.0
+        self.consecutive_throttles = 0
+        self.error_counts: Dict[str, int] = {}
+        self._in_flight: Dict[int, float] = {}  # Thread id -> start of its current provider call
+        self._lock = threading.Lock()
+
+    @property
+    def adaptive(self) -> bool:
+        return self._limiting and self.max_rate > 0
+
+    def _record_success(self, latency: float):
+        with self._lock:
+            self.consecutive_throttles = 0
+            if not self.adaptive:
+                return
+            if latency > LATENCY_TARGET:
+                rate = max(RATE_MIN, self.limiter.rate * LATENCY_DECREASE)
+            else:
+                rate = min(self.max_rate, self.limiter.rate + RATE_INCREASE)
+            self.limiter.set_rate(rate)
+
+    def _record_failure(self, kind: str):
+        with self._lock:
+            self.error_counts[kind] = self.error_counts.get(kind, 0) + 1
+            if kind != "throttled":
+                return
+            self.consecutive_throttles += 1
+            if self.adaptive:
+                self.limiter.set_rate(max(RATE_MIN, self.limiter.rate * RATE_DECREASE))
+            if self.consecutive_throttles >= BREAKER_THRESHOLD and self.state == self.CLOSED:
+                self._open()
+
+    def _open(self):
+        self.state = self.OPEN
+        self.opened_at = time.monotonic()
+        logger.warning("🚨 Provider circuit breaker opened for %.0fs", self.cooldown)
+
+    def call(self, provider: MarketDataProvider, fn: Callable[..., Any], *args) -> Any:
+        """Run one provider call under rate limiting and error classification"""
+        if self.state == self.OPEN:
+            raise CircuitOpenError("Provider circuit breaker is open")
+        if provider.rate_limited:
+            # Wait for a token, giving up as soon as the breaker trips
+            while not self.limiter.acquire(timeout=1.0):
+                if self.state == self.OPEN:
+                    raise CircuitOpenError("Provider circuit breaker is open")
+            if self.state == self.OPEN:
+                raise CircuitOpenError("Provider circuit breaker is open")
+
+        thread_id = threading.get_ident()
+        started = time.monotonic()
+        self._in_flight[thread_id] = started
+        try:
+            result = fn(*args)
+        except Exception as e:
+            kind = provider.classify_error(e)
+            self._record_failure(kind)
+            if isinstance(e, ProviderError):
+                raise
+            error = {"throttled": ProviderThrottledError, "not_found": SymbolNotFoundError}.get(kind, ProviderTransientError)
+            raise error(str(e)) from e
+        finally:
+            self._in_flight.pop(thread_id, None)
+
+        self._record_success(time.monotonic() - started)
+        return result
+
+    def call_started(self, thread_id: int) -> Optional[float]:
+        """Monotonic start time of the provider call running on a thread, if any"""
+        return self._in_flight.get(thread_id)
+
+    def allow_batch(self, provider: MarketDataProvider, probe_symbol: Optional[str]) -> bool:
+        """
+        Called before each scheduler run. While open, skip the run until the
+        cooldown elapses, then probe with a single symbol to decide whether to close.
+        """
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if time.monotonic() - self.opened_at < self.cooldown:
+                return False
+            self.state = self.HALF_OPEN
+
+        try:
+            if probe_symbol is not None:
+                self.call(provider, provider.get_info, probe_symbol)
+        except SymbolNotFoundError:
+            # The provider answered, it just doesn't know this symbol
+            pass
+        except ProviderError as e:
+            with self._lock:
+                self.cooldown = min(self.cooldown * 2, BREAKER_MAX_COOLDOWN)
+                self._open()
+            logger.warning("🚨 Provider probe failed (%s), keeping circuit open", e.kind)
+            return False
+
+        with self._lock:
+            self.state = self.CLOSED
+            self.cooldown = BREAKER_COOLDOWN
+            self.consecutive_throttles = 0
+        logger.info("✅ Provider probe succeeded, circuit breaker closed")
+        return True
@@ -0,0 +1,374 @@
+import logging
+import os
+import json
+import random
+import threading
+import time
+import zlib
+from abc import ABC, abstractmethod
+from pathlib import Path
+from datetime import date
+from typing import Dict, Any, List, Optional
+import numpy as np
+import pandas as pd
+import yfinance as yf
+from yfinance.exceptions import YFRateLimitError, YFTickerMissingError
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+MARKET_DATA_PROVIDER = os.getenv("MARKET_DATA_PROVIDER", "yfinance")  # "yfinance", "replay" or "synthetic"
+REPLAY_DATA_DIR = os.getenv("REPLAY_DATA_DIR", "replay_data")
+SYNTHETIC_LATENCY_MS = float(os.getenv("SYNTHETIC_LATENCY_MS", "50"))  # Simulated round trip per call
+SYNTHETIC_EPOCH = "2018-01-01"  # First day of synthetic price history
+
+# Daily bar fields, in the order price history frames and the price store use
+OHLCV_FIELDS = ["open", "high", "low", "close", "volume"]
+
+
+class ProviderError(Exception):
+    """Base class for classified provider failures"""
+    kind = "transient"
+
+
+class ProviderThrottledError(ProviderError):
+    """The provider is rate limiting us (HTTP 429 or equivalent)"""
+    kind = "throttled"
+
+
+class SymbolNotFoundError(ProviderError):
+    """The provider does not know the symbol (delisted, renamed, ...)"""
+    kind = "not_found"
+
+
+class ProviderTransientError(ProviderError):
+    """Network hiccup, timeout, 5xx or anything else worth retrying later"""
+    kind = "transient"
+
+
+def classify_error_message(message: str) -> str:
+    """Best-effort classification from an exception message"""
+    message = message.lower()
+    if "429" in message or "too many requests" in message or "rate limit" in message:
+        return "throttled"
+    if "404" in message or "not found" in message or "delisted" in message:
+        return "not_found"
+    return "transient"
+
+
+class MarketDataProvider(ABC):
+    """Source of the raw per-symbol payloads that ingestion turns into metrics"""
+
+    name = "base"
+    rate_limited = True  # Whether calls should go through the ingestion rate limiter
+
+    def prefetch(self, symbols: List[str]):
+        """Hint that a batch of symbols is about to be read. Providers may batch requests here."""
+
+    def release(self, symbols: List[str]):
+        """Drop any per-symbol state kept for a finished batch"""
+
+    def classify_error(self, error: Exception) -> str:
+        """Map a raised exception to "throttled", "not_found" or "transient" """
+        if isinstance(error, ProviderError):
+            return error.kind
+        return classify_error_message(str(error))
+
+    @abstractmethod
+    def get_info(self, symbol: str) -> Dict[str, Any]:
+        """Return the quote/summary `info` dict for a symbol"""
+
+    @abstractmethod
+    def get_financials(self, symbol: str) -> pd.DataFrame:
+        """Return annual financial statements (line items x period end dates, newest first)"""
+
+    @abstractmethod
+    def get_price_history(self, symbols: List[str], start: date) -> pd.DataFrame:
+        """
+        Daily OHLCV bars from start to today for many symbols in one call: dates
+        x (field, symbol) columns, fields as in OHLCV_FIELDS. Symbols without
+        data are simply missing.
+        """
+
+
+def _ohlcv_frame(frames: Dict[str, pd.DataFrame]) -> pd.DataFrame:
+    """Combine per-symbol frames (dates x OHLCV_FIELDS) into one dates x (field, symbol) frame"""
+    frames = {symbol: frame for symbol, frame in frames.items() if not frame.empty}
+    if not frames:
+        return pd.DataFrame(columns=pd.MultiIndex.from_tuples([], names=["field", "symbol"]))
+    combined = pd.concat(frames, axis=1, names=["symbol", "field"])
+    return combined.swaplevel(axis=1).sort_index(axis=1)
+
+
+class YFinanceProvider(MarketDataProvider):
+    """Live Yahoo Finance provider that reuses one Ticker object per symbol"""
+
+    name = "yfinance"
+
+    def __init__(self):
+        self._tickers: Dict[str, yf.Ticker] = {}
+        self._lock = threading.Lock()
+
+    def prefetch(self, symbols: List[str]):
+        with self._lock:
+            missing = [s for s in symbols if s not in self._tickers]
+        if not missing:
+            return
+        # yf.Tickers builds all Ticker objects on one shared session (cookie + crumb)
+        tickers = yf.Tickers(" ".join(missing)).tickers
+        with self._lock:
+            for symbol in missing:
+                ticker = tickers.get(symbol) or tickers.get(symbol.upper())
+                if ticker is not None:
+                    self._tickers[symbol] = ticker
+
+    def release(self, symbols: List[str]):
+        with self._lock:
+            for symbol in symbols:
+                self._tickers.pop(symbol, None)
+
+    def _ticker(self, symbol: str) -> yf.Ticker:
+        with self._lock:
+            ticker = self._tickers.get(symbol)
+            if ticker is None:
+                ticker = yf.Ticker(symbol)
+                self._tickers[symbol] = ticker
+            return ticker
+
+    def classify_error(self, error: Exception) -> str:
+        if isinstance(error, YFRateLimitError):
+            return "throttled"
+        if isinstance(error, YFTickerMissingError):
+            return "not_found"
+        return super().classify_error(error)
+
+    def get_info(self, symbol: str) -> Dict[str, Any]:
+        return self._ticker(symbol).info
+
+    def get_financials(self, symbol: str) -> pd.DataFrame:
+        return self._ticker(symbol).financials
+
+    def get_price_history(self, symbols: List[str], start: date) -> pd.DataFrame:
+        # One download request covers the whole symbol list
+        frame = yf.download(
+            symbols, start=start.isoformat(), interval="1d", auto_adjust=True,
+            group_by="column", threads=True, progress=False, multi_level_index=True,
+        )
+        if frame is None or frame.empty:
+            return _ohlcv_frame({})
+        frame = frame.rename(columns=str.lower, level=0)
+        frame = frame.loc[:, frame.columns.get_level_values(0).isin(OHLCV_FIELDS)]
+        frame.columns = frame.columns.set_names(["field", "symbol"])
+        # Symbols yfinance couldn't find come back as all-NaN columns
+        return frame.dropna(axis=1, how="all").sort_index(axis=1)
+
+
+def _financials_to_json(financials: pd.DataFrame) -> Dict[str, Dict[str, Any]]:
+    """Serialize a financials frame as {line item: {period end ISO date: value}}"""
+    if financials is None or financials.empty:
+        return {}
+    result = {}
+    for line_item, row in financials.iterrows():
+        result[str(line_item)] = {
+            pd.Timestamp(period).date().isoformat(): (None if pd.isna(value) else float(value))
+            for period, value in row.items()
+        }
+    return result
+
+
+def _prices_to_json(frame: pd.DataFrame) -> Dict[str, List[Optional[float]]]:
+    """Serialize one symbol's bars as {ISO date: [open, high, low, close, volume]}"""
+    return {
+        pd.Timestamp(day).date().isoformat(): [None if pd.isna(value) else float(value) for value in row]
+        for day, row in zip(frame.index, frame[OHLCV_FIELDS].to_numpy())
+    }
+
+
+def _prices_from_json(payload: Dict[str, List[Optional[float]]]) -> pd.DataFrame:
+    """Inverse of _prices_to_json"""
+    if not payload:
+        return pd.DataFrame(columns=OHLCV_FIELDS)
+    frame = pd.DataFrame.from_dict(payload, orient="index", columns=OHLCV_FIELDS).astype(float)
+    frame.index = pd.to_datetime(frame.index)
+    return frame.sort_index()
+
+
+def _financials_from_json(payload: Dict[str, Dict[str, Any]]) -> pd.DataFrame:
+    """Inverse of _financials_to_json, returning columns newest first like yfinance"""
+    if not payload:
+        return pd.DataFrame()
+    frame = pd.DataFrame.from_dict(payload, orient="index")
+    frame.columns = pd.to_datetime(frame.columns)
+    return frame.sort_index(axis=1, ascending=False).astype(float)
+
+
+class ReplayProvider(MarketDataProvider):
+    """
+    Serves recorded payloads from disk, one `<SYMBOL>.json` file per symbol
+    holding {"info": {...}, "financials": {...}, "prices": {...}}. Unknown
+    symbols behave like delisted tickers: empty info, financials and prices.
+    """
+
+    name = "replay"
+    rate_limited = False
+
+    def __init__(self, directory: str = REPLAY_DATA_DIR):
+        self.directory = Path(directory)
+
+    def _load(self, symbol: str) -> Dict[str, Any]:
+        path = self.directory / f"{symbol}.json"
+        try:
+            with open(path, "r") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+    def get_info(self, symbol: str) -> Dict[str, Any]:
+        return self._load(symbol).get("info") or {}
+
+    def get_financials(self, symbol: str) -> pd.DataFrame:
+        return _financials_from_json(self._load(symbol).get("financials") or {})
+
+    def get_price_history(self, symbols: List[str], start: date) -> pd.DataFrame:
+        frames = {}
+        for symbol in symbols:
+            prices = _prices_from_json(self._load(symbol).get("prices") or {})
+            frames[symbol] = prices[prices.index >= pd.Timestamp(start)]
+        return _ohlcv_frame(frames)
+
+
+class RecordingProvider(MarketDataProvider):
+    """Wraps another provider and writes every payload it serves in ReplayProvider format"""
+
+    name = "recording"
+
+    def __init__(self, inner: MarketDataProvider, directory: str = REPLAY_DATA_DIR):
+        self.inner = inner
+        self.rate_limited = inner.rate_limited
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+
+    def prefetch(self, symbols: List[str]):
+        self.inner.prefetch(symbols)
+
+    def classify_error(self, error: Exception) -> str:
+        return self.inner.classify_error(error)
+
+    def release(self, symbols: List[str]):
+        self.inner.release(symbols)
+
+    def _update(self, symbol: str, key: str, value: Any, merge: bool = False):
+        path = self.directory / f"{symbol}.json"
+        with self._lock:
+            payload = {}
+            if path.exists():
+                with open(path, "r") as f:
+                    payload = json.load(f)
+            if merge:
+                value = {**(payload.get(key) or {}), **value}
+            payload[key] = value
+            with open(path, "w") as f:
+                json.dump(payload, f, default=str)
+
+    def get_info(self, symbol: str) -> Dict[str, Any]:
+        info = self.inner.get_info(symbol)
+        self._update(symbol, "info", info)
+        return info
+
+    def get_financials(self, symbol: str) -> pd.DataFrame:
+        financials = self.inner.get_financials(symbol)
+        self._update(symbol, "financials", _financials_to_json(financials))
+        return financials
+
+    def get_price_history(self, symbols: List[str], start: date) -> pd.DataFrame:
+        frame = self.inner.get_price_history(symbols, start)
+        # Bars accumulate across calls, so incremental downloads extend the recording
+        for symbol in frame.columns.get_level_values("symbol").unique():
+            self._update(symbol, "prices", _prices_to_json(frame.xs(symbol, axis=1, level="symbol")), merge=True)
+        return frame
+
+
+class SyntheticProvider(MarketDataProvider):
+    """
+    Made-up but plausible data for any symbol, for load tests and local
+    multi-worker runs. Values are seeded by the symbol so every call (and every
+    process) sees the same numbers; each call sleeps latency_ms to stand in for
+    the network.
+    """
+
+    name = "synthetic"
+    rate_limited = False
+
+    def __init__(self, latency_ms: float = SYNTHETIC_LATENCY_MS):
+        self.latency = latency_ms / 1000
+
+    def _rng(self, symbol: str) -> random.Random:
+        if self.latency > 0:
+            time.sleep(self.latency)
+        return random.Random(zlib.crc32(symbol.encode()))
+
+    def get_info(self, symbol: str) -> Dict[str, Any]:
+        rng = self._rng(symbol)
+        return {
+            "shortName": f"{symbol} Corp",
+            "currentPrice": round(rng.uniform(2, 500), 2),
+            "trailingPE": rng.uniform(-20, 80),
+            "priceToSalesTrailing12Months": rng.uniform(0.2, 20),
+            "priceToBook": rng.uniform(0.3, 15),
+            "trailingPegRatio": rng.uniform(0.2, 4),
+            "returnOnEquity": rng.uniform(-0.3, 0.5),
+            "dividendYield": rng.choice([None, rng.uniform(0, 6)]),
+            "freeCashflow": rng.uniform(-1e9, 1e10),
+            "revenueGrowth": rng.uniform(-0.3, 0.6),
+            "earningsGrowth": rng.uniform(-0.5, 1.0),
+            "debtToEquity": rng.uniform(0, 300),
+            "averageAnalystRating": f"{rng.uniform(1, 5):.1f} - {rng.choice(['Buy', 'Hold', 'Sell'])}",
+            "industry": rng.choice(["Software", "Banks", "Utilities", "Biotechnology", "Retail", "Oil & Gas"]),
+        }
+
+    def get_financials(self, symbol: str) -> pd.DataFrame:
+        rng = self._rng(symbol)
+        revenue = rng.uniform(1e8, 1e11)
+        periods = pd.to_datetime([f"{year}-12-31" for year in range(2024, 2020, -1)])
+        revenues = [revenue * (1 + rng.uniform(-0.1, 0.3)) ** -i for i in range(len(periods))]
+        return pd.DataFrame([revenues], index=["Total Revenue"], columns=periods)
+
+    def _bars(self, symbol: str, days: pd.DatetimeIndex) -> pd.DataFrame:
+        """A random walk over business days since SYNTHETIC_EPOCH, so a date's bar never depends on start"""
+        rng = np.random.default_rng(zlib.crc32(symbol.encode()))
+        drift, volatility = rng.uniform(-0.0005, 0.001), rng.uniform(0.01, 0.035)
+        close = rng.uniform(5, 400) * np.exp(np.cumsum(rng.normal(drift, volatility, len(days))))
+        spread = np.abs(rng.normal(0, volatility / 2, (2, len(days))))
+        return pd.DataFrame({
+            "open": close * np.exp(rng.normal(0, volatility / 4, len(days))),
+            "high": close * (1 + spread[0]),
+            "low": close * (1 - spread[1]),
+            "close": close,
+            "volume": np.round(rng.lognormal(13, 1, len(days))),
+        }, index=days)
+
+    def get_price_history(self, symbols: List[str], start: date) -> pd.DataFrame:
+        if self.latency > 0:
+            time.sleep(self.latency)
+        days = pd.bdate_range(SYNTHETIC_EPOCH, pd.Timestamp.today().normalize())
+        return _ohlcv_frame({symbol: self._bars(symbol, days)[days >= pd.Timestamp(start)] for symbol in symbols})
+
+
+_provider: Optional[MarketDataProvider] = None
+
+
+def get_provider() -> MarketDataProvider:
+    """Return the process-wide provider selected by MARKET_DATA_PROVIDER"""
+    global _provider
+    if _provider is None:
+        if MARKET_DATA_PROVIDER == "replay":
+            _provider = ReplayProvider(REPLAY_DATA_DIR)
+        elif MARKET_DATA_PROVIDER == "synthetic":
+            _provider = SyntheticProvider()
+        else:
+            _provider = YFinanceProvider()
+        logger.info("📡 Using market data provider: %s", _provider.name)
+    return _provider
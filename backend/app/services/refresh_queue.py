@@ -0,0 +1,244 @@
+import logging
+import os
+import socket
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+from sqlalchemy import select, update, func, or_
+from sqlalchemy.orm import Session
+from app.database import SessionLocal, upsert_insert
+from app.models import SymbolRefreshState
+from app.services.columnar import as_naive_utc
+from app.services.leaderboard import leaderboards
+
+logger = logging.getLogger(__name__)
+
+# How soon a successfully refreshed symbol may be fetched again. Highly ranked
+# symbols get a proportionally shorter interval (see _importance).
+MIN_REFRESH_INTERVAL = timedelta(hours=float(os.getenv("REFRESH_MIN_INTERVAL_HOURS", "2")))
+# Exponential backoff for symbols that error out or return empty info
+BACKOFF_BASE = timedelta(minutes=float(os.getenv("REFRESH_BACKOFF_BASE_MINUTES", "30")))
+BACKOFF_MAX = timedelta(days=float(os.getenv("REFRESH_BACKOFF_MAX_DAYS", "7")))
+# Never-fetched symbols are treated as this stale so they are picked up early
+NEVER_FETCHED_STALENESS = timedelta(days=30)
+# Upper bound on due rows considered per batch
+MAX_CANDIDATES = 5000
+# Rounds of leasing per claim. A round only falls short when another worker
+# leased some of the same symbols first; the next round tries the runners-up.
+CLAIM_ATTEMPTS = 3
+# Weight of leaderboard position: the top-ranked symbol is (1 + IMPORTANCE_BOOST) times as urgent
+IMPORTANCE_BOOST = 4.0
+# Claimed symbols belong to one worker until the lease expires. The heartbeat
+# keeps extending it while the batch is being fetched, so only a worker that
+# died or hung loses its symbols to the others.
+LEASE_DURATION = timedelta(seconds=float(os.getenv("INGEST_LEASE_SECONDS", "120")))
+LEASE_HEARTBEAT_SECONDS = LEASE_DURATION.total_seconds() / 3
+# Identifies this process in lease_owner
+WORKER_ID = os.getenv("INGEST_WORKER_ID") or f"{socket.gethostname()}:{os.getpid()}"
+
+def _importance(db: Session, symbol: str) -> float:
+    """1.0 for unranked symbols, up to 1 + IMPORTANCE_BOOST for the best-ranked one"""
+    best = leaderboards.best_rank_fraction(db, symbol)
+    if best is None:
+        return 1.0
+    return 1.0 + IMPORTANCE_BOOST * (1.0 - best)
+
+def sync_universe(db: Session, tickers: List[str]):
+    """Make sure every ticker has a refresh state row (new tickers are due immediately)"""
+    known = db.execute(select(func.count()).select_from(SymbolRefreshState)).scalar() or 0
+    if known >= len(tickers):
+        return
+
+    existing = set(db.execute(select(SymbolRefreshState.symbol)).scalars())
+    now = datetime.utcnow()
+    rows = [
+        {"symbol": symbol, "failure_count": 0, "next_due": now}
+        for symbol in dict.fromkeys(tickers) if symbol not in existing
+    ]
+    if not rows:
+        return
+
+    insert = upsert_insert(db)
+    if insert is not None:
+        db.execute(insert(SymbolRefreshState).values(rows).on_conflict_do_nothing(index_elements=["symbol"]))
+    else:
+        db.add_all(SymbolRefreshState(**row) for row in rows)
+    db.commit()
+    logger.info("🗂️ Added %d symbols to the refresh queue", len(rows))
+
+def _claimable(now: datetime):
+    return or_(SymbolRefreshState.lease_expires.is_(None), SymbolRefreshState.lease_expires < now)
+
+def _lease(db: Session, symbols: List[str], owner: str, now: datetime) -> List[str]:
+    """
+    Lease those of the symbols that are still claimable, in one conditional
+    UPDATE. Returns the ones this call got.
+    """
+    expires = now + LEASE_DURATION
+    stmt = (
+        update(SymbolRefreshState)
+        .where(SymbolRefreshState.symbol.in_(symbols), _claimable(now))
+        .values(lease_owner=owner, lease_expires=expires)
+    )
+    if db.get_bind().dialect.update_returning:
+        return list(db.execute(stmt.returning(SymbolRefreshState.symbol)).scalars())
+    db.execute(stmt)
+    return list(db.execute(
+        select(SymbolRefreshState.symbol)
+        .where(SymbolRefreshState.symbol.in_(symbols), SymbolRefreshState.lease_owner == owner,
+               SymbolRefreshState.lease_expires == expires)
+    ).scalars())
+
+def claim_due_symbols(db: Session, tickers: List[str], n: int, owner: str = WORKER_ID) -> List[str]:
+    """
+    Lease the n most urgent due symbols to this worker and commit. Urgency is
+    staleness (time since the last successful fetch) weighted by importance
+    (best leaderboard position).
+
+    Any number of workers can claim at once: candidates are read without
+    locks, and only the chosen symbols are leased, by a conditional UPDATE that
+    skips any another worker got to first. Those are replaced by the next most
+    urgent candidates. Symbols whose lease has expired are claimable again.
+    """
+    sync_universe(db, tickers)
+    # Ties (e.g. never-fetched symbols) keep the ticker file order
+    position = {symbol: i for i, symbol in enumerate(tickers)}
+    now = datetime.utcnow()
+
+    rows = db.execute(
+        select(SymbolRefreshState.symbol, SymbolRefreshState.last_success, SymbolRefreshState.lease_owner)
+        .where(SymbolRefreshState.next_due <= now, _claimable(now))
+        .order_by(SymbolRefreshState.next_due)
+        .limit(MAX_CANDIDATES)
+    ).all()
+
+    def priority(row):
+        symbol, last_success, _ = row
+        last_success = as_naive_utc(last_success)
+        staleness = now - last_success if last_success else NEVER_FETCHED_STALENESS
+        return staleness.total_seconds() * _importance(db, symbol), -position[symbol]
+
+    candidates = sorted((row for row in rows if row[0] in position), key=priority, reverse=True)
+    previous_owner = {row[0]: row[2] for row in candidates}
+    claimed: List[str] = []
+    for _ in range(CLAIM_ATTEMPTS):
+        wanted = n - len(claimed)
+        if wanted <= 0 or not candidates:
+            break
+        chosen, candidates = candidates[:wanted], candidates[wanted:]
+        leased = set(_lease(db, [row[0] for row in chosen], owner, now))
+        claimed += [row[0] for row in chosen if row[0] in leased]
+    db.commit()
+
+    reclaimed = sum(1 for symbol in claimed if previous_owner[symbol] is not None)
+    if reclaimed:
+        logger.info("♻️ Reclaimed %d symbols from expired leases", reclaimed)
+    return claimed
+
+def renew_leases(db: Session, symbols: List[str], owner: str = WORKER_ID) -> int:
+    """Push out the expiry of the leases this worker still holds. Returns how many it holds."""
+    result = db.execute(
+        update(SymbolRefreshState)
+        .where(SymbolRefreshState.symbol.in_(symbols), SymbolRefreshState.lease_owner == owner)
+        .values(lease_expires=datetime.utcnow() + LEASE_DURATION)
+    )
+    db.commit()
+    return result.rowcount
+
+def release_leases(db: Session, symbols: Iterable[str], owner: str = WORKER_ID):
+    """Give back a finished batch's leases, without committing (lands with the batch write)"""
+    symbols = list(symbols)
+    if not symbols:
+        return
+    db.execute(
+        update(SymbolRefreshState)
+        .where(SymbolRefreshState.symbol.in_(symbols), SymbolRefreshState.lease_owner == owner)
+        .values(lease_owner=None, lease_expires=None)
+    )
+
+
+class LeaseHeartbeat:
+    """
+    Renews a batch's leases from a background thread (on its own session) for
+    as long as the batch is being fetched:
+
+        with LeaseHeartbeat(batch):
+            fetch_batch_metrics(batch, ...)
+    """
+
+    def __init__(self, symbols: List[str], owner: str = WORKER_ID, interval: float = LEASE_HEARTBEAT_SECONDS):
+        self.symbols = list(symbols)
+        self.owner = owner
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self._run, name="lease-heartbeat", daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            db = SessionLocal()
+            try:
+                held = renew_leases(db, self.symbols, self.owner)
+                if held < len(self.symbols):
+                    logger.warning("⚠️ Lost %d of %d leases, another worker may refetch them", len(self.symbols) - held, len(self.symbols))
+            except Exception as e:
+                # A missed beat only matters if the next ones fail too
+                logger.warning("⚠️ Lease heartbeat failed: %s", e)
+                db.rollback()
+            finally:
+                db.close()
+
+def record_refresh_results(db: Session, succeeded: Iterable[str], failed: Iterable[str]):
+    """
+    Update refresh state for a finished batch without committing, so it lands in
+    the same transaction as the stock rows.
+    """
+    now = datetime.utcnow()
+    succeeded = list(succeeded)
+    failed = list(failed)
+
+    failure_counts: Dict[str, int] = {}
+    if failed:
+        failure_counts = dict(db.execute(
+            select(SymbolRefreshState.symbol, SymbolRefreshState.failure_count)
+            .where(SymbolRefreshState.symbol.in_(failed))
+        ).all())
+
+    success_rows = [
+        {
+            "symbol": symbol, "last_fetched": now, "last_success": now,
+            "failure_count": 0, "next_due": now + MIN_REFRESH_INTERVAL / _importance(db, symbol),
+        }
+        for symbol in succeeded
+    ]
+    failure_rows = []
+    for symbol in failed:
+        failures = (failure_counts.get(symbol) or 0) + 1
+        backoff = min(BACKOFF_BASE * (2 ** min(failures - 1, 16)), BACKOFF_MAX)
+        failure_rows.append({
+            "symbol": symbol, "last_fetched": now,
+            "failure_count": failures, "next_due": now + backoff,
+        })
+
+    insert = upsert_insert(db)
+    for rows in (success_rows, failure_rows):
+        if not rows:
+            continue
+        if insert is not None:
+            stmt = insert(SymbolRefreshState).values(rows)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["symbol"],
+                set_={key: stmt.excluded[key] for key in rows[0] if key != "symbol"},
+            )
+            db.execute(stmt)
+        else:
+            for row in rows:
+                db.merge(SymbolRefreshState(**row))
@@ -0,0 +1,66 @@
+import logging
+import time
+from typing import Dict, Any
+import pandas as pd
+from sqlalchemy import select, update, or_
+from sqlalchemy.orm import Session
+from app.models import Stock
+from app.services.scoring import score_frame, rule_fields, SCORING_VERSION
+from app.services.cache import bump_generation, stock_lookup_cache
+from app.services.leaderboard import leaderboards
+from app.services.cache_sync import mark_data_changed
+from app.services.change_feed import change_feed
+from app.services.stock_fetcher import get_or_create_progress
+
+logger = logging.getLogger(__name__)
+
+RESCORE_CHUNK_SIZE = 5000
+
+def rescore_all_stocks(db: Session, chunk_size: int = RESCORE_CHUNK_SIZE, only_stale: bool = False) -> Dict[str, Any]:
+    """
+    Recompute every *_score column from the stored metrics without touching the
+    data provider. Rows are read in symbol order in chunks, scored in one
+    vectorized pass per chunk and written back with a bulk UPDATE by primary key.
+    With only_stale=True, rows already stamped with SCORING_VERSION are skipped.
+    """
+    started = time.monotonic()
+    fields = rule_fields()
+    columns = [Stock.symbol] + [getattr(Stock, field) for field in fields]
+    updated = 0
+    last_symbol = None
+
+    while True:
+        query = select(*columns).order_by(Stock.symbol).limit(chunk_size)
+        if last_symbol is not None:
+            query = query.where(Stock.symbol > last_symbol)
+        if only_stale:
+            query = query.where(or_(Stock.scoring_version.is_(None), Stock.scoring_version != SCORING_VERSION))
+
+        rows = db.execute(query).all()
+        if not rows:
+            break
+
+        frame = pd.DataFrame(rows, columns=["symbol"] + fields)
+        scores = score_frame(frame)
+        scores["symbol"] = frame["symbol"]
+        scores["scoring_version"] = SCORING_VERSION
+
+        db.execute(update(Stock), scores.to_dict(orient="records"))
+        db.commit()
+
+        updated += len(rows)
+        last_symbol = rows[-1][0]
+
+    if updated:
+        # Tell other processes every row may have changed
+        progress = get_or_create_progress(db)
+        mark_data_changed(progress, full=True)
+        db.commit()
+        bump_generation()
+        stock_lookup_cache.clear()
+        leaderboards.invalidate()
+        change_feed.publish_reset(progress.data_version)
+    
+    elapsed = time.monotonic() - started
+    logger.info("✅ Rescored %d stocks with scoring version %s in %.2fs", updated, SCORING_VERSION, elapsed)
+    return {"updated": updated, "scoring_version": SCORING_VERSION, "elapsed_seconds": round(elapsed, 3)}
@@ -0,0 +1,215 @@
+import hashlib
+import json
+import math
+from typing import Dict, Any, List, Mapping, NamedTuple, Optional
+import numpy as np
+import pandas as pd
+
+STRATEGIES = ["balanced", "value", "growth", "momentum", "quality"]
+DEFAULT_STRATEGY = "balanced"
+
+
+class Rule(NamedTuple):
+    """
+    One binary pass/fail criterion. A stock earns `weight` points when `field`
+    lies within the (min, max) bounds, and, if `above_field` is set, is strictly
+    greater than that other field. Missing or non-numeric values never pass.
+    """
+    field: str
+    weight: float
+    min: Optional[float] = None
+    max: Optional[float] = None
+    min_inclusive: bool = False
+    max_inclusive: bool = False
+    above_field: Optional[str] = None
+
+
+# Declarative strategy definitions. Rules are summed in order, then ceil'd and capped at 100.
+STRATEGY_RULES: Dict[str, List[Rule]] = {
+    # Balanced approach
+    "balanced": [
+        Rule("revenue_growth", 20, min=0.05),       # Revenue Growth >5%
+        Rule("roe", 20, min=0.15),                  # Return on Equity >15%
+        Rule("de_ratio", 20, min=0, max=1),         # Debt to Equity between 0 and 1
+        Rule("free_cash_flow", 20, min=0),          # Free Cash Flow >0
+        Rule("peg_ratio", 20, min=0, max=2),        # PEG Ratio between 0 and 2
+    ],
+    # Value investing
+    "value": [
+        Rule("revenue_growth", 16.7, min=0.05),     # Revenue Growth >5%
+        Rule("earnings_growth", 16.7, min=0.05),    # Earnings Growth >5%
+        Rule("roe", 16.7, min=0.15),                # Return on Equity >15%
+        Rule("de_ratio", 16.7, min=0, max=1),       # Debt to Equity between 0 and 1
+        Rule("free_cash_flow", 16.7, min=0),        # Free Cash Flow >0
+        Rule("peg_ratio", 16.7, min=0, max=1),      # PEG Ratio between 0 and 1
+    ],
+    # Growth investing
+    "growth": [
+        Rule("revenue_growth_3yr", 25, min=0.20),                                   # 3-Year Revenue Growth >20%
+        Rule("revenue_growth", 25, min=0.20, min_inclusive=True),                   # Revenue Growth YoY ≥20%
+        Rule("de_ratio", 25, min=0, max=5, min_inclusive=True, max_inclusive=True), # D/E Ratio between 0 and 5
+        Rule("peg_ratio", 25, min=0, max=2, max_inclusive=True),                    # PEG Ratio between 0 and 2
+    ],
+    # Momentum investing
+    "momentum": [
+        Rule("revenue_growth_3yr", 11.2, min=0.10),                      # 3-Year Revenue Growth >10%
+        Rule("earnings_growth", 11.2, min=0.15),                         # Earnings Growth >15%
+        Rule("revenue_growth", 11.2, min=0.20),                          # Revenue Growth YoY >20%
+        Rule("roe", 11.2, min=0.20),                                     # Return on Equity >20%
+        Rule("revenue_growth", 11.2, above_field="revenue_growth_3yr"),  # Accelerating revenue growth
+        Rule("return_12_1m", 11.2, min=0.10),                            # 12-1 Month Return >10%
+        Rule("price", 11.2, above_field="sma_200"),                      # Price above 200-day average
+        Rule("sma_50", 11.2, above_field="sma_200"),                     # 50-day average above 200-day average
+        Rule("volatility", 11.2, min=0, max=0.6),                        # Annualized Volatility below 60%
+    ],
+    # Quality investing
+    "quality": [
+        Rule("pb_ratio", 16.7, min=0, max=5),       # PB Ratio between 0 and 5
+        Rule("roe", 16.7, min=0.15),                # Return on Equity >15%
+        Rule("de_ratio", 16.7, min=0, max=0.5),     # Debt to Equity between 0 and 0.5
+        Rule("free_cash_flow", 16.7, min=0),        # Free Cash Flow >0
+        Rule("dividend_yield", 16.7, min=0),        # Dividend Yield >0
+        Rule("revenue_growth", 16.7, min=0),        # Revenue Growth >0
+    ],
+}
+
+SCORE_COLUMNS = [f"{strategy}_score" for strategy in STRATEGIES]
+
+
+def _rules_fingerprint() -> str:
+    """Short hash of the rule table, so any threshold or weight change yields a new version"""
+    canonical = json.dumps(
+        {strategy: [list(rule) for rule in rules] for strategy, rules in sorted(STRATEGY_RULES.items())},
+        sort_keys=True,
+    )
+    return hashlib.sha1(canonical.encode()).hexdigest()[:12]
+
+
+# Stamped on every Stock row so scores computed by older rules can be detected
+SCORING_VERSION = _rules_fingerprint()
+
+
+def get_rules(strategy: str) -> List[Rule]:
+    """Rules for a strategy, falling back to balanced for unknown names"""
+    return STRATEGY_RULES.get(strategy, STRATEGY_RULES[DEFAULT_STRATEGY])
+
+
+def rule_fields() -> List[str]:
+    """Every input field referenced by any strategy"""
+    fields = []
+    for rules in STRATEGY_RULES.values():
+        for rule in rules:
+            for field in (rule.field, rule.above_field):
+                if field and field not in fields:
+                    fields.append(field)
+    return fields
+
+
+def _safe_float(value) -> Optional[float]:
+    """Safely convert value to float, return None if conversion fails"""
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except (ValueError, TypeError):
+        return None
+
+
+def _rule_passes(rule: Rule, value: Optional[float], other: Optional[float]) -> bool:
+    if value is None or math.isnan(value):
+        return False
+    if rule.min is not None and not (value >= rule.min if rule.min_inclusive else value > rule.min):
+        return False
+    if rule.max is not None and not (value <= rule.max if rule.max_inclusive else value < rule.max):
+        return False
+    if rule.above_field is not None and not (other is not None and value > other):
+        return False
+    return True
+
+
+def score_record(stock_data: Mapping[str, Any], strategies: List[str] = STRATEGIES) -> Dict[str, int]:
+    """Score a single metrics dict for several strategies, converting each field once"""
+    values: Dict[str, Optional[float]] = {}
+
+    def value_of(field):
+        if field not in values:
+            values[field] = _safe_float(stock_data.get(field))
+        return values[field]
+
+    scores = {}
+    for strategy in strategies:
+        score = 0.0
+        for rule in get_rules(strategy):
+            other = value_of(rule.above_field) if rule.above_field else None
+            if _rule_passes(rule, value_of(rule.field), other):
+                score += rule.weight
+        scores[strategy] = min(100, int(math.ceil(score)))
+    return scores
+
+
+def _to_float_array(values) -> np.ndarray:
+    """Coerce any array-like to float64, mapping None and non-numeric values to NaN"""
+    array = np.asarray(values)
+    if array.dtype.kind in "biuf":
+        return array.astype(np.float64, copy=False)
+    flat = pd.to_numeric(pd.Series(array.ravel(), dtype=object), errors="coerce")
+    return flat.to_numpy(dtype=np.float64, na_value=np.nan).reshape(array.shape)
+
+
+def score_arrays(columns: Mapping[str, Any], strategy: str, shape=None, rules: Optional[List[Rule]] = None) -> np.ndarray:
+    """
+    Vectorized scoring. `columns` maps field names to equally shaped arrays
+    (1-D for a batch, 2-D for dates x symbols); missing fields count as NaN.
+    Returns an int64 array of scores with the same shape. Pass rules to score
+    a variant of the strategy's rule list (e.g. in a backtest sweep).
+    """
+    arrays: Dict[str, np.ndarray] = {}
+
+    def array_of(field):
+        if field not in arrays:
+            arrays[field] = _to_float_array(columns[field]) if field in columns else None
+        return arrays[field]
+
+    if shape is None:
+        present = [array_of(field) for field in rule_fields() if array_of(field) is not None]
+        shape = present[0].shape if present else (0,)
+
+    score = np.zeros(shape, dtype=np.float64)
+    with np.errstate(invalid="ignore"):
+        for rule in rules if rules is not None else get_rules(strategy):
+            value = array_of(rule.field)
+            if value is None:
+                continue
+            passed = ~np.isnan(value)
+            if rule.min is not None:
+                passed &= (value >= rule.min) if rule.min_inclusive else (value > rule.min)
+            if rule.max is not None:
+                passed &= (value <= rule.max) if rule.max_inclusive else (value < rule.max)
+            if rule.above_field is not None:
+                other = array_of(rule.above_field)
+                if other is None:
+                    continue
+                passed &= value > other
+            # Same accumulation order as score_record, so float sums match exactly
+            score = score + np.where(passed, rule.weight, 0.0)
+
+    return np.minimum(100, np.ceil(score)).astype(np.int64)
+
+
+def score_frame(frame: pd.DataFrame, strategies: List[str] = STRATEGIES) -> pd.DataFrame:
+    """Score every row of a metrics frame in one pass, returning one `<strategy>_score` column per strategy"""
+    columns = {field: frame[field].to_numpy() for field in rule_fields() if field in frame.columns}
+    return pd.DataFrame(
+        {f"{strategy}_score": score_arrays(columns, strategy, shape=(len(frame),)) for strategy in strategies},
+        index=frame.index,
+    )
+
+
+def score_records(records: List[Mapping[str, Any]], strategies: List[str] = STRATEGIES) -> List[Dict[str, int]]:
+    """Vectorized scoring for a list of metrics dicts, returning plain-int score dicts in order"""
+    if not records:
+        return []
+    fields = rule_fields()
+    frame = pd.DataFrame([{field: record.get(field) for field in fields} for record in records])
+    scores = score_frame(frame, strategies)
+    return scores.to_dict(orient="records")
@@ -0,0 +1,44 @@
+import re
+from typing import Any, Dict, List, Optional
+from sqlalchemy import select, and_, or_, case, func
+from sqlalchemy.orm import Session
+from app.models import Stock, SEARCH_CONFIG, search_document
+from app.services.stock_fetcher import STOCK_FIELDS, _stock_row_to_dict
+
+MAX_SEARCH_RESULTS = 100
+
+_WORD = re.compile(r"[\w&'.-]+")
+
+def search_stocks(db: Session, q: str, limit: int = 20, fields: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    """
+    Full-text search over symbol, name, industry and summary, best match first.
+    q takes web-search syntax ("quoted phrases", -excluded, or). On PostgreSQL
+    this is answered from the ix_stocks_search GIN index; other databases fall
+    back to a LIKE scan, which is fine for an embedded database of this size.
+    """
+    selected = [field for field in STOCK_FIELDS if field in set(fields) | {"symbol"}] if fields else STOCK_FIELDS
+    columns = [Stock.__table__.c[field] for field in selected]
+
+    if db.get_bind().dialect.name == "postgresql":
+        document = search_document(Stock.symbol, Stock.name, Stock.industry, Stock.summary)
+        query = func.websearch_to_tsquery(SEARCH_CONFIG, q)
+        rank = func.ts_rank(document, query)
+        statement = (
+            select(*columns).where(document.op("@@")(query))
+            .order_by(rank.desc(), Stock.symbol).limit(limit)
+        )
+    else:
+        terms = [term.lower() for term in _WORD.findall(q)]
+        if not terms:
+            return []
+        text_columns = [Stock.symbol, Stock.name, Stock.industry, Stock.summary]
+        # Every term has to appear somewhere; symbol and name hits sort first
+        matches = [or_(*(func.lower(column).contains(term, autoescape=True) for column in text_columns)) for term in terms]
+        relevance = case(
+            (func.lower(Stock.symbol) == q.strip().lower(), 0),
+            (and_(*(func.lower(Stock.name).contains(term, autoescape=True) for term in terms)), 1),
+            else_=2,
+        )
+        statement = select(*columns).where(*matches).order_by(relevance, Stock.symbol).limit(limit)
+
+    return [_stock_row_to_dict(selected, row) for row in db.execute(statement)]
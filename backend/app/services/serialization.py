@@ -0,0 +1,21 @@
+from typing import Any, Dict, Iterable, Optional
+import orjson
+from fastapi import Response
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+# Non-finite floats are scrubbed when rows are written, and orjson emits null
+# for any that slip through, so reads never need a per-value pass
+_OPTIONS = orjson.OPT_SERIALIZE_NUMPY
+
+def dumps(content: Any) -> bytes:
+    """Compact UTF-8 JSON. Datetimes are written as ISO 8601, like isoformat()."""
+    return orjson.dumps(content, option=_OPTIONS)
+
+def dumps_ndjson(rows: Iterable[Any]) -> bytes:
+    """One JSON document per line, so clients can parse rows as they arrive"""
+    return b"".join(orjson.dumps(row, option=_OPTIONS | orjson.OPT_APPEND_NEWLINE) for row in rows)
+
+def json_response(content: Any, status_code: int = 200, headers: Optional[Dict[str, str]] = None) -> Response:
+    """Pre-encoded JSON response that skips FastAPI's jsonable_encoder pass"""
+    return Response(content=dumps(content), status_code=status_code, media_type="application/json", headers=headers)
@@ -0,0 +1,303 @@
+import asyncio
+import logging
+import math
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set
+import pandas as pd
+import pyarrow.parquet as pq
+from sqlalchemy import select, delete, insert, func, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from app.database import SessionLocal
+from app.models import StockSnapshot
+from app.services.columnar import arrow_schema, as_naive_utc, rows_to_record_batch
+
+logger = logging.getLogger(__name__)
+
+# Where compacted months are written, one directory per month (month=YYYY-MM)
+SNAPSHOT_ARCHIVE_DIR = Path(os.getenv("SNAPSHOT_ARCHIVE_DIR", "snapshot_archive"))
+# Months kept in the database, counting the current one. Older months are compacted.
+SNAPSHOT_RETENTION_MONTHS = int(os.getenv("SNAPSHOT_RETENTION_MONTHS", "3"))
+# Rows streamed from the database per Parquet row group during compaction
+COMPACTION_CHUNK_SIZE = 50000
+
+# Every column except the key, in table order
+SNAPSHOT_FIELDS = [column.name for column in StockSnapshot.__table__.columns if column.name not in ("symbol", "fetched_at")]
+
+ARCHIVE_SCHEMA = arrow_schema(StockSnapshot.__table__.columns)
+
+def _finite(value):
+    """NaN and infinities are stored as NULL, like on the stocks table"""
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    return value
+
+def _month_start(value: datetime) -> datetime:
+    return datetime(value.year, value.month, 1)
+
+def _next_month(value: datetime) -> datetime:
+    return datetime(value.year + value.month // 12, value.month % 12 + 1, 1)
+
+def _is_postgres(db: Session) -> bool:
+    return db.get_bind().dialect.name == "postgresql"
+
+# Partitions known to exist in this process, so the DDL check runs once per month
+_known_partitions: Set[str] = set()
+_partition_lock = threading.Lock()
+
+def _partition_name(month: datetime) -> str:
+    return f"stock_snapshots_p{month:%Y%m}"
+
+def ensure_partitions(db: Session, months: Iterable[datetime]):
+    """Create the monthly partitions (plus a default catch-all) on PostgreSQL. No-op elsewhere."""
+    if not _is_postgres(db):
+        return
+    wanted = {_month_start(month) for month in months}
+    with _partition_lock:
+        missing = [month for month in sorted(wanted) if _partition_name(month) not in _known_partitions]
+        if not missing and "stock_snapshots_default" in _known_partitions:
+            return
+        # Own transaction, so a rolled back batch can't take the partitions with it
+        with db.get_bind().begin() as conn:
+            conn.execute(text("CREATE TABLE IF NOT EXISTS stock_snapshots_default PARTITION OF stock_snapshots DEFAULT"))
+            for month in missing:
+                conn.execute(text(
+                    f"CREATE TABLE IF NOT EXISTS {_partition_name(month)} PARTITION OF stock_snapshots "
+                    f"FOR VALUES FROM ('{month:%Y-%m-%d}') TO ('{_next_month(month):%Y-%m-%d}')"
+                ))
+        _known_partitions.add("stock_snapshots_default")
+        _known_partitions.update(_partition_name(month) for month in missing)
+
+def save_snapshots(db: Session, batch_metrics: Dict[str, Dict[str, Any]]):
+    """
+    Append one history row per fetched symbol, in a single multi-row INSERT.
+    Doesn't commit, so it lands in the same transaction as the stock rows.
+    """
+    if not batch_metrics:
+        return
+
+    rows = []
+    for symbol, metrics in batch_metrics.items():
+        row = {field: _finite(metrics.get(field)) for field in SNAPSHOT_FIELDS}
+        row["symbol"] = symbol
+        row["fetched_at"] = metrics.get("last_fetched") or datetime.utcnow()
+        rows.append(row)
+
+    ensure_partitions(db, [row["fetched_at"] for row in rows])
+    db.execute(insert(StockSnapshot), rows)
+
+def _month_directory(month: datetime) -> Path:
+    return SNAPSHOT_ARCHIVE_DIR / f"month={month:%Y-%m}"
+
+def _archive_month(db: Session, month: datetime) -> int:
+    """
+    Stream one month out of the database into a Parquet file sorted by
+    (symbol, fetched_at), so per-symbol reads can skip most row groups using
+    the min/max statistics. Returns the number of rows written.
+    """
+    month_end = _next_month(month)
+    columns = [StockSnapshot.__table__.c[name] for name in ARCHIVE_SCHEMA.names]
+    query = (
+        select(*columns)
+        .where(StockSnapshot.fetched_at >= month, StockSnapshot.fetched_at < month_end)
+        .order_by(StockSnapshot.symbol, StockSnapshot.fetched_at)
+        .execution_options(yield_per=COMPACTION_CHUNK_SIZE)
+    )
+
+    directory = _month_directory(month)
+    directory.mkdir(parents=True, exist_ok=True)
+    # A month can be compacted more than once if late rows arrive, so each run gets its own file
+    path = directory / f"part-{int(time.time() * 1000)}.parquet"
+    tmp_path = path.with_suffix(".parquet.tmp")
+
+    written = 0
+    writer = None
+    try:
+        for rows in db.execute(query).partitions():
+            if writer is None:
+                writer = pq.ParquetWriter(tmp_path, ARCHIVE_SCHEMA, compression="zstd")
+            writer.write_batch(rows_to_record_batch(rows, ARCHIVE_SCHEMA), row_group_size=COMPACTION_CHUNK_SIZE)
+            written += len(rows)
+    except Exception:
+        if writer is not None:
+            writer.close()
+        tmp_path.unlink(missing_ok=True)
+        raise
+
+    if writer is None:
+        return 0
+    writer.close()
+    # Only publish complete files
+    os.replace(tmp_path, path)
+    return written
+
+def _drop_month(db: Session, month: datetime):
+    """Remove an archived month from the database: drop its partition where there is one"""
+    if _is_postgres(db):
+        name = _partition_name(month)
+        db.execute(text(f"DROP TABLE IF EXISTS {name}"))
+        with _partition_lock:
+            _known_partitions.discard(name)
+    # Rows in the default partition (or the whole table on SQLite)
+    db.execute(delete(StockSnapshot).where(
+        StockSnapshot.fetched_at >= month, StockSnapshot.fetched_at < _next_month(month)
+    ))
+
+def retention_cutoff(now: Optional[datetime] = None) -> datetime:
+    """Start of the oldest month still kept in the database"""
+    month = _month_start(now or datetime.utcnow())
+    for _ in range(max(SNAPSHOT_RETENTION_MONTHS, 1) - 1):
+        month = _month_start(month - timedelta(days=1))
+    return month
+
+def compact_snapshots(db: Session, now: Optional[datetime] = None) -> Dict[str, Any]:
+    """
+    Move every month older than the retention window from the database into
+    Parquet files under SNAPSHOT_ARCHIVE_DIR. Each month is written and
+    published before its rows are deleted, one month per transaction.
+    """
+    started = time.monotonic()
+    cutoff = retention_cutoff(now)
+    oldest = as_naive_utc(db.execute(
+        select(func.min(StockSnapshot.fetched_at)).where(StockSnapshot.fetched_at < cutoff)
+    ).scalar())
+
+    archived_months = []
+    archived_rows = 0
+    month = _month_start(oldest) if oldest else cutoff
+    while month < cutoff:
+        rows = _archive_month(db, month)
+        if rows:
+            _drop_month(db, month)
+            db.commit()
+            archived_months.append(f"{month:%Y-%m}")
+            archived_rows += rows
+            logger.info("📦 Archived %d snapshots for %s", rows, f"{month:%Y-%m}")
+        month = _next_month(month)
+
+    elapsed = time.monotonic() - started
+    return {"months": archived_months, "rows": archived_rows, "elapsed_seconds": round(elapsed, 3)}
+
+def run_snapshot_compaction():
+    """Scheduler entry point: compact old snapshot months with its own session"""
+    db = SessionLocal()
+    try:
+        result = compact_snapshots(db)
+        if result["rows"]:
+            logger.info("✅ Compacted %d snapshots from %d months in %ss", result["rows"], len(result["months"]), result["elapsed_seconds"])
+    except Exception as e:
+        logger.exception("Error compacting snapshots: %s", e)
+        db.rollback()
+    finally:
+        db.close()
+
+def _read_archive(symbol: str, fields: List[str], start: datetime, end: datetime) -> List[Dict[str, Any]]:
+    """Archived rows for one symbol in [start, end), reading only the months in range"""
+    if not SNAPSHOT_ARCHIVE_DIR.exists():
+        return []
+
+    columns = ["fetched_at"] + fields
+    filters = [("symbol", "=", symbol), ("fetched_at", ">=", start), ("fetched_at", "<", end)]
+    rows: List[Dict[str, Any]] = []
+    month = _month_start(start)
+    while month < end:
+        directory = _month_directory(month)
+        if directory.exists():
+            for path in sorted(directory.glob("part-*.parquet")):
+                rows.extend(pq.read_table(path, columns=columns, filters=filters).to_pylist())
+        month = _next_month(month)
+    return rows
+
+def _read_archive_range(fields: List[str], start: datetime, end: datetime) -> pd.DataFrame:
+    """Archived rows for every symbol in [start, end), which must lie within one month"""
+    columns = ["symbol", "fetched_at"] + fields
+    directory = _month_directory(_month_start(start))
+    if not directory.exists():
+        return pd.DataFrame(columns=columns)
+    filters = [("fetched_at", ">=", start), ("fetched_at", "<", end)]
+    tables = [pq.read_table(path, columns=columns, filters=filters).to_pandas() for path in sorted(directory.glob("part-*.parquet"))]
+    return pd.concat(tables, ignore_index=True) if tables else pd.DataFrame(columns=columns)
+
+def iter_snapshot_months(
+    db: Session, start: datetime, end: datetime, fields: Optional[List[str]] = None
+) -> Iterator[pd.DataFrame]:
+    """
+    Every symbol's snapshots in [start, end) as one frame per month (symbol,
+    fetched_at as naive UTC, fields), oldest first, so multi-year ranges are
+    never in memory at once. Reads the archive and the database like
+    get_stock_history_async, with database rows winning over archived duplicates.
+    """
+    fields = _check_history_fields(fields)
+    cutoff = retention_cutoff()
+    columns = [StockSnapshot.symbol, StockSnapshot.fetched_at] + [StockSnapshot.__table__.c[field] for field in fields]
+    month = _month_start(start)
+    while month < end:
+        low, high = max(start, month), min(end, _next_month(month))
+        frames = [_read_archive_range(fields, low, min(high, cutoff))] if low < cutoff else []
+        query = (
+            select(*columns).where(StockSnapshot.fetched_at >= low, StockSnapshot.fetched_at < high)
+            .execution_options(yield_per=COMPACTION_CHUNK_SIZE)
+        )
+        for rows in db.execute(query).partitions():
+            frames.append(pd.DataFrame(rows, columns=["symbol", "fetched_at"] + fields))
+        frames = [frame for frame in frames if not frame.empty]
+        if frames:
+            frame = pd.concat(frames, ignore_index=True)
+            frame["fetched_at"] = pd.to_datetime(frame["fetched_at"], utc=True).dt.tz_localize(None)
+            yield frame.drop_duplicates(["symbol", "fetched_at"], keep="last")
+        month = _next_month(month)
+
+def _check_history_fields(fields: Optional[List[str]]) -> List[str]:
+    fields = fields or SNAPSHOT_FIELDS
+    unknown = [field for field in fields if field not in SNAPSHOT_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    return fields
+
+def _history_query(symbol: str, fields: List[str], start: datetime, end: datetime):
+    # The database side is always read past the cutoff, and also before it in case
+    # a compaction hasn't run yet
+    columns = [StockSnapshot.fetched_at] + [StockSnapshot.__table__.c[field] for field in fields]
+    return (
+        select(*columns)
+        .where(StockSnapshot.symbol == symbol, StockSnapshot.fetched_at >= start, StockSnapshot.fetched_at < end)
+        .order_by(StockSnapshot.fetched_at)
+    )
+
+def _merge_history(archived: List[Dict[str, Any]], db_rows, fields: List[str]) -> List[Dict[str, Any]]:
+    """Combine both sources oldest first. Database rows win over archived duplicates."""
+    by_time: Dict[datetime, Dict[str, Any]] = {row["fetched_at"]: row for row in archived}
+    for row in db_rows:
+        fetched_at = as_naive_utc(row[0])
+        by_time[fetched_at] = dict(zip(["fetched_at"] + fields, (fetched_at,) + tuple(row[1:])))
+
+    history = []
+    for fetched_at in sorted(by_time):
+        entry = by_time[fetched_at]
+        entry["fetched_at"] = fetched_at.isoformat()
+        history.append(entry)
+    return history
+
+async def get_stock_history_async(
+    db: AsyncSession,
+    symbol: str,
+    start: datetime,
+    end: datetime,
+    fields: Optional[List[str]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    History for one symbol in [start, end), oldest first. Recent months come from
+    the database and older ones from the Parquet archive (read in a worker
+    thread); only the side(s) that overlap the range are read.
+    """
+    fields = _check_history_fields(fields)
+    cutoff = retention_cutoff()
+    archived = []
+    if start < cutoff:
+        archived = await asyncio.to_thread(_read_archive, symbol, fields, start, min(end, cutoff))
+    db_rows = (await db.execute(_history_query(symbol, fields, start, end))).all()
+    return _merge_history(archived, db_rows, fields)
@@ -0,0 +1,141 @@
+import json
+import os
+import threading
+from datetime import date, datetime, time, timedelta
+from typing import Dict, Iterable, List, Optional, Set
+import pandas as pd
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from app.database import upsert_insert
+from app.models import FinancialStatement, SymbolRefreshState
+from app.services.columnar import as_naive_utc
+
+# Annual reports are usually filed within ~2.5 months of the fiscal year end, so
+# the next statement is expected a year plus this lag after the latest period
+FILING_LAG = timedelta(days=float(os.getenv("FINANCIALS_FILING_LAG_DAYS", "75")))
+# Once a new period is overdue, look again this often until it shows up
+RECHECK_INTERVAL = timedelta(days=float(os.getenv("FINANCIALS_RECHECK_DAYS", "7")))
+# Symbols the provider has no statements for
+EMPTY_RETRY_INTERVAL = timedelta(days=float(os.getenv("FINANCIALS_EMPTY_RETRY_DAYS", "30")))
+
+def next_statements_check(latest_period: Optional[date], now: datetime) -> datetime:
+    """When to download a symbol's annual statements again"""
+    if latest_period is None:
+        return now + EMPTY_RETRY_INTERVAL
+    expected = datetime.combine(latest_period, time()) + timedelta(days=365) + FILING_LAG
+    return max(expected, now + RECHECK_INTERVAL)
+
+def _frame_to_rows(symbol: str, financials: pd.DataFrame) -> List[Dict]:
+    rows = []
+    for period in financials.columns:
+        values = pd.to_numeric(financials[period], errors="coerce")
+        line_items = {str(item): (None if pd.isna(value) else float(value)) for item, value in values.items()}
+        rows.append({
+            "symbol": symbol,
+            "period_end": pd.Timestamp(period).date(),
+            "line_items": json.dumps(line_items),
+        })
+    return rows
+
+def _rows_to_frame(rows) -> pd.DataFrame:
+    """Statements as a yfinance-style frame: line items by period end, newest first"""
+    frame = pd.DataFrame({pd.Timestamp(period_end): json.loads(line_items) for period_end, line_items in rows})
+    if frame.empty:
+        return frame
+    return frame.sort_index(axis=1, ascending=False).astype(float)
+
+
+class StatementCache:
+    """
+    Annual financials for one ingestion batch. Loaded from the database before
+    the batch starts, so fetch threads never touch the session; statements they
+    download are collected here and written back with the batch.
+    """
+
+    def __init__(self, frames: Dict[str, pd.DataFrame], fresh: Set[str]):
+        self._frames = frames
+        self._fresh = fresh
+        self._fetched: Dict[str, pd.DataFrame] = {}
+        self._lock = threading.Lock()
+
+    def is_fresh(self, symbol: str) -> bool:
+        """True while no new fiscal period is expected, i.e. the cached frame is as good as a download"""
+        return symbol in self._fresh
+
+    def get(self, symbol: str) -> pd.DataFrame:
+        return self._frames.get(symbol, pd.DataFrame())
+
+    def record(self, symbol: str, financials: Optional[pd.DataFrame]):
+        with self._lock:
+            self._fetched[symbol] = financials if financials is not None else pd.DataFrame()
+
+    def fetched(self) -> Dict[str, pd.DataFrame]:
+        """Statements downloaded so far (abandoned fetch threads may still add more)"""
+        with self._lock:
+            return dict(self._fetched)
+
+def load_statements(db: Session, symbols: Iterable[str], now: Optional[datetime] = None) -> StatementCache:
+    """Cached statements for the symbols whose next period isn't due yet"""
+    now = now or datetime.utcnow()
+    symbols = list(symbols)
+    fresh = {
+        symbol for symbol, due in db.execute(
+            select(SymbolRefreshState.symbol, SymbolRefreshState.financials_due)
+            .where(SymbolRefreshState.symbol.in_(symbols))
+        )
+        if due is not None and as_naive_utc(due) > now
+    }
+
+    rows_by_symbol: Dict[str, List] = {}
+    if fresh:
+        for symbol, period_end, line_items in db.execute(
+            select(FinancialStatement.symbol, FinancialStatement.period_end, FinancialStatement.line_items)
+            .where(FinancialStatement.symbol.in_(fresh))
+        ):
+            rows_by_symbol.setdefault(symbol, []).append((period_end, line_items))
+
+    frames = {symbol: _rows_to_frame(rows) for symbol, rows in rows_by_symbol.items()}
+    return StatementCache(frames, fresh)
+
+def save_statements(db: Session, statements: StatementCache, now: Optional[datetime] = None):
+    """
+    Upsert statements downloaded during the batch and schedule each symbol's
+    next download. Doesn't commit.
+    """
+    fetched = statements.fetched()
+    if not fetched:
+        return
+    now = now or datetime.utcnow()
+
+    statement_rows = []
+    state_rows = []
+    for symbol, financials in fetched.items():
+        rows = _frame_to_rows(symbol, financials) if not financials.empty else []
+        statement_rows.extend(rows)
+        latest = max((row["period_end"] for row in rows), default=None)
+        state_rows.append({
+            "symbol": symbol, "financials_checked_at": now,
+            "financials_due": next_statements_check(latest, now),
+            # Only used if the symbol has no refresh state row yet
+            "failure_count": 0, "next_due": now,
+        })
+
+    insert = upsert_insert(db)
+    if insert is None:
+        for row in statement_rows:
+            db.merge(FinancialStatement(**row))
+        for row in state_rows:
+            db.merge(SymbolRefreshState(**{key: value for key, value in row.items() if key not in ("failure_count", "next_due")}))
+        return
+
+    if statement_rows:
+        stmt = insert(FinancialStatement).values(statement_rows)
+        db.execute(stmt.on_conflict_do_update(
+            index_elements=["symbol", "period_end"],
+            set_={"line_items": stmt.excluded.line_items, "fetched_at": now},
+        ))
+    stmt = insert(SymbolRefreshState).values(state_rows)
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=["symbol"],
+        set_={key: stmt.excluded[key] for key in ("financials_checked_at", "financials_due")},
+    ))
@@ -1,19 +1,54 @@
 import os
 import math
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from pathlib import Path
-import yfinance as yf
 import pandas as pd
 import json
+import base64
 from datetime import datetime
 from dotenv import load_dotenv
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, Tuple
+from sqlalchemy import select, or_, and_, Float, Integer
 from sqlalchemy.orm import Session
-from app.database import SessionLocal
+from sqlalchemy.sql import func
+from app.database import SessionLocal, upsert_insert
 from app.models import Stock, TickerProgress
+from app.services.rate_limiter import TokenBucket
+from app.services.providers import MarketDataProvider, ProviderError, SymbolNotFoundError, get_provider
+from app.services.provider_guard import ProviderGuard
+from app.services.scoring import score_record, score_records, SCORING_VERSION
+from app.services.cache import bump_generation, current_generation, stock_lookup_cache
+from app.services.leaderboard import leaderboards
+from app.services.autocomplete import symbol_index
+from app.services.refresh_queue import claim_due_symbols, record_refresh_results, release_leases, LeaseHeartbeat
+from app.services.snapshots import save_snapshots
+from app.services.cache_sync import mark_data_changed
+from app.services.change_feed import change_feed
+from app.services.statements import StatementCache, load_statements, save_statements
+from app.services.metrics import INGEST_PHASE_SECONDS, observe_per_symbol, record_batch
 
 load_dotenv()
 
-BATCH_SIZE = 30
+logger = logging.getLogger(__name__)
+
+# Ingestion tuning (all overridable through the environment)
+BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "30"))
+INGEST_CONCURRENCY = int(os.getenv("INGEST_CONCURRENCY", "8"))  # Symbols fetched in parallel
+INGEST_RATE_LIMIT = float(os.getenv("INGEST_RATE_LIMIT", "4"))  # Starting provider requests per second, 0 disables
+INGEST_RATE_MAX = float(os.getenv("INGEST_RATE_MAX", str(INGEST_RATE_LIMIT * 2)))  # Ceiling for adaptive rate increases
+INGEST_SYMBOL_TIMEOUT = float(os.getenv("INGEST_SYMBOL_TIMEOUT", "20"))  # Seconds before a symbol is abandoned
+INGEST_SCHEDULE = os.getenv("INGEST_SCHEDULE", "priority")  # "priority" (leased staleness queue) or "round_robin"
+TICKER_FILE = os.getenv("TICKER_FILE", "tickers_nyse.json")
+
+# Shared across batches so the request rate and breaker state hold between scheduler runs
+rate_limiter = TokenBucket(INGEST_RATE_LIMIT)
+provider_guard = ProviderGuard(rate_limiter, max_rate=INGEST_RATE_MAX)
+
+# Errors that say nothing about the symbol itself: it stays due and is not backed off
+PROVIDER_BACKPRESSURE_ERRORS = {"throttled", "circuit_open"}
 
 def safe_json_value(value):
     """
@@ -35,239 +70,103 @@ def calculate_stock_score(stock_data: Dict[str, Any], strategy: str = "balanced"
     """
     Calculate a comprehensive score for a stock based on the selected strategy.
     Higher scores indicate better investment potential.
+    Strategy rules live in app.services.scoring.STRATEGY_RULES.
     """
-    def safe_float(value):
-        """Safely convert value to float, return None if conversion fails"""
-        if value is None:
-            return None
-        try:
-            return float(value)
-        except (ValueError, TypeError):
-            return None
-    
-    if strategy == "value":
-        return _calculate_value_score(stock_data, safe_float)
-    elif strategy == "growth":
-        return _calculate_growth_score(stock_data, safe_float)
-    elif strategy == "momentum":
-        return _calculate_momentum_score(stock_data, safe_float)
-    elif strategy == "quality":
-        return _calculate_quality_score(stock_data, safe_float)
-    else:  # balanced
-        return _calculate_balanced_score(stock_data, safe_float)
-
-def _calculate_balanced_score(stock_data: Dict[str, Any], safe_float) -> int:
-    """Balanced approach with binary pass/fail criteria"""
-    score = 0.0
-    
-    # Revenue Growth (20 points) - Must be >5%
-    revenue_growth = safe_float(stock_data.get('revenue_growth'))
-    if revenue_growth is not None and revenue_growth > 0.05:
-        score += 20
-    
-    # Return on Equity (20 points) - Must be >15%
-    roe = safe_float(stock_data.get('roe'))
-    if roe is not None and roe > 0.15:
-        score += 20
-    
-    # Debt to Equity (20 points) - Must be between 0 and 1
-    de_ratio = safe_float(stock_data.get('de_ratio'))
-    if de_ratio is not None and 0 < de_ratio < 1:
-        score += 20
-    
-    # Free Cash Flow (20 points) - Must be >0
-    free_cash_flow = safe_float(stock_data.get('free_cash_flow'))
-    if free_cash_flow is not None and free_cash_flow > 0:
-        score += 20
-    
-    # PEG Ratio (20 points) - Must be between 0 and 2
-    peg_ratio = safe_float(stock_data.get('peg_ratio'))
-    if peg_ratio is not None and 0 < peg_ratio < 2:
-        score += 20
-    
-    return min(100, int(math.ceil(score)))
+    return score_record(stock_data, [strategy])[strategy]
 
-def _calculate_value_score(stock_data: Dict[str, Any], safe_float) -> int:
-    """Value investing strategy with binary pass/fail criteria"""
-    score = 0.0
-    
-    # Revenue Growth (16.7 points) - Must be >5%
-    revenue_growth = safe_float(stock_data.get('revenue_growth'))
-    if revenue_growth is not None and revenue_growth > 0.05:
-        score += 16.7
-    
-    # Earnings Growth (16.7 points) - Must be >5%
-    earnings_growth = safe_float(stock_data.get('earnings_growth'))
-    if earnings_growth is not None and earnings_growth > 0.05:
-        score += 16.7
-    
-    # Return on Equity (16.7 points) - Must be >15%
-    roe = safe_float(stock_data.get('roe'))
-    if roe is not None and roe > 0.15:
-        score += 16.7
-    
-    # Debt to Equity (16.7 points) - Must be between 0 and 1
-    de_ratio = safe_float(stock_data.get('de_ratio'))
-    if de_ratio is not None and 0 < de_ratio < 1:
-        score += 16.7
-    
-    # Free Cash Flow (16.7 points) - Must be >0
-    free_cash_flow = safe_float(stock_data.get('free_cash_flow'))
-    if free_cash_flow is not None and free_cash_flow > 0:
-        score += 16.7
-    
-    # PEG Ratio (16.7 points) - Must be between 0 and 1
-    peg_ratio = safe_float(stock_data.get('peg_ratio'))
-    if peg_ratio is not None and 0 < peg_ratio < 1:
-        score += 16.7
-    
-    return min(100, int(math.ceil(score)))
-
-def _calculate_growth_score(stock_data: Dict[str, Any], safe_float) -> int:
-    """Growth investing strategy with binary pass/fail criteria"""
-    score = 0.0
-    
-    # 3-Year Revenue Growth (25 points) - Must be >20%
-    revenue_growth_3yr = safe_float(stock_data.get('revenue_growth_3yr'))
-    if revenue_growth_3yr is not None and revenue_growth_3yr > 0.20:
-        score += 25
-    
-    # Revenue Growth YoY (25 points) - Must be ≥20%
-    revenue_growth = safe_float(stock_data.get('revenue_growth'))
-    if revenue_growth is not None and revenue_growth >= 0.20:
-        score += 25
-    
-    # D/E Ratio (25 points) - Must be between 0 and 5
-    de_ratio = safe_float(stock_data.get('de_ratio'))
-    if de_ratio is not None and 0 <= de_ratio <= 5:
-        score += 25
-    
-    # PEG Ratio (25 points) - Must be between 0 and 2
-    peg_ratio = safe_float(stock_data.get('peg_ratio'))
-    if peg_ratio is not None and 0 < peg_ratio <= 2:
-        score += 25
-    
-    return min(100, int(math.ceil(score)))
+# Stock columns maintained by the daily price history job rather than by ingestion
+PRICE_INDICATOR_FIELDS = ["return_12_1m", "sma_50", "sma_200", "volatility"]
 
-def _calculate_momentum_score(stock_data: Dict[str, Any], safe_float) -> int:
-    """Momentum investing strategy with binary pass/fail criteria"""
-    score = 0.0
-    
-    # 3-Year Revenue Growth (20 points) - Must be >10%
-    revenue_growth_3yr = safe_float(stock_data.get('revenue_growth_3yr'))
-    if revenue_growth_3yr is not None and revenue_growth_3yr > 0.10:
-        score += 20
-    
-    # Earnings Growth (20 points) - Must be >15%
-    earnings_growth = safe_float(stock_data.get('earnings_growth'))
-    if earnings_growth is not None and earnings_growth > 0.15:
-        score += 20
-    
-    # Revenue Growth YoY (20 points) - Must be >20%
-    revenue_growth = safe_float(stock_data.get('revenue_growth'))
-    if revenue_growth is not None and revenue_growth > 0.20:
-        score += 20
-    
-    # Return on Equity (20 points) - Must be >20%
-    roe = safe_float(stock_data.get('roe'))
-    if roe is not None and roe > 0.20:
-        score += 20
-    
-    # Accelerating Revenue Growth (20 points) - YoY growth must be higher than 3-year growth
-    if (revenue_growth is not None and revenue_growth_3yr is not None and 
-        revenue_growth > revenue_growth_3yr):
-        score += 20
-    
-    return min(100, int(math.ceil(score)))
+def load_price_indicators(db: Session, symbols: List[str]) -> Dict[str, Dict[str, Any]]:
+    """Stored price indicators for a batch, which scoring needs alongside the freshly fetched metrics"""
+    columns = [Stock.symbol] + [getattr(Stock, field) for field in PRICE_INDICATOR_FIELDS]
+    rows = db.execute(select(*columns).where(Stock.symbol.in_(symbols))).all()
+    return {row[0]: dict(zip(PRICE_INDICATOR_FIELDS, row[1:])) for row in rows}
 
-def _calculate_quality_score(stock_data: Dict[str, Any], safe_float) -> int:
-    """Quality investing strategy with binary pass/fail criteria"""
-    score = 0.0
-    
-    # PB Ratio (16.7 points) - Must be between 0 and 5
-    pb_ratio = safe_float(stock_data.get('pb_ratio'))
-    if pb_ratio is not None and 0 < pb_ratio < 5:
-        score += 16.7
-    
-    # Return on Equity (16.7 points) - Must be >15%
-    roe = safe_float(stock_data.get('roe'))
-    if roe is not None and roe > 0.15:
-        score += 16.7
-    
-    # Debt to Equity (16.7 points) - Must be between 0 and 0.5
-    de_ratio = safe_float(stock_data.get('de_ratio'))
-    if de_ratio is not None and 0 < de_ratio < 0.5:
-        score += 16.7
-    
-    # Free Cash Flow (16.7 points) - Must be >0
-    free_cash_flow = safe_float(stock_data.get('free_cash_flow'))
-    if free_cash_flow is not None and free_cash_flow > 0:
-        score += 16.7
-    
-    # Dividend Yield (16.7 points) - Must be >0
-    dividend_yield = safe_float(stock_data.get('dividend_yield'))
-    if dividend_yield is not None and dividend_yield > 0:
-        score += 16.7
-    
-    # Revenue Growth (16.7 points) - Must be >0
-    revenue_growth = safe_float(stock_data.get('revenue_growth'))
-    if revenue_growth is not None and revenue_growth > 0:
-        score += 16.7
-    
-    return min(100, int(math.ceil(score)))
+def apply_scores(batch_metrics: Dict[str, Dict[str, Any]], indicators: Optional[Dict[str, Dict[str, Any]]] = None):
+    """
+    Score a whole batch in one vectorized pass and add the *_score keys in place.
+    indicators (from load_price_indicators) are scored with the metrics but not added to them.
+    """
+    symbols = list(batch_metrics)
+    indicators = indicators or {}
+    scores = score_records([{**indicators.get(symbol, {}), **batch_metrics[symbol]} for symbol in symbols])
+    for symbol, symbol_scores in zip(symbols, scores):
+        batch_metrics[symbol].update(symbol_scores)
+        batch_metrics[symbol]["scoring_version"] = SCORING_VERSION
 
-def fetch_info(ticker: str):
-    try:
-        return yf.Ticker(ticker).info
-    except Exception as e:
-        print(f"Error fetching quote for {ticker}: {e}")
-        return {}
+def fetch_info(ticker: str, provider: Optional[MarketDataProvider] = None):
+    """
+    Fetch the provider info dict through the provider guard.
+    Failures raise a classified ProviderError instead of returning {}, so callers
+    can never mistake an error for a symbol without data.
+    """
+    provider = provider or get_provider()
+    return provider_guard.call(provider, provider.get_info, ticker)
 
-def calculate_3yr_revenue_growth(ticker: str) -> float:
+def calculate_3yr_revenue_growth(
+    ticker: str, provider: Optional[MarketDataProvider] = None, statements: Optional[StatementCache] = None
+) -> Optional[float]:
     """
     Calculate 3-year annualized revenue growth rate from historical financial data.
-    Returns the annualized growth rate as a decimal (e.g., 0.15 for 15%).
+    Returns the annualized growth rate as a decimal (e.g., 0.15 for 15%), or None
+    when the provider has no usable statements.
+    With a statement cache, financials are only downloaded when a new fiscal
+    year is expected; otherwise the cached frame is used.
+    Failed provider calls raise, failing the whole symbol: returning None would
+    overwrite the stored figure and zero its scoring rules until the next fetch.
     """
+    provider = provider or get_provider()
     try:
-        yf_ticker = yf.Ticker(ticker)
-        financials = yf_ticker.financials
-        
-        if 'Total Revenue' not in financials.index:
-            return None
-            
-        revenue_data = financials.loc['Total Revenue']
-        
-        # Need at least 2 years of data to calculate growth
-        if len(revenue_data) < 2:
-            return None
-            
-        # For 3-year growth, we want the most recent 4 years of data
-        # Take the first 4 years if available, otherwise use all available data
-        years_to_use = min(4, len(revenue_data))
-        recent_data = revenue_data.iloc[:years_to_use]
-        
-        # Get the most recent and oldest revenue data from our selection
-        latest_revenue = recent_data.iloc[0]  # Most recent
-        oldest_revenue = recent_data.iloc[-1]  # Oldest in our selection
-        
-        # Check for valid data
-        if latest_revenue <= 0 or oldest_revenue <= 0:
-            return None
-            
-        # Calculate annualized growth rate
-        years = len(recent_data) - 1
-        annualized_growth = ((latest_revenue / oldest_revenue) ** (1/years)) - 1
-        
-        # Convert numpy types to Python float to avoid database issues
-        return float(annualized_growth) if not pd.isna(annualized_growth) else None
-        
+        if statements is not None and statements.is_fresh(ticker):
+            return revenue_growth_from_financials(statements.get(ticker))
+        financials = provider_guard.call(provider, provider.get_financials, ticker)
+        if statements is not None:
+            statements.record(ticker, financials)
+        return revenue_growth_from_financials(financials)
+    except SymbolNotFoundError as e:
+        logger.warning("No financials for %s: %s", ticker, e, extra={"symbol": ticker})
+        return None
+    except ProviderError:
+        raise
     except Exception as e:
-        print(f"Error calculating 3-year revenue growth for {ticker}: {e}")
+        logger.warning("Error calculating 3-year revenue growth for %s: %s", ticker, e, extra={"symbol": ticker})
+        return None
+
+def revenue_growth_from_financials(financials: pd.DataFrame) -> Optional[float]:
+    """Annualized revenue growth over (up to) the last 3 fiscal years of a financials frame"""
+    if financials is None or 'Total Revenue' not in financials.index:
+        return None
+    
+    revenue_data = financials.loc['Total Revenue']
+    
+    # Need at least 2 years of data to calculate growth
+    if len(revenue_data) < 2:
+        return None
+        
+    # For 3-year growth, we want the most recent 4 years of data
+    # Take the first 4 years if available, otherwise use all available data
+    years_to_use = min(4, len(revenue_data))
+    recent_data = revenue_data.iloc[:years_to_use]
+    
+    # Get the most recent and oldest revenue data from our selection
+    latest_revenue = recent_data.iloc[0]  # Most recent
+    oldest_revenue = recent_data.iloc[-1]  # Oldest in our selection
+    
+    # Check for valid data
+    if latest_revenue <= 0 or oldest_revenue <= 0:
         return None
+        
+    # Calculate annualized growth rate
+    years = len(recent_data) - 1
+    annualized_growth = ((latest_revenue / oldest_revenue) ** (1/years)) - 1
+    
+    # Convert numpy types to Python float to avoid database issues
+    return float(annualized_growth) if not pd.isna(annualized_growth) else None
 
 def get_tickers_from_json() -> List[str]:
     """Load tickers from the existing JSON file"""
-    ticker_file = "tickers_nyse.json"
+    ticker_file = TICKER_FILE
     try:
         with open(ticker_file, "r") as f:
             ticker_data = json.load(f)
@@ -277,10 +176,10 @@ def get_tickers_from_json() -> List[str]:
             elif isinstance(ticker_data, dict):
                 return ticker_data.get('tickers', [])
             else:
-                print(f"Unexpected ticker file format: {type(ticker_data)}")
+                logger.error("Unexpected ticker file format: %s", type(ticker_data))
                 return []
     except FileNotFoundError:
-        print(f"Ticker file {ticker_file} not found")
+        logger.error("Ticker file %s not found", ticker_file)
         return []
 
 def get_or_create_progress(db: Session) -> TickerProgress:
@@ -293,30 +192,152 @@ def get_or_create_progress(db: Session) -> TickerProgress:
         db.refresh(progress)
     return progress
 
+def save_stocks_to_db(db: Session, batch_metrics: Dict[str, Dict[str, Any]], commit: bool = True):
+    """
+    Upsert a whole batch of stocks in a single INSERT ... ON CONFLICT (symbol) DO UPDATE.
+    Pass commit=False to fold the write into a larger transaction.
+    """
+    if not batch_metrics:
+        if commit:
+            db.commit()
+        return
+    
+    stock_columns = set(Stock.__table__.columns.keys())
+    
+    # Every row needs the same keys for a multi-row VALUES clause
+    keys = sorted({key for metrics in batch_metrics.values() for key in metrics if key in stock_columns} - {"symbol"})
+    rows = []
+    for symbol, metrics in batch_metrics.items():
+        # Clean metrics to remove infinite values before saving
+        row = {key: safe_json_value(metrics.get(key)) for key in keys}
+        row["symbol"] = symbol
+        rows.append(row)
+    
+    insert = upsert_insert(db)
+    if insert is not None:
+        stmt = insert(Stock).values(rows)
+        update_columns = {key: stmt.excluded[key] for key in keys}
+        update_columns["updated_at"] = func.now()
+        stmt = stmt.on_conflict_do_update(index_elements=[Stock.symbol], set_=update_columns)
+        db.execute(stmt)
+    else:
+        # Generic fallback for databases without ON CONFLICT support
+        for row in rows:
+            db.merge(Stock(**row))
+    
+    if commit:
+        db.commit()
+
 def save_stock_to_db(db: Session, symbol: str, metrics: Dict[str, Any]):
     """Save or update stock data in the database"""
-    # Clean metrics to remove infinite values before saving
-    clean_metrics = {}
-    for key, value in metrics.items():
-        clean_metrics[key] = safe_json_value(value)
+    save_stocks_to_db(db, {symbol: metrics})
+
+def build_stock_metrics(
+    symbol: str, provider: MarketDataProvider, statements: Optional[StatementCache] = None
+) -> Dict[str, Any]:
+    """Fetch provider data for one symbol and turn it into an (unscored) metrics dict"""
+    with INGEST_PHASE_SECONDS.labels("fetch_info").time():
+        info = fetch_info(symbol, provider)
+    logger.debug("Fetched info for %s", symbol, extra={"symbol": symbol})
+    
+    # Calculate 3-year revenue growth
+    with INGEST_PHASE_SECONDS.labels("revenue_growth_3yr").time():
+        revenue_growth_3yr = calculate_3yr_revenue_growth(symbol, provider, statements)
+    
+    # Safe division for debt-to-equity ratio
+    de_ratio = None
+    if info.get("debtToEquity") is not None:
+        try:
+            de_ratio = info.get("debtToEquity") / 100
+            if math.isinf(de_ratio) or math.isnan(de_ratio):
+                de_ratio = None
+        except (ZeroDivisionError, TypeError):
+            de_ratio = None
     
-    # Check if stock already exists
-    existing_stock = db.query(Stock).filter(Stock.symbol == symbol).first()
+    metrics = {
+        "name": info.get("shortName") if info.get("shortName") else info.get("displayName"),
+        "price": info.get("currentPrice"),
+        "pe_ratio": info.get("trailingPE"),
+        "ps_ratio": info.get("priceToSalesTrailing12Months"),
+        "pb_ratio": info.get("priceToBook"),
+        "peg_ratio": info.get("trailingPegRatio"),
+        "roe": info.get("returnOnEquity"),
+        "dividend_yield": info.get("dividendYield"),
+        "free_cash_flow": info.get("freeCashflow"),
+        "revenue_growth": info.get("revenueGrowth"),
+        "revenue_growth_3yr": revenue_growth_3yr,
+        "earnings_growth": info.get("earningsGrowth"),
+        "de_ratio": de_ratio,
+        "average_analyst_rating": info.get("averageAnalystRating").split(" - ")[1] if info.get("averageAnalystRating") else None,
+        "summary": info.get("longBusinessSummary"),
+        "industry": info.get("industry"),
+        "website": info.get("website"),
+        "last_fetched": datetime.utcnow(),
+    }
+    
+    return metrics
+
+def has_provider_data(metrics: Dict[str, Any]) -> bool:
+    """False when the provider returned nothing useful (delisted names, some ETFs, errors)"""
+    return metrics.get("name") is not None or metrics.get("price") is not None
+
+def fetch_batch_metrics(
+    batch: List[str], provider: Optional[MarketDataProvider] = None, statements: Optional[StatementCache] = None
+) -> Tuple[Dict[str, Dict[str, Any]], Dict[str, str]]:
+    """
+    Fetch metrics for a batch of symbols concurrently.
+    Returns (metrics by symbol, error kind by symbol). Symbols that fail or exceed
+    INGEST_SYMBOL_TIMEOUT only appear in the errors dict.
+    """
+    provider = provider or get_provider()
+    results: Dict[str, Dict[str, Any]] = {}
+    errors: Dict[str, str] = {}
+    worker_threads: Dict[str, int] = {}
     
-    if existing_stock:
-        # Update existing stock
-        for key, value in clean_metrics.items():
-            if hasattr(existing_stock, key):
-                setattr(existing_stock, key, value)
-        existing_stock.last_fetched = datetime.utcnow()
-    else:
-        # Create new stock
-        stock = Stock(symbol=symbol, **clean_metrics)
-        db.add(stock)
+    def worker(symbol: str) -> Dict[str, Any]:
+        worker_threads[symbol] = threading.get_ident()
+        return build_stock_metrics(symbol, provider, statements)
+    
+    try:
+        provider.prefetch(batch)
+    except Exception as e:
+        logger.warning("Error prefetching batch: %s", e)
+    
+    executor = ThreadPoolExecutor(max_workers=max(1, INGEST_CONCURRENCY), thread_name_prefix="ingest")
+    try:
+        pending = {executor.submit(worker, symbol): symbol for symbol in batch}
+        while pending:
+            done, _ = wait(pending, timeout=0.5, return_when=FIRST_COMPLETED)
+            for future in done:
+                symbol = pending.pop(future)
+                try:
+                    results[symbol] = future.result()
+                except ProviderError as e:
+                    errors[symbol] = e.kind
+                    logger.warning("Error processing %s (%s): %s", symbol, e.kind, e, extra={"symbol": symbol, "error_kind": e.kind})
+                except Exception as e:
+                    errors[symbol] = "transient"
+                    logger.warning("Error processing %s: %s", symbol, e, extra={"symbol": symbol, "error_kind": "transient"})
+            
+            # Abandon symbols stuck in a provider call for too long. Time spent
+            # waiting on the rate limiter doesn't count against the symbol.
+            now = time.monotonic()
+            for future, symbol in list(pending.items()):
+                thread_id = worker_threads.get(symbol)
+                start = provider_guard.call_started(thread_id) if thread_id is not None else None
+                if start is not None and now - start > INGEST_SYMBOL_TIMEOUT:
+                    logger.warning("⏱️ Timed out fetching %s after %.0fs, skipping", symbol, INGEST_SYMBOL_TIMEOUT, extra={"symbol": symbol})
+                    errors[symbol] = "timeout"
+                    del pending[future]
+    finally:
+        # Don't wait on abandoned threads, they finish in the background
+        executor.shutdown(wait=False, cancel_futures=True)
+        provider.release(batch)
     
-    db.commit()
+    # Preserve batch order so writes stay deterministic
+    return {symbol: results[symbol] for symbol in batch if symbol in results}, errors
 
-def get_stocks():
+def get_stocks(provider: Optional[MarketDataProvider] = None):
     """Main function to fetch and save stock data"""
     db = SessionLocal()
     
@@ -324,7 +345,13 @@ def get_stocks():
         # Get tickers from JSON file
         all_tickers = get_tickers_from_json()
         if not all_tickers:
-            print("No tickers found in JSON file")
+            logger.error("No tickers found in JSON file")
+            return []
+        
+        # Stay away from the provider while the circuit breaker is open
+        provider = provider or get_provider()
+        if not provider_guard.allow_batch(provider, probe_symbol=all_tickers[0]):
+            logger.info("⏸️ Provider circuit breaker open, skipping this run")
             return []
         
         # Get or create progress tracking
@@ -335,119 +362,268 @@ def get_stocks():
             progress.total_tickers = len(all_tickers)
             db.commit()
         
-        # Get current batch
-        index = progress.last_index
-        batch = all_tickers[index:index + BATCH_SIZE]
-        real_batch_size = len(batch)
+        if INGEST_SCHEDULE == "round_robin":
+            # Get current batch
+            index = progress.last_index
+            batch = all_tickers[index:index + BATCH_SIZE]
+            real_batch_size = len(batch)
+            wrapped = real_batch_size < BATCH_SIZE
+            if wrapped:
+                remaining = BATCH_SIZE - real_batch_size
+                batch += all_tickers[:remaining]
+                next_index = remaining
+            else:
+                next_index = index + BATCH_SIZE
+            # A universe smaller than one batch would otherwise repeat symbols
+            batch = list(dict.fromkeys(batch))
+        else:
+            # Lease the most urgent due symbols, so other workers skip them
+            batch = claim_due_symbols(db, all_tickers, BATCH_SIZE)
         
-        if real_batch_size < BATCH_SIZE:
-            remaining = BATCH_SIZE - real_batch_size
-            batch += all_tickers[:remaining]
+        if not batch:
+            logger.info("No symbols due for refresh")
+            return []
         
-        print(f"Processing batch starting at index {index}, processing {len(batch)} tickers")
+        if INGEST_SCHEDULE == "round_robin":
+            logger.info("Processing batch starting at index %d, processing %d tickers", index, len(batch))
+        else:
+            logger.info("Processing %d due symbols", len(batch))
         
-        for symbol in batch:
-            info = fetch_info(symbol)
-            print(f"Fetched info for {symbol}")
-            
-            # Calculate 3-year revenue growth
-            revenue_growth_3yr = calculate_3yr_revenue_growth(symbol)
-            
-            # Safe division for debt-to-equity ratio
-            de_ratio = None
-            if info.get("debtToEquity") is not None:
-                try:
-                    de_ratio = info.get("debtToEquity") / 100
-                    if math.isinf(de_ratio) or math.isnan(de_ratio):
-                        de_ratio = None
-                except (ZeroDivisionError, TypeError):
-                    de_ratio = None
-            
-            metrics = {
-                "name": info.get("shortName") if info.get("shortName") else info.get("displayName"),
-                "price": info.get("currentPrice"),
-                "pe_ratio": info.get("trailingPE"),
-                "ps_ratio": info.get("priceToSalesTrailing12Months"),
-                "pb_ratio": info.get("priceToBook"),
-                "peg_ratio": info.get("trailingPegRatio"),
-                "roe": info.get("returnOnEquity"),
-                "dividend_yield": info.get("dividendYield"),
-                "free_cash_flow": info.get("freeCashflow"),
-                "revenue_growth": info.get("revenueGrowth"),
-                "revenue_growth_3yr": revenue_growth_3yr,
-                "earnings_growth": info.get("earningsGrowth"),
-                "de_ratio": de_ratio,
-                "average_analyst_rating": info.get("averageAnalystRating").split(" - ")[1] if info.get("averageAnalystRating") else None,
-                "summary": info.get("longBusinessSummary"),
-                "industry": info.get("industry"),
-                "website": info.get("website"),
-                "last_fetched": datetime.utcnow(),
-            }
-            
-            # Calculate and add scores
-            metrics["balanced_score"] = calculate_stock_score(metrics, "balanced")
-            metrics["value_score"] = calculate_stock_score(metrics, "value")
-            metrics["growth_score"] = calculate_stock_score(metrics, "growth")
-            metrics["momentum_score"] = calculate_stock_score(metrics, "momentum")
-            metrics["quality_score"] = calculate_stock_score(metrics, "quality")
-            
-            # Save to database
-            save_stock_to_db(db, symbol, metrics)
+        started = time.monotonic()
+        statements = load_statements(db, batch)
+        indicators = load_price_indicators(db, batch)
+        # Don't sit in an open transaction during the network fetch
+        db.commit()
+        if INGEST_SCHEDULE == "round_robin":
+            fetched, errors = fetch_batch_metrics(batch, provider, statements)
+        else:
+            with LeaseHeartbeat(batch):
+                fetched, errors = fetch_batch_metrics(batch, provider, statements)
+        
+        # Empty info never overwrites a stored row
+        results = {symbol: metrics for symbol, metrics in fetched.items() if has_provider_data(metrics)}
+        
+        # Calculate and add scores for the whole batch at once
+        phase_started = time.perf_counter()
+        apply_scores(results, indicators)
+        observe_per_symbol("scoring", time.perf_counter() - phase_started, len(results))
+        
+        # Symbol-level errors, timeouts and empty info are backed off. Throttling
+        # is the provider's problem, so those symbols simply stay due.
+        failed = [
+            symbol for symbol in batch
+            if symbol not in results and errors.get(symbol) not in PROVIDER_BACKPRESSURE_ERRORS
+        ]
         
-        # Update progress
-        if real_batch_size < BATCH_SIZE:
-            progress.last_index = remaining
+        # The round-robin cursor only moves past symbols we actually got an answer for
+        if INGEST_SCHEDULE == "round_robin" and any(kind in PROVIDER_BACKPRESSURE_ERRORS for kind in errors.values()):
+            next_index, wrapped = index, False
+        
+        # Write the batch, its history rows, refresh state and progress cursor in one transaction
+        phase_started = time.perf_counter()
+        save_stocks_to_db(db, results, commit=False)
+        observe_per_symbol("save", time.perf_counter() - phase_started, len(results))
+        save_snapshots(db, results)
+        save_statements(db, statements)
+        record_refresh_results(db, results.keys(), failed)
+        if INGEST_SCHEDULE != "round_robin":
+            # Throttled symbols included: they stay due for whoever claims next
+            release_leases(db, batch)
+            # Other workers advance the same counters. Re-read the progress row
+            # under a lock (on SQLite the writes above already hold the database
+            # lock). A sweep is done once as many symbols have been answered as
+            # there are tickers; throttled ones were not, and stay due.
+            db.refresh(progress, with_for_update=True)
+            sweep_fetched = (progress.sweep_fetched or 0) + len(results) + len(failed)
+            wrapped = sweep_fetched >= len(all_tickers)
+            progress.sweep_fetched = 0 if wrapped else sweep_fetched
         else:
-            progress.last_index = index + BATCH_SIZE
+            progress.last_index = next_index
+        if results or wrapped:
+            mark_data_changed(progress, sweep_completed=wrapped)
+        version = progress.data_version
         
         db.commit()
         
-        print(f"✅ Saved {len(batch)} stocks to database")
-        print(f"Progress: {progress.last_index}/{progress.total_tickers} tickers processed")
+        # Invalidate cached API responses built from the previous data
+        bump_generation()
+        stock_lookup_cache.invalidate(results.keys())
+        
+        # Move only the changed symbols on each leaderboard
+        moves = leaderboards.apply_batch(results)
+        symbol_index.apply_batch(results)
+        # Push the deltas to connected /stocks/stream clients
+        change_feed.publish_batch(version, results, moves)
+        if wrapped:
+            # Wrapped around the ticker list: this sweep is the new rank-change baseline
+            leaderboards.snapshot_ranks()
+        
+        elapsed = time.monotonic() - started
+        rate = len(results) / elapsed if elapsed > 0 else 0.0
+        record_batch(len(results), len(failed), errors, elapsed)
+        logger.info(
+            "✅ Saved %d/%d stocks to database in %.1fs (%.2f symbols/sec)", len(results), len(batch), elapsed, rate,
+            extra={"saved": len(results), "batch_size": len(batch), "elapsed_seconds": round(elapsed, 3)},
+        )
+        if errors:
+            kinds = ", ".join(f"{kind}={list(errors.values()).count(kind)}" for kind in sorted(set(errors.values())))
+            logger.warning("⚠️ Provider errors this batch: %s; rate now %.2f req/s", kinds, rate_limiter.rate)
+        if INGEST_SCHEDULE == "round_robin":
+            logger.info("Progress: %d/%d tickers processed", progress.last_index, progress.total_tickers)
+        else:
+            logger.info("Sweep progress: %d/%d symbols fetched", progress.sweep_fetched, len(all_tickers))
         
         return []
         
     except Exception as e:
-        print(f"Error in get_stocks: {e}")
+        logger.exception("Error in get_stocks: %s", e)
         db.rollback()
         return []
     finally:
         db.close()
 
-def get_stocks_from_db(db: Session, limit: int = 100, strategy: str = "balanced") -> List[Dict]:
-    """Get stocks from database sorted by strategy score"""
+# Fields returned by the list endpoints, in response order
+STOCK_FIELDS = [
+    "symbol", "name", "price", "pe_ratio", "ps_ratio", "pb_ratio", "peg_ratio", "roe",
+    "dividend_yield", "free_cash_flow", "revenue_growth", "revenue_growth_3yr", "earnings_growth",
+    "de_ratio", "return_12_1m", "sma_50", "sma_200", "volatility", "prices_as_of",
+    "average_analyst_rating", "summary", "industry", "website", "last_fetched",
+    "balanced_score", "value_score", "growth_score", "momentum_score", "quality_score",
+]
+
+# Numeric columns that support min_/max_ range filters
+NUMERIC_FIELDS = [
+    field for field in STOCK_FIELDS
+    if isinstance(Stock.__table__.c[field].type, (Float, Integer))
+]
+
+def encode_cursor(score: int, symbol: str) -> str:
+    """Opaque keyset cursor for the (score desc, symbol) ordering"""
+    return base64.urlsafe_b64encode(json.dumps([score, symbol]).encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[int, str]:
+    """Inverse of encode_cursor. Raises ValueError on malformed input."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        score, symbol = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if not isinstance(symbol, str) or not isinstance(score, (int, float)):
+        raise ValueError("Invalid cursor")
+    return score, symbol
+
+def _stock_row_to_dict(fields: List[str], row) -> Dict[str, Any]:
+    # Values are scrubbed on write (save_stocks_to_db) and datetimes are left to
+    # the encoder, so this is a plain zip
+    return dict(zip(fields, row))
+
+# Largest limit served from the leaderboard + lookup cache instead of an ORDER BY query
+LEADERBOARD_READ_LIMIT = 1000
+
+def select_fields(fields: Optional[List[str]], strategy: str) -> List[str]:
+    """Projected fields in STOCK_FIELDS order; symbol and the strategy score are always included"""
+    if not fields:
+        return STOCK_FIELDS
+    unknown = [field for field in fields if field not in STOCK_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    requested = set(fields) | {"symbol", f"{strategy}_score"}
+    return [field for field in STOCK_FIELDS if field in requested]
+
+def build_stocks_query(
+    strategy: str,
+    selected: List[str],
+    filters: Optional[Dict[str, Tuple[Optional[float], Optional[float]]]] = None,
+    industry: Optional[str] = None,
+    cursor: Optional[str] = None,
+):
+    """SELECT of the selected columns, filtered and ordered by (score desc, symbol)"""
     score_column = getattr(Stock, f"{strategy}_score")
     
-    stocks = db.query(Stock).order_by(score_column.desc()).limit(limit).all()
+    # Rows that were never scored have no place in a ranking
+    query = select(*[Stock.__table__.c[field] for field in selected]).where(score_column.isnot(None))
+    
+    for field, (minimum, maximum) in (filters or {}).items():
+        if field not in NUMERIC_FIELDS:
+            raise ValueError(f"Cannot filter on {field}")
+        column = Stock.__table__.c[field]
+        if minimum is not None:
+            query = query.where(column >= minimum)
+        if maximum is not None:
+            query = query.where(column <= maximum)
+    
+    if industry is not None:
+        query = query.where(Stock.industry == industry)
+    
+    if cursor:
+        last_score, last_symbol = decode_cursor(cursor)
+        query = query.where(or_(
+            score_column < last_score,
+            and_(score_column == last_score, Stock.symbol > last_symbol),
+        ))
+    
+    # Matches the ix_stocks_<strategy>_rank indexes
+    return query.order_by(score_column.desc(), Stock.symbol)
+
+def _get_top_stocks_from_leaderboard(db: Session, limit: int, strategy: str, fields: Optional[List[str]]) -> List[Dict]:
+    symbols = [symbol for symbol, _ in leaderboards.top(db, strategy, limit)]
+    found = get_stocks_by_symbols(db, symbols)
+    selected = select_fields(fields, strategy)
+    return [{field: found[symbol][field] for field in selected} for symbol in symbols if symbol in found]
+
+def get_stocks_from_db(
+    db: Session,
+    limit: int = 100,
+    strategy: str = "balanced",
+    filters: Optional[Dict[str, Tuple[Optional[float], Optional[float]]]] = None,
+    industry: Optional[str] = None,
+    fields: Optional[List[str]] = None,
+    cursor: Optional[str] = None,
+) -> List[Dict]:
+    """
+    Get stocks from database sorted by strategy score (highest first, ties by symbol).
+    
+    filters maps numeric fields to inclusive (min, max) bounds, either of which may be None.
+    fields projects the SELECT down to those columns (symbol and the strategy score are always included).
+    cursor continues after the last row of a previous page (see encode_cursor).
+    """
+    # Plain top-N reads come straight off the precomputed leaderboard
+    if not filters and industry is None and cursor is None and limit <= LEADERBOARD_READ_LIMIT:
+        return _get_top_stocks_from_leaderboard(db, limit, strategy, fields)
     
-    result = []
-    for stock in stocks:
-        stock_dict = {
-            "symbol": stock.symbol,
-            "name": stock.name,
-            "price": safe_json_value(stock.price),
-            "pe_ratio": safe_json_value(stock.pe_ratio),
-            "ps_ratio": safe_json_value(stock.ps_ratio),
-            "pb_ratio": safe_json_value(stock.pb_ratio),
-            "peg_ratio": safe_json_value(stock.peg_ratio),
-            "roe": safe_json_value(stock.roe),
-            "dividend_yield": safe_json_value(stock.dividend_yield),
-            "free_cash_flow": safe_json_value(stock.free_cash_flow),
-            "revenue_growth": safe_json_value(stock.revenue_growth),
-            "revenue_growth_3yr": safe_json_value(stock.revenue_growth_3yr),
-            "earnings_growth": safe_json_value(stock.earnings_growth),
-            "de_ratio": safe_json_value(stock.de_ratio),
-            "average_analyst_rating": stock.average_analyst_rating,
-            "summary": stock.summary,
-            "industry": stock.industry,
-            "website": stock.website,
-            "last_fetched": stock.last_fetched.isoformat() if stock.last_fetched else None,
-            "balanced_score": safe_json_value(stock.balanced_score),
-            "value_score": safe_json_value(stock.value_score),
-            "growth_score": safe_json_value(stock.growth_score),
-            "momentum_score": safe_json_value(stock.momentum_score),
-            "quality_score": safe_json_value(stock.quality_score),
-        }
-        result.append(stock_dict)
+    selected = select_fields(fields, strategy)
+    query = build_stocks_query(strategy, selected, filters, industry, cursor).limit(limit)
     
-    return result
\ No newline at end of file
+    return [_stock_row_to_dict(selected, row) for row in db.execute(query)]
+
+_NOT_CACHED = object()
+
+def get_stocks_by_symbols(db: Session, symbols: List[str]) -> Dict[str, Dict[str, Any]]:
+    """Point/batch lookup by primary key, answered from the lookup cache where possible"""
+    found: Dict[str, Dict[str, Any]] = {}
+    missing = []
+    for symbol in symbols:
+        # Unknown symbols are cached as None, so tell them apart from cache misses
+        cached = stock_lookup_cache.get(symbol, _NOT_CACHED)
+        if cached is _NOT_CACHED:
+            missing.append(symbol)
+        elif cached is not None:
+            found[symbol] = cached
+    
+    if missing:
+        # Rows read before a concurrent ingestion commit must not be cached after it
+        generation = current_generation()
+        columns = [Stock.__table__.c[field] for field in STOCK_FIELDS]
+        rows = db.execute(select(*columns).where(Stock.symbol.in_(missing))).all()
+        loaded = {row[0]: _stock_row_to_dict(STOCK_FIELDS, row) for row in rows}
+        for symbol in missing:
+            stock = loaded.get(symbol)
+            stock_lookup_cache.put(symbol, stock, generation)
+            if stock is not None:
+                found[symbol] = stock
+    
+    return found
+
+def get_stock_by_symbol(db: Session, symbol: str) -> Optional[Dict[str, Any]]:
+    """Single stock by symbol, or None if we have never stored it"""
+    return get_stocks_by_symbols(db, [symbol]).get(symbol)
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Backtest the scoring strategies against stored snapshots: hold each
+strategy's top N stocks, rebalanced weekly or monthly, and compare with the
+equal-weighted universe. --sweep also scales every rule threshold by each
+--factors value and tries each --top-ns size, spread over a process pool.
+
+Usage: python backtest.py [--strategy NAME] [--top-n N] [--frequency weekly|monthly]
+                          [--start YYYY-MM-DD] [--end YYYY-MM-DD]
+                          [--sweep [--factors 0.8,1,1.2] [--top-ns 10,20,50] [--workers N]]
+                          [--output results.json]
+"""
+
+import argparse
+import time
+from datetime import date
+from app.database import SessionLocal, create_tables
+from app.services.backtest import (
+    load_panels, run_sweep, base_variant, threshold_variants, default_range,
+    BACKTEST_FREQUENCIES, BACKTEST_WORKERS, DEFAULT_TOP_N,
+)
+from app.services.scoring import STRATEGIES
+from app.services.serialization import dumps
+from app.services.logging_setup import configure_logging
+
+COLUMNS = [
+    ("annualized_return", "ann. return"), ("benchmark_annualized_return", "benchmark"),
+    ("annualized_volatility", "volatility"), ("sharpe", "sharpe"), ("max_drawdown", "max dd"),
+    ("hit_rate", "hit rate"), ("win_rate", "win rate"), ("turnover", "turnover"),
+]
+
+def number_list(value: str, kind=float):
+    return [kind(part) for part in value.split(",") if part.strip()]
+
+def format_value(key: str, value) -> str:
+    if value is None:
+        return "-"
+    return f"{value:.2f}" if key == "sharpe" else f"{value:.1%}"
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backtest scoring strategies over stored snapshots")
+    parser.add_argument("--strategy", choices=STRATEGIES, help="Only this strategy (default: all)")
+    parser.add_argument("--top-n", type=int, default=DEFAULT_TOP_N)
+    parser.add_argument("--frequency", choices=list(BACKTEST_FREQUENCIES), default="monthly")
+    parser.add_argument("--start", type=date.fromisoformat)
+    parser.add_argument("--end", type=date.fromisoformat)
+    parser.add_argument("--sweep", action="store_true", help="Try every threshold factor and portfolio size")
+    parser.add_argument("--factors", type=number_list, default=[0.8, 0.9, 1.0, 1.1, 1.2])
+    parser.add_argument("--top-ns", type=lambda value: number_list(value, int), default=[10, 20, 50])
+    parser.add_argument("--workers", type=int, default=BACKTEST_WORKERS)
+    parser.add_argument("--output", help="Also write the results as JSON to this file")
+    args = parser.parse_args()
+    configure_logging()
+
+    # Make sure the snapshot table exists on a fresh database
+    create_tables()
+
+    default_start, default_end = default_range(args.frequency)
+    start, end = args.start or default_start, args.end or default_end
+    strategies = [args.strategy] if args.strategy else STRATEGIES
+
+    db = SessionLocal()
+    try:
+        started = time.perf_counter()
+        panels = load_panels(db, start, end, args.frequency)
+    finally:
+        db.close()
+    print(
+        f"📊 Loaded {len(panels.dates)} {args.frequency} dates x {len(panels.symbols)} symbols "
+        f"({start} to {end}) in {time.perf_counter() - started:.1f}s"
+    )
+
+    if args.sweep:
+        variants = threshold_variants(strategies, args.factors, args.top_ns)
+    else:
+        variants = [base_variant(strategy, args.top_n) for strategy in strategies]
+    started = time.perf_counter()
+    results = run_sweep(panels, variants, workers=args.workers)
+    print(f"⏱️ Ran {len(variants)} backtests in {time.perf_counter() - started:.1f}s")
+    if args.sweep:
+        results.sort(key=lambda result: result.get("sharpe") if result.get("sharpe") is not None else float("-inf"), reverse=True)
+
+    width = max(len(result["name"]) for result in results)
+    print(f"{'variant':<{width}}  " + "  ".join(f"{label:>11}" for _, label in COLUMNS))
+    for result in results:
+        print(f"{result['name']:<{width}}  " + "  ".join(f"{format_value(key, result.get(key)):>11}" for key, _ in COLUMNS))
+
+    if args.output:
+        with open(args.output, "wb") as output:
+            output.write(dumps(results))
+        print(f"✅ Wrote {len(results)} results to {args.output}")
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark for the /stocks list serialization path: cost per 1,000 rows of
+turning result tuples into a response body, before and after the orjson path.
+
+Usage (from backend/): python -m benchmarks.bench_serialization [--rows N] [--repeat N]
+"""
+
+import argparse
+import json
+import math
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+from fastapi.encoders import jsonable_encoder
+from app.services.stock_fetcher import STOCK_FIELDS, NUMERIC_FIELDS, _stock_row_to_dict
+from app.services.serialization import dumps, dumps_ndjson
+
+def synthetic_rows(n: int):
+    """Result tuples shaped like a full-width SELECT on stocks"""
+    rng = random.Random(42)
+    now = datetime.utcnow()
+    rows = []
+    for i in range(n):
+        row = []
+        for field in STOCK_FIELDS:
+            if field == "symbol":
+                row.append(f"S{i:05d}")
+            elif field == "last_fetched":
+                row.append(now - timedelta(seconds=rng.randint(0, 86400)))
+            elif field.endswith("_score"):
+                row.append(rng.randint(0, 100))
+            elif field in NUMERIC_FIELDS:
+                row.append(None if rng.random() < 0.1 else rng.uniform(-1, 100))
+            else:
+                row.append(f"{field} text for row {i}")
+        rows.append(tuple(row))
+    return rows
+
+def legacy_safe_json_value(value):
+    if isinstance(value, (int, float)) and (math.isinf(value) or math.isnan(value)):
+        return None
+    return value
+
+def legacy_row_to_dict(row):
+    stock_dict = {}
+    for field, value in zip(STOCK_FIELDS, row):
+        if field == "last_fetched":
+            value = value.isoformat() if value else None
+        elif field in NUMERIC_FIELDS:
+            value = legacy_safe_json_value(value)
+        stock_dict[field] = value
+    return stock_dict
+
+def before(rows) -> bytes:
+    """Per-value scrubbing, then FastAPI's jsonable_encoder and stdlib json"""
+    stocks = [legacy_row_to_dict(row) for row in rows]
+    return json.dumps(jsonable_encoder(stocks)).encode("utf-8")
+
+def after(rows) -> bytes:
+    stocks = [_stock_row_to_dict(STOCK_FIELDS, row) for row in rows]
+    return dumps(stocks)
+
+def after_ndjson(rows) -> bytes:
+    stocks = [_stock_row_to_dict(STOCK_FIELDS, row) for row in rows]
+    return dumps_ndjson(stocks)
+
+def time_per_1000(fn, rows, repeat: int) -> float:
+    """Median milliseconds per 1,000 rows"""
+    fn(rows)  # Warm up
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn(rows)
+        samples.append((time.perf_counter() - started) * 1000 * 1000 / len(rows))
+    return statistics.median(samples)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark list response serialization")
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    rows = synthetic_rows(args.rows)
+    baseline = time_per_1000(before, rows, args.repeat)
+    print(f"{'path':<28}{'ms / 1k rows':>14}{'speedup':>10}")
+    for name, fn in [("before (dict + json)", before), ("after (tuples + orjson)", after), ("after (ndjson)", after_ndjson)]:
+        cost = baseline if fn is before else time_per_1000(fn, rows, args.repeat)
+        print(f"{name:<28}{cost:>14.2f}{baseline / cost:>9.1f}x")
@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite for the hot paths: scoring, backtests, batch persistence, list
+reads and end-to-end GET /stocks through the ASGI app. Loads a synthetic universe of
+--rows stocks (10k to 1M) into a scratch database first.
+
+Results are written as JSON (--output). Pass --baseline with an earlier
+results file to compare: any metric more than --tolerance slower than the
+baseline is reported and the exit code is 1, so CI can fail the build.
+All metrics are timings, lower is better.
+
+The database is wiped: by default a temporary SQLite file, or a local
+PostgreSQL scratch database given with --database-url.
+
+Usage (from backend/):
+    python -m benchmarks.suite --rows 100000 --output bench.json
+    python -m benchmarks.suite --rows 100000 --baseline bench.json --tolerance 0.25
+
+benchmarks/baseline.json is the reference run, recorded with the defaults
+(--rows 10000, temporary SQLite) on a 1 vCPU x86_64 Xeon VM under Python 3.11
+(see its "meta"). CI runs, from backend/:
+    python -m benchmarks.suite --rows 10000 --baseline benchmarks/baseline.json --tolerance 0.5
+The wider tolerance is for shared runners, where the p95/p99 request
+latencies alone move by up to 50% between runs of the same code. Timings only
+compare on like hardware: re-record the baseline (--output) when the runner
+changes, and along with any change that is meant to move the numbers.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterator, List
+import numpy as np
+
+# Leaves room under SQLite's 32,766 bound parameters per statement
+LOAD_CHUNK_SIZE = 1000
+LIST_LIMITS = [10, 100, 1000, 5000]
+INDUSTRIES = ["Software", "Banks", "Utilities", "Biotechnology", "Retail", "Oil & Gas", "REIT", "Semiconductors"]
+RATINGS = ["Strong Buy", "Buy", "Hold", "Underperform", "Sell"]
+SYNTHETIC_RANGES = {
+    "price": (1, 800), "pe_ratio": (-30, 90), "ps_ratio": (0.1, 25), "pb_ratio": (-2, 20),
+    "peg_ratio": (-1, 5), "roe": (-0.4, 0.6), "dividend_yield": (0, 8), "free_cash_flow": (-2e9, 2e10),
+    "revenue_growth": (-0.4, 0.8), "revenue_growth_3yr": (-0.2, 0.6), "earnings_growth": (-0.8, 1.5),
+    "de_ratio": (0, 4), "return_12_1m": (-0.6, 1.2), "sma_50": (1, 800), "sma_200": (1, 800),
+    "volatility": (0.1, 1.2),
+}
+# Three years of weekly rebalances
+BACKTEST_DATES = 157
+
+def synthetic_chunks(n: int, chunk_size: int = LOAD_CHUNK_SIZE, seed: int = 42) -> Iterator[Dict[str, Dict[str, Any]]]:
+    """
+    The universe as {symbol: metrics} chunks, generated column-wise so 1M rows
+    never sit in memory at once. Roughly 10% of each metric is missing, like
+    real provider data.
+    """
+    rng = np.random.default_rng(seed)
+    now = datetime.utcnow()
+    for start in range(0, n, chunk_size):
+        size = min(chunk_size, n - start)
+        columns = {}
+        for field, (low, high) in SYNTHETIC_RANGES.items():
+            values = rng.uniform(low, high, size)
+            columns[field] = [None if missing else float(value) for value, missing in zip(values, rng.random(size) < 0.1)]
+        industries = rng.integers(0, len(INDUSTRIES), size)
+        ratings = rng.integers(0, len(RATINGS), size)
+        chunk = {}
+        for i in range(size):
+            symbol = f"S{start + i:07d}"
+            metrics = {field: values[i] for field, values in columns.items()}
+            metrics.update(
+                name=f"Synthetic {symbol}", industry=INDUSTRIES[industries[i]],
+                average_analyst_rating=RATINGS[ratings[i]], website=f"https://example.com/{symbol}",
+                summary=f"Synthetic company {symbol} for benchmarking.", last_fetched=now,
+            )
+            chunk[symbol] = metrics
+        yield chunk
+
+def timed(fn: Callable[[], Any], repeat: int) -> List[float]:
+    """Wall time of each call in milliseconds, after one warm-up call"""
+    fn()
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+def percentiles(samples: List[float]) -> Dict[str, float]:
+    cuts = statistics.quantiles(samples, n=100, method="inclusive")
+    return {"p50": statistics.median(samples), "p95": cuts[94], "p99": cuts[98]}
+
+def load_universe(rows: int, results: Dict[str, Dict]):
+    from app.database import SessionLocal
+    from app.services.stock_fetcher import apply_scores, save_stocks_to_db
+    db = SessionLocal()
+    started = time.perf_counter()
+    try:
+        for chunk in synthetic_chunks(rows):
+            apply_scores(chunk)
+            save_stocks_to_db(db, chunk)
+    finally:
+        db.close()
+    elapsed = (time.perf_counter() - started) * 1000
+    results["persist.bulk_load_per_1k_rows"] = {"value": elapsed * 1000 / rows, "unit": "ms"}
+    print(f"📦 Loaded {rows} synthetic stocks in {elapsed / 1000:.1f}s")
+
+def bench_scoring(sample: int, repeat: int, results: Dict[str, Dict]):
+    from app.services.scoring import STRATEGIES, score_records
+    from app.services.stock_fetcher import calculate_stock_score
+    records = list(next(synthetic_chunks(sample, chunk_size=sample, seed=7)).values())
+    for strategy in STRATEGIES:
+        samples = timed(lambda: [calculate_stock_score(record, strategy) for record in records], repeat)
+        results[f"score.calculate_stock_score.{strategy}_per_1k_rows"] = {
+            "value": statistics.median(samples) * 1000 / sample, "unit": "ms",
+        }
+    samples = timed(lambda: score_records(records), repeat)
+    results["score.score_records.all_strategies_per_1k_rows"] = {
+        "value": statistics.median(samples) * 1000 / sample, "unit": "ms",
+    }
+
+def bench_backtest(symbols: int, repeat: int, results: Dict[str, Dict]):
+    from app.services.backtest import Panels, base_variant, run_variant
+    from app.services.scoring import STRATEGIES, rule_fields
+    rng = np.random.default_rng(11)
+    shape = (BACKTEST_DATES, symbols)
+    fields = {field: rng.uniform(*SYNTHETIC_RANGES[field], shape) for field in rule_fields()}
+    prices = 100 * np.exp(np.cumsum(rng.normal(0.001, 0.04, shape), axis=0))
+    dates = np.arange(BACKTEST_DATES) * np.timedelta64(7, "D") + np.datetime64("2022-01-07")
+    panels = Panels("weekly", dates, [f"S{i:07d}" for i in range(symbols)], fields, prices, rng.random(shape) > 0.05)
+    for strategy in STRATEGIES:
+        variant = base_variant(strategy)
+        samples = timed(lambda: run_variant(panels, variant), repeat)
+        results[f"backtest.run_variant.{strategy}_per_1k_symbols"] = {
+            "value": statistics.median(samples) * 1000 / symbols, "unit": "ms",
+        }
+
+def bench_persistence(rows: int, batch_size: int, repeat: int, results: Dict[str, Dict]):
+    from app.database import SessionLocal
+    from app.services.stock_fetcher import apply_scores, save_stock_to_db, save_stocks_to_db
+    # Re-save existing symbols, like a refresh sweep does (one batch per timed call plus the warm-up)
+    batches = list(synthetic_chunks(min(rows, batch_size * (repeat + 1)), batch_size, seed=11))
+    for batch in batches:
+        apply_scores(batch)
+
+    db = SessionLocal()
+    try:
+        pending = iter(batches * 2)
+        samples = timed(lambda: save_stocks_to_db(db, next(pending)), repeat)
+        results["persist.save_stocks_to_db_per_batch"] = {"value": statistics.median(samples), "unit": "ms", "batch_size": batch_size}
+
+        def save_one_by_one():
+            for symbol, metrics in next(pending).items():
+                save_stock_to_db(db, symbol, metrics)
+        pending = iter(batches * 2)
+        samples = timed(save_one_by_one, repeat)
+        results["persist.save_stock_to_db_per_batch"] = {"value": statistics.median(samples), "unit": "ms", "batch_size": batch_size}
+    finally:
+        db.close()
+
+def bench_reads(repeat: int, results: Dict[str, Dict]):
+    from app.database import SessionLocal
+    from app.services.cache import stock_lookup_cache
+    from app.services.leaderboard import leaderboards
+    from app.services.stock_fetcher import get_stocks_from_db
+
+    db = SessionLocal()
+    try:
+        started = time.perf_counter()
+        leaderboards.ensure_loaded(db)
+        results["read.leaderboard_load"] = {"value": (time.perf_counter() - started) * 1000, "unit": "ms"}
+
+        for limit in LIST_LIMITS:
+            # Top-N off the in-memory leaderboard (limits up to 1000), with a cold lookup cache
+            def top_n():
+                stock_lookup_cache.clear()
+                get_stocks_from_db(db, limit=limit)
+            results[f"read.get_stocks_from_db.limit_{limit}"] = {"value": statistics.median(timed(top_n, repeat)), "unit": "ms"}
+
+            # A range filter always goes to SQL
+            filtered = lambda: get_stocks_from_db(db, limit=limit, filters={"pe_ratio": (0, 40)})
+            results[f"read.get_stocks_from_db.filtered.limit_{limit}"] = {"value": statistics.median(timed(filtered, repeat)), "unit": "ms"}
+    finally:
+        db.close()
+
+async def asgi_get(app, path: str, query: str = "") -> int:
+    """One GET straight through the ASGI app, no server or HTTP client in between"""
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "root_path": "",
+        "query_string": query.encode(), "headers": [(b"host", b"benchmark")],
+        "client": ("127.0.0.1", 0), "server": ("benchmark", 80),
+    }
+    status = 0
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    await app(scope, receive, send)
+    return status
+
+async def bench_http(requests: int, results: Dict[str, Dict]):
+    from main import app
+    from app.database import dispose_engines
+    from app.services.cache import bump_generation
+
+    cases = [
+        ("limit_100", "limit=100"),
+        ("limit_1000", "limit=1000"),
+        ("filtered_limit_100", "limit=100&min_roe=0.15&max_pe_ratio=30"),
+        ("industry_limit_100", "limit=100&industry=Software"),
+    ]
+    try:
+        for name, query in cases:
+            for cached in (False, True):
+                samples = []
+                for _ in range(requests + 1):
+                    if not cached:
+                        # New data generation: the response cache misses
+                        bump_generation()
+                    started = time.perf_counter()
+                    status = await asgi_get(app, "/stocks", query)
+                    samples.append((time.perf_counter() - started) * 1000)
+                    if status != 200:
+                        raise RuntimeError(f"GET /stocks?{query} returned {status}")
+                label = "cached" if cached else "uncached"
+                for stat, value in percentiles(samples[1:]).items():
+                    results[f"http.get_stocks.{name}.{label}.{stat}"] = {"value": value, "unit": "ms"}
+    finally:
+        await dispose_engines()
+
+def compare(results: Dict[str, Dict], baseline: Dict[str, Dict], tolerance: float, noise_floor: float) -> List[str]:
+    """Names of metrics that got slower than the baseline by more than tolerance"""
+    regressions = []
+    print(f"\n{'metric':<62}{'baseline':>12}{'current':>12}{'change':>9}")
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        before, after = baseline[name]["value"], result["value"]
+        change = (after - before) / before if before else 0.0
+        # Sub-noise-floor differences are jitter, whatever the ratio
+        regressed = change > tolerance and after - before > noise_floor
+        flag = "  ❌" if regressed else ""
+        print(f"{name:<62}{before:>12.3f}{after:>12.3f}{change:>+8.0%}{flag}")
+        if regressed:
+            regressions.append(name)
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark scoring, persistence, reads and GET /stocks")
+    parser.add_argument("--rows", type=int, default=10000, help="Synthetic universe size")
+    parser.add_argument("--database-url", help="Scratch database (wiped!). Defaults to a temporary SQLite file")
+    parser.add_argument("--repeat", type=int, default=20, help="Timed repetitions per in-process benchmark")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per GET /stocks case")
+    parser.add_argument("--score-sample", type=int, default=10000, help="Records per scoring run")
+    parser.add_argument("--batch-size", type=int, default=30, help="Stocks per persistence batch (INGEST_BATCH_SIZE)")
+    parser.add_argument("--output", help="Write results JSON here")
+    parser.add_argument("--baseline", help="Results JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed slowdown before flagging, 0.2 = 20%%")
+    parser.add_argument("--noise-floor-ms", type=float, default=0.25, help="Ignore slowdowns smaller than this")
+    args = parser.parse_args()
+
+    os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='bench_'), 'bench.db')}"
+    # The API process must not start ingesting underneath the benchmark
+    os.environ["RUN_INGESTION"] = "off"
+    from app.database import Base, get_engine, create_tables
+    import app.models  # noqa: F401  (registers the tables)
+
+    Base.metadata.drop_all(bind=get_engine())
+    create_tables()
+
+    results: Dict[str, Dict] = {}
+    load_universe(args.rows, results)
+    print("🧮 Scoring")
+    bench_scoring(min(args.score_sample, args.rows), args.repeat, results)
+    print("📈 Backtest")
+    bench_backtest(min(args.score_sample, args.rows), args.repeat, results)
+    print("💾 Persistence")
+    bench_persistence(args.rows, args.batch_size, args.repeat, results)
+    print("📖 Reads")
+    bench_reads(args.repeat, results)
+    print("🌐 GET /stocks")
+    asyncio.run(bench_http(args.requests, results))
+
+    report = {
+        "meta": {
+            "rows": args.rows,
+            "database": get_engine().dialect.name,
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "timestamp": datetime.utcnow().isoformat(),
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+        print(f"📝 Wrote {len(results)} results to {args.output}")
+    else:
+        print(json.dumps(report, indent=2, sort_keys=True))
+
+    if args.baseline:
+        with open(args.baseline, "r") as f:
+            baseline = json.load(f)
+        if baseline.get("meta", {}).get("rows") != args.rows:
+            print(f"⚠️ Baseline was recorded with {baseline['meta'].get('rows')} rows, this run used {args.rows}")
+        regressions = compare(results, baseline["results"], args.tolerance, args.noise_floor_ms)
+        if regressions:
+            print(f"\n❌ {len(regressions)} regressions beyond {args.tolerance:.0%}")
+            sys.exit(1)
+        print(f"\n✅ No regressions beyond {args.tolerance:.0%}")
+
+if __name__ == "__main__":
+    main()
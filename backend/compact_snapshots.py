@@ -0,0 +1,23 @@
+#!/usr/bin/env python3
+"""
+Move stock snapshot history older than SNAPSHOT_RETENTION_MONTHS out of the
+database into monthly Parquet files under SNAPSHOT_ARCHIVE_DIR.
+The API server also runs this once a day.
+
+Usage: python compact_snapshots.py
+"""
+
+from app.database import SessionLocal, create_tables
+from app.services.snapshots import compact_snapshots, SNAPSHOT_ARCHIVE_DIR
+from app.services.logging_setup import configure_logging
+
+if __name__ == "__main__":
+    configure_logging()
+    create_tables()
+
+    db = SessionLocal()
+    try:
+        result = compact_snapshots(db)
+        print(f"✅ Archived {result['rows']} snapshots ({', '.join(result['months']) or 'nothing to do'}) to {SNAPSHOT_ARCHIVE_DIR}")
+    finally:
+        db.close()
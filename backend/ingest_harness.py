@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Local harness for multi-worker ingestion. Starts N ingestion worker processes
+against the synthetic provider, lets them sweep a ticker universe once while
+sharing it through symbol leases, then checks the result: every symbol
+fetched, none fetched twice.
+
+By default each run uses a throwaway SQLite database. Pass --database-url to
+run against PostgreSQL instead (use an empty database, it gets written to).
+--kill-after stops worker 0 with SIGKILL mid-sweep to exercise lease expiry:
+its claimed symbols must be picked up by the others once the lease runs out.
+
+Usage: python ingest_harness.py [--workers 4] [--symbols 1000] [--latency-ms 50]
+                                [--kill-after 3 --lease-seconds 5]
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import signal
+import sys
+import tempfile
+import time
+
+def worker_main(worker_id: str, env: dict, deadline: float):
+    """Runs in a spawned process, so the settings are read from env on import"""
+    os.environ.update(env)
+    os.environ["INGEST_WORKER_ID"] = worker_id
+    from sqlalchemy import select, func
+    from app.database import SessionLocal
+    from app.models import SymbolRefreshState
+    from app.services.stock_fetcher import get_stocks
+    from app.services.logging_setup import configure_logging
+
+    configure_logging()
+    while time.time() < deadline:
+        db = SessionLocal()
+        try:
+            remaining = db.execute(
+                select(func.count()).select_from(SymbolRefreshState).where(SymbolRefreshState.last_fetched.is_(None))
+            ).scalar()
+        finally:
+            db.close()
+        if remaining == 0:
+            break
+        get_stocks()
+        time.sleep(0.05)
+
+def write_universe(directory: str, n: int) -> list:
+    """The first n tickers of tickers_nyse.json, padded with made-up symbols if needed"""
+    with open("tickers_nyse.json", "r") as f:
+        tickers = json.load(f)
+    tickers = tickers[:n] + [f"SYN{i:06d}" for i in range(max(0, n - len(tickers)))]
+    with open(os.path.join(directory, "tickers.json"), "w") as f:
+        json.dump(tickers, f)
+    return tickers
+
+def main():
+    parser = argparse.ArgumentParser(description="Run several ingestion workers against a fake provider")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--symbols", type=int, default=1000)
+    parser.add_argument("--latency-ms", type=float, default=50, help="Simulated provider latency per call")
+    parser.add_argument("--database-url", help="Defaults to a temporary SQLite file")
+    parser.add_argument("--lease-seconds", type=float, default=120)
+    parser.add_argument("--kill-after", type=float, help="SIGKILL worker 0 after this many seconds")
+    parser.add_argument("--timeout", type=float, default=600)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="ingest_harness_")
+    tickers = write_universe(workdir, args.symbols)
+    env = {
+        "DATABASE_URL": args.database_url or f"sqlite:///{os.path.join(workdir, 'harness.db')}",
+        "MARKET_DATA_PROVIDER": "synthetic",
+        "SYNTHETIC_LATENCY_MS": str(args.latency_ms),
+        "TICKER_FILE": os.path.join(workdir, "tickers.json"),
+        "INGEST_SCHEDULE": "priority",
+        "INGEST_RATE_LIMIT": "0",
+        "INGEST_LEASE_SECONDS": str(args.lease_seconds),
+        "SNAPSHOT_ARCHIVE_DIR": os.path.join(workdir, "archive"),
+    }
+    os.environ.update(env)
+    from sqlalchemy import select, func
+    from app.database import SessionLocal, create_tables
+    from app.models import Stock, StockSnapshot, SymbolRefreshState
+    from app.services.refresh_queue import sync_universe
+    from app.services.logging_setup import configure_logging
+
+    configure_logging()
+    create_tables()
+    db = SessionLocal()
+    try:
+        # Workers stop once every symbol in the work table has been fetched
+        sync_universe(db, tickers)
+    finally:
+        db.close()
+    print(f"🧪 {args.workers} workers, {len(tickers)} symbols, {args.latency_ms:.0f}ms provider latency, workdir {workdir}")
+
+    context = multiprocessing.get_context("spawn")
+    deadline = time.time() + args.timeout
+    started = time.monotonic()
+    processes = [
+        context.Process(target=worker_main, args=(f"harness-{i}", env, deadline), name=f"harness-{i}")
+        for i in range(args.workers)
+    ]
+    for process in processes:
+        process.start()
+
+    if args.kill_after is not None:
+        time.sleep(args.kill_after)
+        os.kill(processes[0].pid, signal.SIGKILL)
+        print(f"💀 Killed worker harness-0 after {args.kill_after:.1f}s")
+
+    for process in processes:
+        process.join()
+    elapsed = time.monotonic() - started
+
+    db = SessionLocal()
+    try:
+        stored = db.execute(select(func.count()).select_from(Stock)).scalar()
+        fetches = dict(db.execute(
+            select(StockSnapshot.symbol, func.count()).group_by(StockSnapshot.symbol)
+        ).all())
+        unleased = db.execute(
+            select(func.count()).select_from(SymbolRefreshState).where(SymbolRefreshState.lease_owner.isnot(None))
+        ).scalar()
+    finally:
+        db.close()
+
+    missing = [symbol for symbol in tickers if symbol not in fetches]
+    duplicated = {symbol: count for symbol, count in fetches.items() if count > 1}
+    print(f"⏱️ Swept {stored}/{len(tickers)} symbols in {elapsed:.1f}s ({stored / elapsed:.1f} symbols/sec)")
+    print(f"   never fetched: {len(missing)}, fetched more than once: {len(duplicated)}, leases still held: {unleased}")
+    if missing or duplicated:
+        print(f"❌ Missing {missing[:10]}, duplicated {list(duplicated.items())[:10]}")
+        sys.exit(1)
+    print("✅ Every symbol fetched exactly once")
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,29 @@
 # main.py
 
+import logging
 import os
+import time
 import uvicorn
-from app.services.stock_fetcher import get_stocks
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from app.routes import stocks
+from app.routes import stocks, admin, metrics, backtest
 from apscheduler.schedulers.background import BackgroundScheduler
-from app.database import create_tables
+from app.database import create_tables, dispose_engines
+from app.services.ingestion_worker import add_ingestion_jobs
+from app.services.leader import ingestion_leader
+from app.services.cache_sync import sync_caches, CACHE_SYNC_SECONDS
+from app.services.logging_setup import configure_logging
+from app.services.metrics import REQUEST_SECONDS
+
+configure_logging()
+logger = logging.getLogger(__name__)
 
 app = FastAPI()
 
+# "leader": this process joins the ingestion leader election (fine for a single
+# web service). "off": serve reads only and run worker.py separately.
+RUN_INGESTION = os.getenv("RUN_INGESTION", "leader")
+
 # Dynamic CORS origins based on environment
 def get_allowed_origins():
     origins = [
@@ -40,17 +53,41 @@ app.add_middleware(
     allow_headers=["*"],
 )
 app.include_router(stocks.router)
+app.include_router(admin.router)
+app.include_router(metrics.router)
+app.include_router(backtest.router)
+
+@app.middleware("http")
+async def time_requests(request: Request, call_next):
+    """Request latency by route template (/stocks/{symbol}, not every symbol). Streams are timed to their first byte."""
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        REQUEST_SECONDS.labels(request.method, route.path if route else "unmatched", str(status)).observe(time.perf_counter() - started)
 
 @app.on_event("startup")
 def start_scheduler():
     # Create database tables
     create_tables()
-    print("🗄️ Database tables created!")
+    logger.info("🗄️ Database tables created!")
     
     scheduler = BackgroundScheduler()
-    scheduler.add_job(get_stocks, "interval", minutes=0.5) # every 30 seconds
+    # Pick up data written by whichever process is ingesting
+    scheduler.add_job(sync_caches, "interval", seconds=CACHE_SYNC_SECONDS, coalesce=True, max_instances=1)
+    if RUN_INGESTION == "leader":
+        add_ingestion_jobs(scheduler)
     scheduler.start()
-    print("⏰ Scheduler started!")
+    logger.info("⏰ Scheduler started! (ingestion: %s)", RUN_INGESTION)
+
+@app.on_event("shutdown")
+async def close_engines():
+    ingestion_leader.release()
+    await dispose_engines()
 
 if __name__ == "__main__":
     # For development, use localhost; for production, use 0.0.0.0
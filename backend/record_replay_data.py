@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+Record live provider payloads to disk so ingestion can run offline with
+MARKET_DATA_PROVIDER=replay.
+
+Usage: python record_replay_data.py [--limit N] [--out replay_data]
+"""
+
+import argparse
+from datetime import date, timedelta
+from app.services.providers import YFinanceProvider, RecordingProvider, REPLAY_DATA_DIR
+from app.services.stock_fetcher import get_tickers_from_json
+from app.services.price_history import PRICE_HISTORY_DAYS, PRICE_DOWNLOAD_BATCH
+
+def record(limit: int, out_dir: str):
+    tickers = get_tickers_from_json()
+    if limit:
+        tickers = tickers[:limit]
+
+    provider = RecordingProvider(YFinanceProvider(), out_dir)
+    for i, symbol in enumerate(tickers, start=1):
+        provider.prefetch([symbol])
+        try:
+            provider.get_info(symbol)
+            provider.get_financials(symbol)
+            print(f"✅ [{i}/{len(tickers)}] Recorded {symbol}")
+        except Exception as e:
+            print(f"❌ [{i}/{len(tickers)}] Failed to record {symbol}: {e}")
+        finally:
+            provider.release([symbol])
+
+    # Daily bars come in batched downloads
+    start = date.today() - timedelta(days=PRICE_HISTORY_DAYS)
+    for i in range(0, len(tickers), PRICE_DOWNLOAD_BATCH):
+        chunk = tickers[i:i + PRICE_DOWNLOAD_BATCH]
+        try:
+            provider.get_price_history(chunk, start)
+            print(f"✅ Recorded price history for {len(chunk)} symbols")
+        except Exception as e:
+            print(f"❌ Failed to record price history for {len(chunk)} symbols: {e}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Record provider payloads for offline replay")
+    parser.add_argument("--limit", type=int, default=0, help="Only record the first N tickers")
+    parser.add_argument("--out", default=REPLAY_DATA_DIR, help="Directory to write <SYMBOL>.json files to")
+    args = parser.parse_args()
+    record(args.limit, args.out)
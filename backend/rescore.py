@@ -0,0 +1,28 @@
+#!/usr/bin/env python3
+"""
+Recompute balanced/value/growth/momentum/quality scores for every stored stock
+using the current rule table, without refetching anything from the provider.
+
+Usage: python rescore.py [--only-stale] [--chunk-size N]
+"""
+
+import argparse
+from app.database import SessionLocal, create_tables
+from app.services.rescore import rescore_all_stocks, RESCORE_CHUNK_SIZE
+from app.services.logging_setup import configure_logging
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rescore all stocks in the database")
+    parser.add_argument("--only-stale", action="store_true", help="Only rescore rows stamped with an older scoring version")
+    parser.add_argument("--chunk-size", type=int, default=RESCORE_CHUNK_SIZE)
+    args = parser.parse_args()
+    configure_logging()
+
+    # Make sure the scoring_version column exists on older databases
+    create_tables()
+
+    db = SessionLocal()
+    try:
+        rescore_all_stocks(db, chunk_size=args.chunk_size, only_stale=args.only_stale)
+    finally:
+        db.close()
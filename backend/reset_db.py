@@ -1,34 +1,29 @@
-import os
-import psycopg2
-from urllib.parse import urlparse
+from sqlalchemy import inspect, text
 from dotenv import load_dotenv
+from app.database import Base, get_engine
+import app.models  # noqa: F401 - registers the tables on Base.metadata
 
 # Load environment variables
 load_dotenv()
 
-DATABASE_URL = os.getenv("DATABASE_URL")
-
 def reset_database():
+    """Clear all data but keep the schema, on PostgreSQL or the embedded SQLite backend"""
     try:
-        # Check if URL is Render (remote) or local
-        if "render.com" in DATABASE_URL:
-            conn = psycopg2.connect(DATABASE_URL, sslmode="require")
-        else:
-            conn = psycopg2.connect(DATABASE_URL)  # Local Postgres, no SSL
-
-        conn.autocommit = True
-        cur = conn.cursor()
-
-        # Truncate example table (replace with your tables)
-        cur.execute("TRUNCATE TABLE stocks RESTART IDENTITY CASCADE;")
-        cur.execute("TRUNCATE TABLE ticker_progress RESTART IDENTITY CASCADE;")
+        engine = get_engine()
+        existing = set(inspect(engine).get_table_names())
+        tables = [table.name for table in reversed(Base.metadata.sorted_tables) if table.name in existing]
+
+        with engine.begin() as conn:
+            if engine.dialect.name == "postgresql":
+                if tables:
+                    conn.execute(text(f"TRUNCATE TABLE {', '.join(tables)} RESTART IDENTITY CASCADE"))
+            else:
+                for table in tables:
+                    conn.execute(text(f"DELETE FROM {table}"))
 
         print("✅ Database reset: all data cleared.")
-
-        cur.close()
-        conn.close()
     except Exception as e:
         print(f"❌ Error resetting database: {e}")
 
 if __name__ == "__main__":
-    reset_database()
\ No newline at end of file
+    reset_database()
@@ -0,0 +1,159 @@
+"""
+Parity between the scalar scorer (score_record, one dict at a time) and the
+vectorized one (score_arrays / score_frame / score_records), checked against
+a plain per-strategy reference written the way the scores were computed
+before the rule table existed. Any change to a rule has to be made here too.
+"""
+
+import math
+import numpy as np
+import pandas as pd
+import pytest
+from app.services.scoring import (
+    STRATEGIES, STRATEGY_RULES, rule_fields, score_arrays, score_frame, score_record, score_records,
+)
+
+
+def _number(value):
+    if value is None:
+        return None
+    try:
+        value = float(value)
+    except (ValueError, TypeError):
+        return None
+    return None if math.isnan(value) else value
+
+def _points(checks, weight):
+    score = 0.0
+    for passed in checks:
+        if passed:
+            score += weight
+    return min(100, int(math.ceil(score)))
+
+def reference_score(data, strategy):
+    v = {field: _number(data.get(field)) for field in rule_fields()}
+    known = lambda *fields: all(v[field] is not None for field in fields)
+    if strategy == "value":
+        return _points([
+            known("revenue_growth") and v["revenue_growth"] > 0.05,
+            known("earnings_growth") and v["earnings_growth"] > 0.05,
+            known("roe") and v["roe"] > 0.15,
+            known("de_ratio") and 0 < v["de_ratio"] < 1,
+            known("free_cash_flow") and v["free_cash_flow"] > 0,
+            known("peg_ratio") and 0 < v["peg_ratio"] < 1,
+        ], 16.7)
+    if strategy == "growth":
+        return _points([
+            known("revenue_growth_3yr") and v["revenue_growth_3yr"] > 0.20,
+            known("revenue_growth") and v["revenue_growth"] >= 0.20,
+            known("de_ratio") and 0 <= v["de_ratio"] <= 5,
+            known("peg_ratio") and 0 < v["peg_ratio"] <= 2,
+        ], 25)
+    if strategy == "momentum":
+        return _points([
+            known("revenue_growth_3yr") and v["revenue_growth_3yr"] > 0.10,
+            known("earnings_growth") and v["earnings_growth"] > 0.15,
+            known("revenue_growth") and v["revenue_growth"] > 0.20,
+            known("roe") and v["roe"] > 0.20,
+            known("revenue_growth", "revenue_growth_3yr") and v["revenue_growth"] > v["revenue_growth_3yr"],
+            known("return_12_1m") and v["return_12_1m"] > 0.10,
+            known("price", "sma_200") and v["price"] > v["sma_200"],
+            known("sma_50", "sma_200") and v["sma_50"] > v["sma_200"],
+            known("volatility") and 0 < v["volatility"] < 0.6,
+        ], 11.2)
+    if strategy == "quality":
+        return _points([
+            known("pb_ratio") and 0 < v["pb_ratio"] < 5,
+            known("roe") and v["roe"] > 0.15,
+            known("de_ratio") and 0 < v["de_ratio"] < 0.5,
+            known("free_cash_flow") and v["free_cash_flow"] > 0,
+            known("dividend_yield") and v["dividend_yield"] > 0,
+            known("revenue_growth") and v["revenue_growth"] > 0,
+        ], 16.7)
+    return _points([
+        known("revenue_growth") and v["revenue_growth"] > 0.05,
+        known("roe") and v["roe"] > 0.15,
+        known("de_ratio") and 0 < v["de_ratio"] < 1,
+        known("free_cash_flow") and v["free_cash_flow"] > 0,
+        known("peg_ratio") and 0 < v["peg_ratio"] < 2,
+    ], 20)
+
+
+def _edge_values():
+    """Every rule bound, values either side of it, and inputs that must never pass"""
+    values = {0.0, -1.0, 1e12, math.inf, -math.inf}
+    for rules in STRATEGY_RULES.values():
+        for rule in rules:
+            for bound in (rule.min, rule.max):
+                if bound is not None:
+                    values.update({bound, np.nextafter(bound, math.inf), np.nextafter(bound, -math.inf)})
+    return sorted(values) + [math.nan, None, "n/a", "0.25"]
+
+def _records(count, seed):
+    rng = np.random.default_rng(seed)
+    edges = _edge_values()
+    records = []
+    for _ in range(count):
+        record = {}
+        for field in rule_fields():
+            draw = rng.random()
+            if draw < 0.4:
+                record[field] = edges[rng.integers(len(edges))]
+            elif draw < 0.5:
+                continue
+            else:
+                record[field] = float(rng.normal(0.2, 1.0))
+        records.append(record)
+    return records
+
+RECORDS = _records(5000, seed=4)
+
+
+@pytest.mark.parametrize("strategy", STRATEGIES)
+def test_scalar_scorer_matches_reference(strategy):
+    for record in RECORDS:
+        assert score_record(record, [strategy])[strategy] == reference_score(record, strategy), record
+
+@pytest.mark.parametrize("strategy", STRATEGIES)
+def test_vectorized_scorer_matches_scalar(strategy):
+    columns = {field: [record.get(field) for record in RECORDS] for field in rule_fields()}
+    expected = [score_record(record, [strategy])[strategy] for record in RECORDS]
+    assert score_arrays(columns, strategy).tolist() == expected
+
+def test_score_records_and_frame_match_scalar():
+    expected = [score_record(record) for record in RECORDS]
+    assert score_records(RECORDS) == [
+        {f"{strategy}_score": scores[strategy] for strategy in STRATEGIES} for scores in expected
+    ]
+    frame = pd.DataFrame([{field: record.get(field) for field in rule_fields()} for record in RECORDS])
+    scores = score_frame(frame)
+    for strategy in STRATEGIES:
+        assert scores[f"{strategy}_score"].tolist() == [row[strategy] for row in expected]
+
+def test_two_dimensional_panels_score_cell_by_cell():
+    shape = (50, 100)
+    records = RECORDS[:shape[0] * shape[1]]
+    columns = {
+        field: np.array([_number(record.get(field)) for record in records], dtype=np.float64).reshape(shape)
+        for field in rule_fields()
+    }
+    for strategy in STRATEGIES:
+        expected = np.array([score_record(record, [strategy])[strategy] for record in records]).reshape(shape)
+        assert np.array_equal(score_arrays(columns, strategy), expected)
+
+def test_missing_columns_score_zero():
+    assert score_arrays({}, "balanced", shape=(3,)).tolist() == [0, 0, 0]
+    assert score_record({}) == {strategy: 0 for strategy in STRATEGIES}
+
+def test_momentum_without_price_indicators_keeps_fundamental_points():
+    # No price history yet (first run, symbol the provider can't download): the
+    # fundamental momentum rules still score, the price rules just don't pass
+    strong_fundamentals = {
+        "revenue_growth_3yr": 0.15, "earnings_growth": 0.30, "revenue_growth": 0.35, "roe": 0.25, "price": 50.0,
+        "return_12_1m": None, "sma_50": None, "sma_200": None, "volatility": None,
+    }
+    assert score_record(strong_fundamentals, ["momentum"])["momentum"] == 56
+    columns = {field: [value] for field, value in strong_fundamentals.items()}
+    assert score_arrays(columns, "momentum").tolist() == [56]
+    with_indicators = dict(strong_fundamentals, return_12_1m=0.4, sma_50=45.0, sma_200=40.0, volatility=0.3)
+    assert score_record(with_indicators, ["momentum"])["momentum"] == 100
@@ -0,0 +1,27 @@
+#!/usr/bin/env python3
+"""
+Download daily price history for every stored stock into PRICE_HISTORY_DIR,
+recompute the momentum indicators (12-1 month return, 50/200-day averages,
+volatility) and rescore momentum. The ingestion leader also runs this once a day.
+
+Usage: python update_prices.py
+"""
+
+from app.database import SessionLocal, create_tables
+from app.services.price_history import update_price_history, PRICE_HISTORY_DIR
+from app.services.logging_setup import configure_logging
+
+if __name__ == "__main__":
+    configure_logging()
+    # Make sure the indicator columns exist on older databases
+    create_tables()
+
+    db = SessionLocal()
+    try:
+        result = update_price_history(db)
+        print(
+            f"✅ Downloaded {result['downloaded']}/{result['symbols']} symbols to {PRICE_HISTORY_DIR}, "
+            f"updated indicators for {result['indicators']} stocks"
+        )
+    finally:
+        db.close()
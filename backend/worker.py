@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Standalone ingestion worker. Runs get_stocks on a schedule (plus the daily
+snapshot compaction and price history update) outside the web process, so API
+workers only serve reads.
+
+Start as many as you like. By default a leader lock makes sure exactly one of
+them (or one API instance running with RUN_INGESTION=leader) ingests at a
+time, and a standby takes over within one interval if the leader goes away.
+With INGEST_COORDINATION=lease they all ingest, each claiming its own batches
+of due symbols, so N workers sweep the universe about N times faster. Each
+worker rate limits itself, so size INGEST_RATE_LIMIT per worker.
+
+Set METRICS_PORT to serve Prometheus metrics for this worker's ingestion.
+
+Usage: python worker.py
+"""
+
+import logging
+import signal
+from apscheduler.schedulers.blocking import BlockingScheduler
+from app.database import create_tables
+from app.services.ingestion_worker import add_ingestion_jobs, INGEST_INTERVAL_SECONDS, INGEST_COORDINATION
+from app.services.leader import ingestion_leader
+from app.services.logging_setup import configure_logging
+from app.services.metrics import start_metrics_server
+
+logger = logging.getLogger("worker")
+
+if __name__ == "__main__":
+    configure_logging()
+    create_tables()
+    # Ingestion metrics live in this process, so it serves its own scrape endpoint
+    start_metrics_server()
+
+    scheduler = BlockingScheduler()
+    add_ingestion_jobs(scheduler)
+
+    def shutdown(signum, frame):
+        scheduler.shutdown(wait=False)
+
+    signal.signal(signal.SIGTERM, shutdown)
+    role = "on leased batches" if INGEST_COORDINATION == "lease" else "while leader"
+    logger.info("⏰ Ingestion worker started, running every %.0fs %s", INGEST_INTERVAL_SECONDS, role)
+    try:
+        scheduler.start()
+    except (KeyboardInterrupt, SystemExit):
+        pass
+    finally:
+        # Hand over to a standby straight away rather than when the connection times out
+        ingestion_leader.release()
+        logger.info("👋 Ingestion worker stopped")
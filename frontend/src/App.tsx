@@ -165,28 +165,48 @@ function getStrategyCriteria(strategy: string) {
       metrics: [
         {
           name: "3-Year Revenue Growth",
-          maxPoints: 20,
-          thresholds: ">10%: Pass (20pts) | ≤10%: Fail (0pts)",
+          maxPoints: 11.2,
+          thresholds: ">10%: Pass (11.2pts) | ≤10%: Fail (0pts)",
         },
         {
           name: "Earnings Growth",
-          maxPoints: 20,
-          thresholds: ">15%: Pass (20pts) | ≤15%: Fail (0pts)",
+          maxPoints: 11.2,
+          thresholds: ">15%: Pass (11.2pts) | ≤15%: Fail (0pts)",
         },
         {
           name: "Revenue Growth (YoY)",
-          maxPoints: 20,
-          thresholds: ">20%: Pass (20pts) | ≤20%: Fail (0pts)",
+          maxPoints: 11.2,
+          thresholds: ">20%: Pass (11.2pts) | ≤20%: Fail (0pts)",
         },
         {
           name: "Return on Equity",
-          maxPoints: 20,
-          thresholds: ">20%: Pass (20pts) | ≤20%: Fail (0pts)",
+          maxPoints: 11.2,
+          thresholds: ">20%: Pass (11.2pts) | ≤20%: Fail (0pts)",
         },
         {
           name: "Accelerating Revenue Growth",
-          maxPoints: 20,
-          thresholds: "YoY > 3yr: Pass (20pts) | YoY ≤ 3yr: Fail (0pts)",
+          maxPoints: 11.2,
+          thresholds: "YoY > 3yr: Pass (11.2pts) | YoY ≤ 3yr: Fail (0pts)",
+        },
+        {
+          name: "12-1 Month Return",
+          maxPoints: 11.2,
+          thresholds: ">10%: Pass (11.2pts) | ≤10%: Fail (0pts)",
+        },
+        {
+          name: "Price vs 200-Day Average",
+          maxPoints: 11.2,
+          thresholds: "Above: Pass (11.2pts) | At or below: Fail (0pts)",
+        },
+        {
+          name: "50-Day vs 200-Day Average",
+          maxPoints: 11.2,
+          thresholds: "Above: Pass (11.2pts) | At or below: Fail (0pts)",
+        },
+        {
+          name: "Annualized Volatility",
+          maxPoints: 11.2,
+          thresholds: "0-60%: Pass (11.2pts) | Outside range: Fail (0pts)",
         },
       ],
     },
@@ -1077,17 +1097,18 @@ function CompanyProfileWrapper() {
         const res = await fetch(
           `${
             import.meta.env.VITE_API_URL || "http://localhost:8000"
-          }/stocks?limit=1000&strategy=balanced`
+          }/stocks/${encodeURIComponent(symbol)}`
         );
+
+        if (res.status === 404) {
+          setError("Company not found");
+          return;
+        }
+
         const data = await res.json();
 
-        if (Array.isArray(data)) {
-          const foundStock = data.find((s: Stock) => s.symbol === symbol);
-          if (foundStock) {
-            setStock(foundStock);
-          } else {
-            setError("Company not found");
-          }
+        if (res.ok && data && data.symbol) {
+          setStock(data);
         } else {
           setError("Error fetching company data");
         }